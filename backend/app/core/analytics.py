@@ -0,0 +1,279 @@
+"""Vectorized booking-to-payment analytics.
+
+Columns are pulled from the database in bulk and every metric is computed
+with NumPy array operations; nothing here iterates over individual
+appointments or payments in Python.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import extract, select
+from sqlalchemy.orm import Session
+
+from app.models.appointment import Appointment
+from app.models.payment import Payment
+
+APPOINTMENT_STATUSES = ["BOOKED", "CONFIRMED", "COMPLETED", "CANCELLED"]
+PAYMENT_STATUSES = ["PENDING", "SUCCESS", "FAILED"]
+
+PERCENTILES = (50, 90, 99)
+
+FETCH_CHUNK_SIZE = 100_000
+
+
+def _encode(values: np.ndarray, labels: List[str]) -> np.ndarray:
+    """Map status strings to small integer codes (-1 for unknown labels)"""
+    uniques, inverse = np.unique(values.astype(str), return_inverse=True)
+    lookup = np.array([labels.index(u) if u in labels else -1 for u in uniques], dtype=np.int8)
+    return lookup[inverse] if len(values) else np.empty(0, dtype=np.int8)
+
+
+def _factorize(values: np.ndarray):
+    """Return (uniques, codes) for integer keys, using a direct table when keys are dense"""
+    if len(values) and values.min() >= 0 and values.max() < 4 * len(values) + 1024:
+        present = np.zeros(values.max() + 1, dtype=bool)
+        present[values] = True
+        uniques = np.flatnonzero(present)
+        codes = np.cumsum(present) - 1
+        return uniques, codes[values]
+    return np.unique(values, return_inverse=True)
+
+
+def _fetch_columns(db: Session, stmt, dtypes: List[Any]) -> List[np.ndarray]:
+    """Stream a result set in chunks straight into per-column arrays"""
+    chunks: List[List[np.ndarray]] = [[] for _ in dtypes]
+    result = db.execute(stmt.execution_options(yield_per=FETCH_CHUNK_SIZE))
+    for partition in result.partitions():
+        for i, column in enumerate(zip(*partition)):
+            chunks[i].append(np.asarray(column, dtype=dtypes[i]))
+    return [
+        np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+        for parts, dtype in zip(chunks, dtypes)
+    ]
+
+
+def load_appointments(
+    db: Session,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    hospital_id: Optional[int] = None
+) -> Dict[str, np.ndarray]:
+    stmt = select(
+        Appointment.id,
+        Appointment.hospital_id,
+        Appointment.patient_id,
+        Appointment.status,
+        extract("epoch", Appointment.created_at)
+    )
+    if start:
+        stmt = stmt.where(Appointment.created_at >= start)
+    if end:
+        stmt = stmt.where(Appointment.created_at <= end)
+    if hospital_id:
+        stmt = stmt.where(Appointment.hospital_id == hospital_id)
+
+    ids, hospitals, patients, statuses, created = _fetch_columns(
+        db, stmt, [np.int64, np.int64, np.int64, object, np.float64]
+    )
+    return {
+        "id": ids,
+        "hospital_id": hospitals,
+        "patient_id": patients,
+        "status": _encode(statuses, APPOINTMENT_STATUSES),
+        "created": created
+    }
+
+
+def load_payments(
+    db: Session,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    hospital_id: Optional[int] = None
+) -> Dict[str, np.ndarray]:
+    """Load payments belonging to the appointment cohort selected by the same filters"""
+    stmt = select(
+        Payment.appointment_id,
+        Payment.status,
+        extract("epoch", Payment.created_at)
+    ).join(Appointment, Appointment.id == Payment.appointment_id)
+    if start:
+        stmt = stmt.where(Appointment.created_at >= start)
+    if end:
+        stmt = stmt.where(Appointment.created_at <= end)
+    if hospital_id:
+        stmt = stmt.where(Appointment.hospital_id == hospital_id)
+
+    appointment_ids, statuses, created = _fetch_columns(db, stmt, [np.int64, object, np.float64])
+    return {
+        "appointment_id": appointment_ids,
+        "status": _encode(statuses, PAYMENT_STATUSES),
+        "created": created
+    }
+
+
+def period_buckets(created: np.ndarray, period: str) -> np.ndarray:
+    """Bucket epoch seconds into period start days (days since the epoch)"""
+    days = np.floor(np.nan_to_num(created) / 86400).astype(np.int64)
+    if period == "day" or not len(days):
+        return days
+    if period == "week":
+        # 1970-01-01 was a Thursday; shift so weeks start on Monday
+        return days - (days + 3) % 7
+    # Month boundaries of the covered range are few; binary search them
+    first, last = days.min().astype("datetime64[D]"), days.max().astype("datetime64[D]")
+    month_starts = np.arange(
+        first.astype("datetime64[M]"), last.astype("datetime64[M]") + 1
+    ).astype("datetime64[D]").astype(np.int64)
+    return month_starts[np.searchsorted(month_starts, days, side="right") - 1]
+
+
+def _match_payments(appointments: Dict[str, np.ndarray], payments: Dict[str, np.ndarray]):
+    """Resolve each payment to the row index of its appointment"""
+    ids = appointments["id"]
+    if ids.max() < 4 * len(ids) + 1024:
+        # Dense primary keys: a direct id -> row lookup table beats a binary search
+        lookup = np.full(ids.max() + 1, -1, dtype=np.int64)
+        lookup[ids] = np.arange(len(ids))
+        in_range = (payments["appointment_id"] >= 0) & (payments["appointment_id"] < len(lookup))
+        rows = np.where(in_range, lookup[np.where(in_range, payments["appointment_id"], 0)], -1)
+        valid = rows >= 0
+        return rows[valid], valid
+
+    order = np.argsort(ids, kind="stable")
+    sorted_ids = ids[order]
+    pos = np.minimum(np.searchsorted(sorted_ids, payments["appointment_id"]), len(sorted_ids) - 1)
+    valid = sorted_ids[pos] == payments["appointment_id"]
+    return order[pos[valid]], valid
+
+
+def first_payment_times(appointments: Dict[str, np.ndarray], payments: Dict[str, np.ndarray]):
+    """Return (has_order, first_paid_at) arrays aligned with the appointments"""
+    n = len(appointments["id"])
+    has_order = np.zeros(n, dtype=bool)
+    first_paid = np.full(n, np.nan)
+    if not n or not len(payments["appointment_id"]):
+        return has_order, first_paid
+
+    idx, valid = _match_payments(appointments, payments)
+    has_order[idx] = True
+
+    success = payments["status"][valid] == PAYMENT_STATUSES.index("SUCCESS")
+    # fmin ignores the NaN placeholder, leaving the earliest success per appointment
+    np.fmin.at(first_paid, idx[success], payments["created"][valid][success])
+    return has_order, first_paid
+
+
+def _group_percentiles(keys: np.ndarray, values: np.ndarray, n_groups: int) -> Dict[int, np.ndarray]:
+    """Nearest-rank percentiles of ``values`` per group key, without a Python loop over rows"""
+    # Sort by value, then stably by group; small integer keys take the radix sort path
+    order = np.argsort(values)
+    key_dtype = np.uint16 if n_groups <= np.iinfo(np.uint16).max else np.int64
+    order = order[np.argsort(keys[order].astype(key_dtype), kind="stable")]
+    keys, values = keys[order], values[order]
+    counts = np.bincount(keys, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    out = {}
+    for p in PERCENTILES:
+        rank = np.maximum(np.ceil(p / 100 * counts).astype(np.int64) - 1, 0)
+        idx = np.minimum(starts + rank, max(len(values) - 1, 0))
+        out[p] = np.where(counts > 0, values[idx] if len(values) else np.nan, np.nan)
+    return out
+
+
+def compute_funnel(
+    appointments: Dict[str, np.ndarray],
+    payments: Dict[str, np.ndarray],
+    period: str = "month"
+) -> List[Dict[str, Any]]:
+    """Booked -> order created -> paid -> completed/cancelled per hospital and period"""
+    if not len(appointments["id"]):
+        return []
+
+    has_order, first_paid = first_payment_times(appointments, payments)
+    paid = ~np.isnan(first_paid)
+    completed = appointments["status"] == APPOINTMENT_STATUSES.index("COMPLETED")
+    cancelled = appointments["status"] == APPOINTMENT_STATUSES.index("CANCELLED")
+
+    hospitals, hospital_idx = _factorize(appointments["hospital_id"])
+    buckets, bucket_idx = _factorize(period_buckets(appointments["created"], period))
+    n_groups = len(hospitals) * len(buckets)
+    keys = hospital_idx * len(buckets) + bucket_idx
+
+    booked = np.bincount(keys, minlength=n_groups)
+    ordered = np.bincount(keys, weights=has_order, minlength=n_groups)
+    paid_count = np.bincount(keys, weights=paid, minlength=n_groups)
+    completed_count = np.bincount(keys, weights=completed, minlength=n_groups)
+    cancelled_count = np.bincount(keys, weights=cancelled, minlength=n_groups)
+
+    time_to_payment = _group_percentiles(keys[paid], (first_paid - appointments["created"])[paid], n_groups)
+
+    rows = []
+    for key in np.flatnonzero(booked):
+        total = int(booked[key])
+        rows.append({
+            "hospital_id": int(hospitals[key // len(buckets)]),
+            "period_start": str(buckets[key % len(buckets)].astype("datetime64[D]")),
+            "booked": total,
+            "order_created": int(ordered[key]),
+            "paid": int(paid_count[key]),
+            "completed": int(completed_count[key]),
+            "cancelled": int(cancelled_count[key]),
+            "order_rate": round(float(ordered[key]) / total, 4),
+            "payment_rate": round(float(paid_count[key]) / total, 4),
+            "completion_rate": round(float(completed_count[key]) / total, 4),
+            "time_to_payment_seconds": {
+                f"p{p}": None if np.isnan(values[key]) else round(float(values[key]), 1)
+                for p, values in time_to_payment.items()
+            }
+        })
+    return rows
+
+
+def compute_cohort_retention(appointments: Dict[str, np.ndarray], max_months: int = 12) -> List[Dict[str, Any]]:
+    """Share of each monthly first-booking cohort that books again N months later"""
+    if not len(appointments["id"]):
+        return []
+
+    months = period_buckets(appointments["created"], "month").astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    patients, patient_idx = _factorize(appointments["patient_id"])
+
+    first_month = np.full(len(patients), np.iinfo(np.int64).max)
+    np.minimum.at(first_month, patient_idx, months)
+
+    offsets = months - first_month[patient_idx]
+    in_window = offsets <= max_months
+    width = max_months + 1
+    # One (patient, offset) pair per patient-month, however many bookings it holds
+    active_pairs = np.zeros(len(patients) * width, dtype=bool)
+    active_pairs[patient_idx[in_window] * width + offsets[in_window]] = True
+    pairs = np.flatnonzero(active_pairs)
+    pair_patients, pair_offsets = pairs // width, pairs % width
+
+    cohorts, cohort_idx = np.unique(first_month[pair_patients], return_inverse=True)
+    active = np.bincount(cohort_idx * width + pair_offsets, minlength=len(cohorts) * width).reshape(len(cohorts), width)
+
+    rows = []
+    for i, cohort in enumerate(cohorts):
+        size = int(active[i, 0])
+        rows.append({
+            "cohort": str(np.datetime64(int(cohort), "M")),
+            "patients": size,
+            "retention": [round(float(count) / size, 4) for count in active[i, 1:]]
+        })
+    return rows
+
+
+def funnel_report(
+    db: Session,
+    period: str = "month",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    hospital_id: Optional[int] = None
+) -> Dict[str, Any]:
+    appointments = load_appointments(db, start, end, hospital_id)
+    payments = load_payments(db, start, end, hospital_id)
+    return {
+        "funnel": compute_funnel(appointments, payments, period),
+        "cohort_retention": compute_cohort_retention(appointments)
+    }
@@ -0,0 +1,45 @@
+"""Bloom filter for set membership with no false negatives.
+
+Bits are packed eight to a byte in a NumPy array. The k probe positions
+come from two 64-bit halves of one blake2b digest (Kirsch-Mitzenmacher
+double hashing), so a lookup costs one hash and k array reads whatever
+the set size.
+"""
+import hashlib
+import math
+from typing import Any
+
+import numpy as np
+
+
+def _hashes(value: Any) -> tuple:
+    digest = hashlib.blake2b(str(value).encode(), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        if capacity < 1 or not 0 < error_rate < 1:
+            raise ValueError("capacity must be positive and error_rate between 0 and 1")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        self.count = 0
+
+    def _positions(self, value: Any):
+        h1, h2 = _hashes(value)
+        positions = np.array([(h1 + i * h2) % self.size for i in range(self.hash_count)], dtype=np.int64)
+        return positions >> 3, (1 << (positions & 7)).astype(np.uint8)
+
+    def add(self, value: Any) -> None:
+        offsets, masks = self._positions(value)
+        # ufunc.at so two probes landing in the same byte both stick
+        np.bitwise_or.at(self.bits, offsets, masks)
+        self.count += 1
+
+    def __contains__(self, value: Any) -> bool:
+        """False means definitely absent; True means probably present"""
+        offsets, masks = self._positions(value)
+        return bool((self.bits[offsets] & masks).all())
@@ -8,10 +8,76 @@ class Settings(BaseSettings):
     # Security
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15  # Renewed with a refresh token, not by signing in again
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+
+    # Revoked access tokens (in-memory Bloom filter, confirmed in the database on a hit)
+    TOKEN_REVOCATION_CAPACITY: int = 100000
+    TOKEN_REVOCATION_ERROR_RATE: float = 0.001
+    TOKEN_REVOCATION_SYNC_SECONDS: float = 5.0  # How often workers pick up revocations made elsewhere
+
+    # Password hashing (bcrypt runs in a separate process pool)
+    BCRYPT_ROUNDS: int = 12  # Changing this rehashes each password at its owner's next login
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64  # Logins beyond this many queued hashes get a 503
+
+    # Rate limits on unauthenticated endpoints: comma-separated <scope>=<count>/<period>,
+    # scopes ip, account (JSON body email), user (bearer token) and route; empty disables
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_LOGIN: str = "ip=20/minute,account=5/minute,route=600/minute"
+    RATE_LIMIT_REGISTER: str = "ip=10/hour,route=300/minute"
+    RATE_LIMIT_ENQUIRY: str = "ip=5/minute,route=300/minute"
+    RATE_LIMIT_MAX_KEYS: int = 100000  # Idle buckets beyond this are evicted, least recently used first
+    RATE_LIMIT_STORAGE_URL: str | None = None  # e.g. redis://localhost:6379/0 to share buckets across workers
+    RATE_LIMIT_TRUST_FORWARDED_FOR: bool = False  # Only behind a proxy that sets X-Forwarded-For
+
+    # Cache of authenticated users' role and active flag (0 disables it)
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 300.0
 
     # Database
     DATABASE_URL: str
+    DB_AUTO_MIGRATE: bool = False  # Apply pending migrations at startup instead of refusing to start
+
+    # Connection pool (per engine: primary, async primary and each replica)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10  # Extra connections opened under load, closed again when returned
+    DB_POOL_TIMEOUT: float = 30.0  # Seconds to wait for a free connection before failing
+    DB_POOL_RECYCLE: int = 1800  # Replace connections older than this many seconds; -1 never
+    DB_POOL_PRE_PING: bool = True  # In-memory SQLite always shares one static connection
+
+    # SQLite tuning, applied on connect whenever DATABASE_URL is SQLite (see app.db.sqlite)
+    SQLITE_TUNING: bool = True
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # With WAL, safe across app crashes; a power cut may lose the last commits
+    SQLITE_MMAP_SIZE: int = 268435456  # Bytes of the file read through a memory map
+    SQLITE_CACHE_SIZE_KB: int = 65536  # Page cache per connection
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000  # How long a writer waits for the write lock
+    SQLITE_BEGIN_MODE: str = "IMMEDIATE"  # For write sessions; read-only sessions begin DEFERRED
+
+    # Read replicas (comma-separated URLs)
+    DATABASE_REPLICA_URLS: str | None = None
+    REPLICA_MAX_LAG_SECONDS: float = 5.0
+    REPLICA_HEALTH_CHECK_SECONDS: float = 10.0
+    READ_YOUR_WRITES_SECONDS: float = 10.0
+
+    # Request metrics, served in the Prometheus text format at /metrics
+    METRICS_ENABLED: bool = True
+
+    # SQL profiler (see app.core.query_profiler); adds X-DB-Queries / X-DB-Time headers, off in production
+    SQL_PROFILER_ENABLED: bool = False
+    SQL_SLOW_QUERY_MS: float = 100.0  # Statements slower than this are logged with their query plan
+    SQL_N_PLUS_ONE_THRESHOLD: int = 5  # Runs of one statement shape per request that count as a suspected N+1
+
+    # Analytics
+    HLL_PRECISION: int = 14  # HyperLogLog sketch precision (standard error 1.04 / sqrt(2^p))
+
+    # Cached configuration (commission rates, key/value settings)
+    CONFIG_CACHE_REFRESH_SECONDS: float = 5.0  # How often workers check for changes made elsewhere
+
+    # Background report jobs
+    REPORT_WORKERS: int = 2
+    REPORT_MAX_PENDING: int = 16
+    REPORT_JOB_TIMEOUT_SECONDS: int = 900
 
     # Email (SMTP)
     SMTP_HOST: str | None = None
@@ -23,6 +89,24 @@ class Settings(BaseSettings):
     # Razorpay
     RAZORPAY_KEY_ID: str | None = None
     RAZORPAY_KEY_SECRET: str | None = None
+    RAZORPAY_WEBHOOK_SECRET: str | None = None
+    RAZORPAY_BASE_URL: str = "https://api.razorpay.com/v1"  # point at fake_gateway.py for offline load tests
+    PAYMENT_GATEWAY_TIMEOUT_SECONDS: float = 5.0
+    PAYMENT_GATEWAY_CONNECT_TIMEOUT_SECONDS: float = 2.0
+    PAYMENT_GATEWAY_MAX_RETRIES: int = 2
+    PAYMENT_GATEWAY_MAX_CONNECTIONS: int = 20
+    PAYMENT_GATEWAY_BREAKER_THRESHOLD: int = 5
+    PAYMENT_GATEWAY_BREAKER_RESET_SECONDS: float = 30.0
+
+    # Gateway webhooks
+    WEBHOOK_BATCH_SIZE: int = 500  # Max events per insert / apply transaction
+    WEBHOOK_POLL_SECONDS: float = 1.0  # Picks up events stored by other workers
+    WEBHOOK_MAX_ATTEMPTS: int = 5  # Failed applies before an event is set aside as FAILED
+
+    # Idempotency-Key handling for payment endpoints
+    IDEMPOTENCY_KEY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_WAIT_SECONDS: float = 10.0  # How long a duplicate waits for the original to finish
+    IDEMPOTENCY_LOCK_SECONDS: float = 120.0  # After this an unfinished key is treated as abandoned
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,171 @@
+"""Process-wide cache of the commission versions and the key/value settings.
+
+Every write bumps a version counter stored in the settings table. Each
+worker compares it with the version it loaded at most once per
+CONFIG_CACHE_REFRESH_SECONDS and reloads when it changed, so changes made
+through any worker reach all of them within that interval.
+"""
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import Integer, Text, cast, func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.settings import CommissionSettings, Settings
+
+CONFIG_VERSION_KEY = "config_version"
+PRINCIPAL_VERSION_KEY = "principal_version"
+
+# Settings rows used as shared invalidation counters rather than configuration
+VERSION_KEYS = (CONFIG_VERSION_KEY, PRINCIPAL_VERSION_KEY)
+
+DEFAULT_COMMISSION_PERCENTAGE = 10.0
+
+
+class CommissionVersion(NamedTuple):
+    id: Optional[int]
+    version: int
+    commission_percentage: float
+    description: Optional[str]
+    effective_from: Optional[datetime]
+    updated_at: Optional[str]
+
+
+DEFAULT_COMMISSION = CommissionVersion(None, 0, DEFAULT_COMMISSION_PERCENTAGE, None, None, None)
+
+
+def read_version(db: Session, key: str) -> str:
+    return db.query(Settings.value).filter(Settings.key == key).scalar() or "0"
+
+
+def bump_version(db: Session, key: str) -> None:
+    """Increment a shared version counter inside the caller's transaction"""
+    updated = db.query(Settings).filter(Settings.key == key).update(
+        {Settings.value: cast(cast(Settings.value, Integer) + 1, Text)},
+        synchronize_session=False
+    )
+    if not updated:
+        db.add(Settings(key=key, value="1", description="Version counter; bumped to invalidate caches"))
+
+
+class ConfigCache:
+    def __init__(self, refresh_interval: float):
+        self.refresh_interval = refresh_interval
+        self._version: Optional[str] = None
+        self._checked_at = 0.0
+        # (effective-from dates, versions), swapped as one so readers never see a mix
+        self._commissions: Tuple[List[datetime], List[CommissionVersion]] = ([], [])
+        self._settings: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, db: Session) -> None:
+        rows = db.query(CommissionSettings).filter(CommissionSettings.is_active == True).all()
+        commissions = sorted(
+            (
+                CommissionVersion(
+                    id=row.id,
+                    version=row.version or 0,
+                    commission_percentage=row.commission_percentage,
+                    description=row.description,
+                    effective_from=row.effective_from,
+                    updated_at=row.updated_at
+                )
+                for row in rows
+            ),
+            key=lambda c: (c.effective_from or datetime.min, c.version, c.id)
+        )
+        self._commissions = ([c.effective_from or datetime.min for c in commissions], commissions)
+        self._settings = {
+            key: value
+            for key, value in db.query(Settings.key, Settings.value).filter(
+                Settings.is_active == True,
+                Settings.key.notin_(VERSION_KEYS)
+            )
+        }
+
+    def _ensure_fresh(self, db: Session) -> None:
+        if self._version is not None and time.monotonic() - self._checked_at < self.refresh_interval:
+            return
+        with self._lock:
+            if self._version is not None and time.monotonic() - self._checked_at < self.refresh_interval:
+                return
+            version = read_version(db, CONFIG_VERSION_KEY)
+            if version != self._version:
+                self._load(db)
+                self._version = version
+            self._checked_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._version = None
+
+    def _commit(self, db: Session) -> None:
+        # Write-through: this worker reloads on its next read, others on their next version check
+        try:
+            db.commit()
+        finally:
+            self.invalidate()
+
+    def commission(self, db: Session, at: Optional[datetime] = None) -> CommissionVersion:
+        """The commission version in effect at ``at`` (default: now)"""
+        self._ensure_fresh(db)
+        starts, commissions = self._commissions
+        index = bisect_right(starts, at or datetime.utcnow()) - 1
+        return commissions[index] if index >= 0 else DEFAULT_COMMISSION
+
+    def commission_percentage(self, db: Session, at: Optional[datetime] = None) -> float:
+        return self.commission(db, at).commission_percentage
+
+    def commission_history(self, db: Session) -> List[CommissionVersion]:
+        self._ensure_fresh(db)
+        return list(self._commissions[1])
+
+    def update_commission(
+        self,
+        db: Session,
+        commission_percentage: float,
+        effective_from: Optional[datetime] = None,
+        description: Optional[str] = None
+    ) -> CommissionVersion:
+        """Record a new commission version; earlier versions stay for past payments"""
+        now = datetime.utcnow()
+        latest = db.query(func.max(CommissionSettings.version)).scalar() or 0
+        row = CommissionSettings(
+            commission_percentage=commission_percentage,
+            description=description,
+            is_active=True,
+            version=latest + 1,
+            effective_from=effective_from or now,
+            created_at=now.isoformat(),
+            updated_at=now.isoformat()
+        )
+        db.add(row)
+        bump_version(db, CONFIG_VERSION_KEY)
+        self._commit(db)
+        db.refresh(row)
+        return self.commission(db, row.effective_from)
+
+    def get(self, db: Session, key: str, default: Optional[str] = None) -> Optional[str]:
+        self._ensure_fresh(db)
+        return self._settings.get(key, default)
+
+    def set(self, db: Session, key: str, value: Optional[str], description: Optional[str] = None) -> None:
+        if key in VERSION_KEYS:
+            raise ValueError(f"'{key}' is reserved")
+        setting = db.query(Settings).filter(Settings.key == key).first()
+        if setting:
+            setting.value = value
+            setting.is_active = True
+            if description is not None:
+                setting.description = description
+        else:
+            db.add(Settings(key=key, value=value, description=description))
+        bump_version(db, CONFIG_VERSION_KEY)
+        self._commit(db)
+
+
+config_cache = ConfigCache(refresh_interval=settings.CONFIG_CACHE_REFRESH_SECONDS)
@@ -1,20 +1,17 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
 
-from app.db.session import get_db
+from app.db.session import SessionLocal, read_engine
 from app.core.security import decode_access_token
-from app.models.user import User
+from app.core.principals import Principal, principal_cache
+from app.core.revocation import token_revocations
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
 # Get current user from JWT
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
+def get_current_user(token: str = Depends(oauth2_scheme)) -> Principal:
     try:
         payload = decode_access_token(token)
         user_id: str | None = payload.get("sub")
@@ -27,7 +24,26 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    # Lookups here only read. They get a session of their own on the DEFERRED
+    # engine, closed before the handler runs, so that on a POST they neither
+    # take SQLite's write lock nor hold it while the handler opens its own
+    # connection (see app.db.sqlite).
+    with SessionLocal(bind=read_engine) as db:
+        # In-memory check; deactivation and role changes revoke the user's earlier tokens
+        if token_revocations.is_revoked(db, payload):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token has been revoked",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+
+        # Short-lived access tokens carry the role, so they need no user lookup
+        if payload.get("type") == "access" and payload.get("role"):
+            return Principal(int(user_id), payload["role"], True)
+
+        # Older tokens: role and active flag come from the principal cache
+        user = principal_cache.get(db, int(user_id))
+
     if not user or not user.is_active:
         raise HTTPException(status_code=401, detail="Inactive or invalid user")
 
@@ -36,7 +52,7 @@ def get_current_user(
 
 # Role-based dependencies
 
-def require_admin(current_user: User = Depends(get_current_user)) -> User:
+def require_admin(current_user: Principal = Depends(get_current_user)) -> Principal:
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -45,7 +61,7 @@ def require_admin(current_user: User = Depends(get_current_user)) -> User:
     return current_user
 
 
-def require_hospital(current_user: User = Depends(get_current_user)) -> User:
+def require_hospital(current_user: Principal = Depends(get_current_user)) -> Principal:
     if current_user.role != "hospital":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -54,7 +70,7 @@ def require_hospital(current_user: User = Depends(get_current_user)) -> User:
     return current_user
 
 
-def require_patient(current_user: User = Depends(get_current_user)) -> User:
+def require_patient(current_user: Principal = Depends(get_current_user)) -> Principal:
     if current_user.role != "patient":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -0,0 +1,150 @@
+import asyncio
+import json
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+
+
+class Subscription:
+    """Bounded, per-consumer view of the event bus"""
+
+    def __init__(self, bus: "EventBus", loop: asyncio.AbstractEventLoop, max_queue_size: int):
+        self._bus = bus
+        self._loop = loop
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self.dropped = 0
+
+    def _offer(self, event: Dict[str, Any]) -> None:
+        # Runs on the subscriber's event loop. A consumer that cannot keep up
+        # loses its backlog and is told to resync from a full snapshot instead
+        # of growing the queue without bound.
+        if self._queue.full():
+            while not self._queue.empty():
+                self._queue.get_nowait()
+                self.dropped += 1
+            self._queue.put_nowait({"type": "resync", "data": {"dropped": self.dropped}})
+        self._queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Wait for the next event, returning None if the timeout expires"""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self._bus.unsubscribe(self)
+
+    async def __aenter__(self) -> "Subscription":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
+
+
+class EventBus:
+    """In-process publish/subscribe bus.
+
+    Publishing is thread-safe so the sync route handlers running in the
+    threadpool can publish directly; delivery happens on each subscriber's
+    event loop.
+    """
+
+    def __init__(self, max_queue_size: int = 100):
+        self.max_queue_size = max_queue_size
+        self._subscribers: Set[Subscription] = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self, asyncio.get_running_loop(), self.max_queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> None:
+        event = {"type": event_type, "data": data}
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        for subscription in subscribers:
+            try:
+                subscription._loop.call_soon_threadsafe(subscription._offer, event)
+            except RuntimeError:
+                # Event loop already closed; drop the stale subscriber
+                self.unsubscribe(subscription)
+
+
+class DashboardFeed:
+    """Aggregates write-path events once and fans the deltas out to every
+    connected admin dashboard."""
+
+    def __init__(self, bus: EventBus):
+        self.bus = bus
+        self._lock = threading.Lock()
+        self._pending_enquiries: Optional[int] = None
+
+    @property
+    def is_seeded(self) -> bool:
+        return self._pending_enquiries is not None
+
+    def seed(self, pending_enquiries: int) -> None:
+        """Initialise running counters from the database (first subscriber only)"""
+        with self._lock:
+            if self._pending_enquiries is None:
+                self._pending_enquiries = pending_enquiries
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"pending_enquiries": self._pending_enquiries}
+
+    def appointment_booked(self, appointment) -> None:
+        if not self.bus.subscriber_count:
+            return
+        self.bus.publish("appointment.created", {
+            "id": appointment.id,
+            "hospital_id": appointment.hospital_id,
+            "service": appointment.service,
+            "appointment_date": appointment.appointment_date.isoformat() if appointment.appointment_date else None,
+            "status": appointment.status
+        })
+
+    def payment_succeeded(self, payment) -> None:
+        if not self.bus.subscriber_count:
+            return
+        self.bus.publish("payment.succeeded", {
+            "id": payment.id,
+            "appointment_id": payment.appointment_id,
+            "amount": float(payment.total_amount),
+            "commission": float(payment.admin_commission),
+            "hospital_payout": float(payment.hospital_payout),
+            "created_at": payment.created_at.isoformat() if payment.created_at else None
+        })
+
+    def enquiries_changed(self, delta: int) -> None:
+        with self._lock:
+            if self._pending_enquiries is None:
+                # Nobody has subscribed yet; the first subscriber seeds the count
+                return
+            self._pending_enquiries = max(self._pending_enquiries + delta, 0)
+            pending_enquiries = self._pending_enquiries
+        self.bus.publish("enquiries.pending", {"pending_enquiries": pending_enquiries})
+
+
+event_bus = EventBus()
+dashboard_feed = DashboardFeed(event_bus)
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """Encode an event in the text/event-stream wire format"""
+    return f"event: {event['type']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+
+
+def heartbeat() -> str:
+    return f": keep-alive {datetime.utcnow().isoformat()}\n\n"
@@ -0,0 +1,138 @@
+"""HyperLogLog cardinality sketches.
+
+Registers are kept in a NumPy uint8 array so merges (element-wise max) and
+estimates are vectorized. Sketches serialize to a sparse encoding while
+few registers are set, which keeps the per-(hospital, day) rows small.
+"""
+import hashlib
+import math
+import struct
+from typing import Any, Iterable, Optional
+
+import numpy as np
+
+MIN_PRECISION = 4
+MAX_PRECISION = 16
+
+_FORMAT_VERSION = 1
+_DENSE = 0
+_SPARSE = 1
+_HEADER = struct.Struct("<BBB")
+
+
+def standard_error(precision: int) -> float:
+    return 1.04 / math.sqrt(1 << precision)
+
+
+def precision_for_error(max_error: float) -> int:
+    """Smallest precision whose standard error is within ``max_error``"""
+    precision = math.ceil(math.log2((1.04 / max_error) ** 2))
+    return min(max(precision, MIN_PRECISION), MAX_PRECISION)
+
+
+def _hash64(value: Any) -> int:
+    if isinstance(value, int):
+        data = value.to_bytes(8, "little", signed=True)
+    else:
+        data = str(value).encode()
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+class HyperLogLog:
+    def __init__(self, precision: int = 14, registers: Optional[np.ndarray] = None):
+        if not MIN_PRECISION <= precision <= MAX_PRECISION:
+            raise ValueError(f"precision must be between {MIN_PRECISION} and {MAX_PRECISION}")
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = registers if registers is not None else np.zeros(self.m, dtype=np.uint8)
+
+    def add(self, value: Any) -> bool:
+        """Add a value; returns True if the sketch changed"""
+        h = _hash64(value)
+        index = h >> (64 - self.precision)
+        remainder = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            return True
+        return False
+
+    def update(self, values: Iterable[Any]) -> None:
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """Merge another sketch into this one (in place)"""
+        if other.precision != self.precision:
+            other = other.reduce(self.precision) if other.precision > self.precision else other
+            if other.precision != self.precision:
+                raise ValueError("cannot merge a lower-precision sketch into a higher-precision one")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def reduce(self, precision: int) -> "HyperLogLog":
+        """Fold the sketch down to a lower precision (coarser error, smaller state)"""
+        if precision == self.precision:
+            return self.copy()
+        if precision > self.precision:
+            raise ValueError("can only reduce to a lower precision")
+
+        shift = self.precision - precision
+        index = np.arange(self.m)
+        dropped = index & ((1 << shift) - 1)
+        # The index bits we drop become the leading bits of the remainder
+        dropped_rank = shift - np.floor(np.log2(np.maximum(dropped, 1))).astype(np.int64)
+        rank = np.where(dropped > 0, dropped_rank, shift + self.registers.astype(np.int64))
+        rank = np.where(self.registers > 0, rank, 0)
+
+        registers = np.zeros(1 << precision, dtype=np.uint8)
+        np.maximum.at(registers, index >> shift, rank.astype(np.uint8))
+        return HyperLogLog(precision, registers)
+
+    def copy(self) -> "HyperLogLog":
+        return HyperLogLog(self.precision, self.registers.copy())
+
+    def estimate(self) -> int:
+        m = self.m
+        if m == 16:
+            alpha = 0.673
+        elif m == 32:
+            alpha = 0.697
+        elif m == 64:
+            alpha = 0.709
+        else:
+            alpha = 0.7213 / (1 + 1.079 / m)
+
+        raw = alpha * m * m / float(np.sum(np.ldexp(1.0, -self.registers.astype(np.int64))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Small-range correction: linear counting
+            return int(round(m * math.log(m / zeros)))
+        return int(round(raw))
+
+    @property
+    def standard_error(self) -> float:
+        return standard_error(self.precision)
+
+    def to_bytes(self) -> bytes:
+        nonzero = np.flatnonzero(self.registers)
+        # Sparse: (uint16 index, uint8 rank) pairs, used while smaller than dense
+        if len(nonzero) * 3 < self.m:
+            body = nonzero.astype("<u2").tobytes() + self.registers[nonzero].tobytes()
+            return _HEADER.pack(_FORMAT_VERSION, self.precision, _SPARSE) + body
+        return _HEADER.pack(_FORMAT_VERSION, self.precision, _DENSE) + self.registers.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        version, precision, encoding = _HEADER.unpack_from(data)
+        if version != _FORMAT_VERSION:
+            raise ValueError(f"unsupported sketch format version {version}")
+        body = memoryview(data)[_HEADER.size:]
+        if encoding == _DENSE:
+            return cls(precision, np.frombuffer(body, dtype=np.uint8).copy())
+
+        count = len(body) // 3
+        registers = np.zeros(1 << precision, dtype=np.uint8)
+        index = np.frombuffer(body[:count * 2], dtype="<u2")
+        registers[index] = np.frombuffer(body[count * 2:], dtype=np.uint8)
+        return cls(precision, registers)
@@ -0,0 +1,194 @@
+"""Idempotency-Key handling for payment endpoints.
+
+The first successful response for a key is stored and replayed for any
+retry with the same key. Concurrent duplicates in this process await the
+in-flight request; duplicates in other workers poll its stored record.
+Failed requests release their key so the client can retry.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.idempotency_key import IdempotencyKey
+
+POLL_INTERVAL = 0.2
+PURGE_INTERVAL = 60
+
+REPLAY_HEADER = "Idempotent-Replayed"
+
+# (request hash, status code, response body, replayed)
+Outcome = Tuple[str, int, Any, bool]
+
+
+def request_fingerprint(payload: Any) -> str:
+    canonical = json.dumps(jsonable_encoder(payload), sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class IdempotencyStore:
+    def __init__(self, ttl: int, wait_timeout: float, lock_timeout: float):
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self.lock_timeout = lock_timeout
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._last_purge = 0.0
+
+    def _purge_expired(self, db) -> None:
+        if time.monotonic() - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = time.monotonic()
+        db.query(IdempotencyKey).filter(IdempotencyKey.expires_at < datetime.utcnow()).delete()
+        db.commit()
+
+    def _claim(self, scope: str, key: str, request_hash: str) -> Optional[IdempotencyKey]:
+        """Record the key as in progress; returns the existing record if it is taken"""
+        db = SessionLocal()
+        try:
+            self._purge_expired(db)
+            while True:
+                now = datetime.utcnow()
+                db.add(IdempotencyKey(
+                    scope=scope,
+                    key=key,
+                    request_hash=request_hash,
+                    status="IN_PROGRESS",
+                    created_at=now,
+                    expires_at=now + timedelta(seconds=self.ttl)
+                ))
+                try:
+                    db.commit()
+                    return None
+                except IntegrityError:
+                    db.rollback()
+
+                record = db.query(IdempotencyKey).filter(
+                    IdempotencyKey.scope == scope,
+                    IdempotencyKey.key == key
+                ).first()
+                if record is None:
+                    continue
+                abandoned = record.status == "IN_PROGRESS" and \
+                    record.created_at < now - timedelta(seconds=self.lock_timeout)
+                if record.expires_at <= now or abandoned:
+                    # Expired, or left behind by a worker that died mid-request
+                    db.delete(record)
+                    db.commit()
+                    continue
+                return record
+        finally:
+            db.close()
+
+    def _complete(self, scope: str, key: str, status_code: int, content: Any) -> None:
+        db = SessionLocal()
+        try:
+            db.query(IdempotencyKey).filter(
+                IdempotencyKey.scope == scope,
+                IdempotencyKey.key == key
+            ).update({"status": "COMPLETED", "status_code": status_code, "response": content})
+            db.commit()
+        finally:
+            db.close()
+
+    def _release(self, scope: str, key: str) -> None:
+        db = SessionLocal()
+        try:
+            db.query(IdempotencyKey).filter(
+                IdempotencyKey.scope == scope,
+                IdempotencyKey.key == key,
+                IdempotencyKey.status == "IN_PROGRESS"
+            ).delete()
+            db.commit()
+        finally:
+            db.close()
+
+    async def _run(
+        self,
+        scope: str,
+        key: str,
+        request_hash: str,
+        status_code: int,
+        call: Callable[[], Awaitable[Any]]
+    ) -> Outcome:
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            record = await run_in_threadpool(self._claim, scope, key, request_hash)
+            if record is None:
+                break
+            if record.request_hash != request_hash:
+                raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+            if record.status == "COMPLETED":
+                return record.request_hash, record.status_code, record.response, True
+            if time.monotonic() >= deadline:
+                raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+            await asyncio.sleep(POLL_INTERVAL)
+
+        try:
+            content = jsonable_encoder(await call())
+        except BaseException:
+            await run_in_threadpool(self._release, scope, key)
+            raise
+        await run_in_threadpool(self._complete, scope, key, status_code, content)
+        return request_hash, status_code, content, False
+
+    async def execute(
+        self,
+        key: Optional[str],
+        scope: str,
+        payload: Any,
+        status_code: int,
+        call: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Run ``call`` once per key, replaying its stored response for duplicates"""
+        if not key:
+            return await call()
+        if len(key) > 255:
+            raise HTTPException(status_code=400, detail="Idempotency-Key must be at most 255 characters")
+
+        request_hash = request_fingerprint(payload)
+        slot = (scope, key)
+
+        inflight = self._inflight.get(slot)
+        if inflight is not None:
+            outcome = await asyncio.shield(inflight)
+            outcome = (*outcome[:3], True)
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[slot] = future
+            try:
+                outcome = await self._run(scope, key, request_hash, status_code, call)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except BaseException as e:
+                future.set_exception(e)
+                future.exception()  # Waiters re-raise it; no "never retrieved" warning otherwise
+                raise
+            else:
+                future.set_result(outcome)
+            finally:
+                self._inflight.pop(slot, None)
+
+        stored_hash, stored_status, content, replayed = outcome
+        if stored_hash != request_hash:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+        if not replayed:
+            return content
+        return JSONResponse(status_code=stored_status, content=content, headers={REPLAY_HEADER: "true"})
+
+
+idempotency_store = IdempotencyStore(
+    ttl=settings.IDEMPOTENCY_KEY_TTL_SECONDS,
+    wait_timeout=settings.IDEMPOTENCY_WAIT_SECONDS,
+    lock_timeout=settings.IDEMPOTENCY_LOCK_SECONDS
+)
@@ -0,0 +1,257 @@
+"""Request metrics in the Prometheus text format.
+
+``MetricsMiddleware`` records, per route template and status, request
+latency, response size and the time spent in database calls, plus the
+number of requests in flight; ``render_metrics`` formats them for the
+/metrics endpoint together with the connection pool gauges.
+
+Recording must cost next to nothing on the request path, so nothing
+takes a lock: every thread writes to its own shard of each metric
+(registered once, on its first observation) and shards are only summed
+when metrics are scraped. Database time is attributed to the request
+whose context the statement ran in, whether on the event loop or in a
+threadpool worker. Metrics are per worker process.
+"""
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.db.pool import pool_stats
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Requests that matched no route share one label, so unknown paths cannot add series
+UNMATCHED_ROUTE = "unmatched"
+
+
+class RequestStats:
+    """Work done by one request; filled in by engine events running in its context"""
+    __slots__ = ("db_seconds",)
+
+    def __init__(self):
+        self.db_seconds = 0.0
+
+
+current_request: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("current_request", default=None)
+
+
+class _Sharded:
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _snapshots(self) -> Iterator[Tuple[tuple, list]]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            # Copies are made by C code without releasing the GIL, so a shard's
+            # owner cannot change it halfway through
+            for labels, values in list(shard.items()):
+                yield labels, list(values)
+
+
+class Histogram(_Sharded):
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str], buckets: Sequence[float]):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(buckets)
+
+    def observe(self, labels: tuple, value: float) -> None:
+        shard = self._shard()
+        values = shard.get(labels)
+        if values is None:
+            # A count per bucket, one for values above the last, then the sum
+            values = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    def collect(self) -> Dict[tuple, list]:
+        totals: Dict[tuple, list] = {}
+        for labels, values in self._snapshots():
+            total = totals.get(labels)
+            if total is None:
+                totals[labels] = values
+            else:
+                for i, value in enumerate(values):
+                    total[i] += value
+        return totals
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, values in sorted(self.collect().items()):
+            base = _labels(self.label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{{{base},le=\"{bound:g}\"}} {cumulative}")
+            cumulative += values[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{{{base},le=\"+Inf\"}} {cumulative}")
+            lines.append(f"{self.name}_sum{{{base}}} {values[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {cumulative}")
+        return lines
+
+
+class Gauge(_Sharded):
+    def add(self, labels: tuple, amount: float) -> None:
+        shard = self._shard()
+        values = shard.get(labels)
+        if values is None:
+            values = shard[labels] = [0]
+        values[0] += amount
+
+    def render(self) -> List[str]:
+        totals: Dict[tuple, float] = {}
+        for labels, values in self._snapshots():
+            totals[labels] = totals.get(labels, 0) + values[0]
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        for labels, value in sorted(totals.items()):
+            lines.append(f"{self.name}{{{_labels(self.label_names, labels)}}} {value:g}")
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence) -> str:
+    return ",".join(f"{name}=\"{_escape(value)}\"" for name, value in zip(names, values))
+
+
+request_latency = Histogram(
+    "http_request_duration_seconds", "Time from request start to the end of the response body.",
+    ("method", "route", "status"), LATENCY_BUCKETS
+)
+response_size = Histogram(
+    "http_response_size_bytes", "Response body size.", ("method", "route", "status"), SIZE_BUCKETS
+)
+request_db_time = Histogram(
+    "http_request_db_seconds", "Time spent executing database statements per request.",
+    ("method", "route"), LATENCY_BUCKETS
+)
+in_flight = Gauge("http_requests_in_flight", "Requests being handled.", ("method",))
+
+
+class MetricsMiddleware:
+    """Records latency, response size and database time of every HTTP request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        start = time.perf_counter()
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = 500
+        size = 0
+
+        async def send_and_measure(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        in_flight.add((method,), 1)
+        try:
+            await self.app(scope, receive, send_and_measure)
+        finally:
+            in_flight.add((method,), -1)
+            current_request.reset(token)
+            # FastAPI leaves the matched route in the scope
+            route = scope.get("route")
+            route = getattr(route, "path", None) or UNMATCHED_ROUTE
+            request_latency.observe((method, route, status), time.perf_counter() - start)
+            response_size.observe((method, route, status), size)
+            request_db_time.observe((method, route), stats.db_seconds)
+
+
+# Other users of the statement timings, as (wants_timing, on_statement) pairs
+_statement_consumers: List[Tuple[Callable[[], bool], Callable[..., None]]] = []
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and (
+        current_request.get() is not None or any(wants_timing() for wants_timing, _ in _statement_consumers)
+    ):
+        context._statement_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_statement_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    stats = current_request.get()
+    if stats is not None:
+        stats.db_seconds += elapsed
+    for _, on_statement in _statement_consumers:
+        on_statement(conn, statement, parameters, executemany, elapsed)
+
+
+_engines_instrumented = False
+
+
+def instrument_engines() -> None:
+    """Time statements on every engine, existing and future"""
+    global _engines_instrumented
+    if not _engines_instrumented:
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        _engines_instrumented = True
+
+
+def on_timed_statement(wants_timing: Callable[[], bool], on_statement: Callable[..., None]) -> None:
+    """Share the statement timings with another consumer.
+
+    Statements are timed while a request is being measured or while
+    ``wants_timing()`` is true; ``on_statement(conn, statement, parameters,
+    executemany, seconds)`` then runs after each of them.
+    """
+    instrument_engines()
+    _statement_consumers.append((wants_timing, on_statement))
+
+
+POOL_GAUGES = (
+    ("db_pool_connections_in_use", "in_use", "gauge", "Connections checked out of the pool."),
+    ("db_pool_connections_idle", "idle", "gauge", "Open connections waiting in the pool."),
+    ("db_pool_checkouts_total", "checkouts", "counter", "Connections handed out by the pool."),
+    ("db_pool_waits_total", "waits", "counter", "Checkouts that waited for a connection to be returned."),
+    ("db_pool_timeouts_total", "timeouts", "counter", "Checkouts that gave up waiting.")
+)
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in (request_latency, response_size, request_db_time, in_flight):
+        lines.extend(metric.render())
+
+    pools = pool_stats()
+    for name, key, kind, help_text in POOL_GAUGES:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for engine_name, stats in sorted(pools.items()):
+            lines.append(f"{name}{{engine=\"{_escape(engine_name)}\"}} {stats[key]}")
+    return "\n".join(lines) + "\n"
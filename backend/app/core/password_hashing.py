@@ -0,0 +1,75 @@
+"""Password hashing in a bounded process pool.
+
+bcrypt is deliberately slow; run on the request threadpool, a burst of
+logins occupies every thread and stalls unrelated endpoints. Hashes run
+in their own worker processes instead, and once ``max_pending`` are
+queued or running further requests are refused rather than queued
+behind them.
+"""
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+from app.core.config import settings
+from app.core.security import get_password_hash, verify_and_update_password
+
+
+class HashingOverloaded(Exception):
+    pass
+
+
+class PasswordHasher:
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawned (not forked) workers never inherit the server's threads or pooled connections
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def _submit(self, fn, *args) -> Future:
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HashingOverloaded()
+            future = self._get_executor().submit(fn, *args)
+            self.pending += 1
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future: Future) -> None:
+        with self._lock:
+            self.pending -= 1
+            if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+                # A worker died; start a fresh pool for the next submission
+                self._executor = None
+
+    async def hash(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(get_password_hash, password))
+
+    async def verify(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Returns whether the password matches and, if the stored hash is outdated, a new one"""
+        return await asyncio.wrap_future(self._submit(verify_and_update_password, password, hashed_password))
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING
+)
@@ -0,0 +1,260 @@
+"""Non-blocking Razorpay gateway adapter.
+
+Orders are created over a pooled keep-alive HTTP client with strict
+timeouts, bounded jittered retries and a circuit breaker, so a slow or
+failing gateway costs a suspended coroutine rather than a worker thread.
+Payment and webhook signatures are verified locally with HMAC and never
+call the gateway.
+"""
+import asyncio
+import hashlib
+import hmac
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    import httpx
+
+# Statuses worth retrying: the gateway is overloaded or briefly unavailable.
+# A proxy can answer 502/504 after the gateway acted, so only idempotent
+# calls retry them.
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+
+
+class GatewayError(Exception):
+    """The gateway rejected the request or returned an unusable response"""
+
+
+class GatewayUnavailable(GatewayError):
+    """The gateway could not be reached (timeouts, retries exhausted or circuit open)"""
+
+
+class CircuitBreaker:
+    """Stops calling the gateway after repeated failures.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls fail fast for ``reset_timeout`` seconds; then a single trial call
+    is let through (half-open) and its outcome closes or re-opens the circuit.
+
+    ``allow`` hands each admitted call a ticket to pass back with its
+    outcome, so only the trial call itself can end the trial.
+    """
+
+    # Ticket of calls admitted while the circuit is closed; trials are numbered from 1
+    UNTRIED = 0
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial: Optional[int] = None  # Ticket of the half-open trial in flight
+        self._trials = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> Optional[int]:
+        """Admit a call and return its ticket, or None if the circuit is open"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return self.UNTRIED
+            if state == "half_open" and self._trial is None:
+                self._trials += 1
+                self._trial = self._trials
+                return self._trial
+            return None
+
+    def _end_trial(self, ticket: int) -> None:
+        if ticket == self._trial:
+            self._trial = None
+
+    def record_success(self, ticket: int) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            # Closed now; a trial still in flight ends without effect
+            self._trial = None
+
+    def record_failure(self, ticket: int) -> None:
+        with self._lock:
+            self.failures += 1
+            self._end_trial(ticket)
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+
+    def release(self, ticket: int) -> None:
+        """End a call whose outcome was not recorded (cancelled, or failed in our code)"""
+        with self._lock:
+            self._end_trial(ticket)
+
+
+class RazorpayGateway:
+    def __init__(
+        self,
+        key_id: Optional[str],
+        key_secret: Optional[str],
+        webhook_secret: Optional[str],
+        base_url: str,
+        timeout: float,
+        connect_timeout: float,
+        max_retries: int,
+        max_connections: int,
+        breaker: CircuitBreaker
+    ):
+        self.key_id = key_id
+        self.key_secret = key_secret
+        self.webhook_secret = webhook_secret
+        self.base_url = base_url
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.max_connections = max_connections
+        self.breaker = breaker
+        self._client: Optional["httpx.AsyncClient"] = None
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        # Built on first use; httpx (and the async backends it loads) is only
+        # imported then, which keeps it out of every worker's startup
+        if self._client is None:
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                auth=(self.key_id or "", self.key_secret or ""),
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=30
+                )
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _backoff(self, attempt: int) -> float:
+        # Exponential backoff with full jitter, capped at 2 seconds
+        return random.uniform(0, min(2.0, 0.1 * (2 ** attempt)))
+
+    async def _request(self, method: str, path: str, idempotent: bool, **kwargs) -> Dict[str, Any]:
+        ticket = self.breaker.allow()
+        if ticket is None:
+            raise GatewayUnavailable("Payment gateway temporarily unavailable")
+
+        try:
+            return await self._attempt(ticket, method, path, idempotent, **kwargs)
+        finally:
+            # Recorded outcomes already end a half-open trial; this covers the rest
+            # (cancellation, undecodable responses), which would otherwise leave
+            # the trial in flight and the circuit open for good
+            self.breaker.release(ticket)
+
+    async def _attempt(self, ticket: int, method: str, path: str, idempotent: bool, **kwargs) -> Dict[str, Any]:
+        import httpx
+
+        last_error: Exception = GatewayUnavailable("Payment gateway request failed")
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                await asyncio.sleep(self._backoff(attempt - 1))
+            try:
+                response = await self.client.request(method, path, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                # The request never reached the gateway; always safe to retry
+                last_error = e
+                continue
+            except httpx.TransportError as e:
+                # The gateway may have acted on it; only retry idempotent calls
+                last_error = e
+                if idempotent:
+                    continue
+                break
+
+            if response.status_code in RETRYABLE_STATUS_CODES:
+                last_error = GatewayUnavailable(f"Payment gateway returned {response.status_code}")
+                if idempotent:
+                    continue
+                break
+
+            self.breaker.record_success(ticket)
+            if response.status_code >= 400:
+                try:
+                    description = response.json()["error"]["description"]
+                except (ValueError, KeyError, TypeError):
+                    description = response.text
+                raise GatewayError(description)
+            return response.json()
+
+        self.breaker.record_failure(ticket)
+        raise GatewayUnavailable(str(last_error) or last_error.__class__.__name__)
+
+    async def create_order(self, amount: int, receipt: str, notes: Dict[str, Any], currency: str = "INR") -> Dict[str, Any]:
+        """Create an order; ``amount`` is in paise"""
+        return await self._request("POST", "/orders", idempotent=False, json={
+            "amount": amount,
+            "currency": currency,
+            "payment_capture": 1,
+            "receipt": receipt,
+            "notes": notes
+        })
+
+    def verify_payment_signature(self, order_id: str, payment_id: str, signature: str) -> bool:
+        # Anyone can sign with an empty key
+        if not self.key_secret:
+            return False
+        expected = hmac.new(
+            self.key_secret.encode(),
+            f"{order_id}|{payment_id}".encode(),
+            hashlib.sha256
+        ).hexdigest()
+        return hmac.compare_digest(expected, signature)
+
+    def verify_webhook_signature(self, body: bytes, signature: str) -> bool:
+        if not self.webhook_secret:
+            return False
+        expected = hmac.new(self.webhook_secret.encode(), body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, signature)
+
+
+_gateway: Optional[RazorpayGateway] = None
+
+
+def get_payment_gateway() -> RazorpayGateway:
+    """Dependency returning the process-wide gateway adapter"""
+    global _gateway
+    if _gateway is None:
+        _gateway = RazorpayGateway(
+            key_id=settings.RAZORPAY_KEY_ID,
+            key_secret=settings.RAZORPAY_KEY_SECRET,
+            webhook_secret=settings.RAZORPAY_WEBHOOK_SECRET,
+            base_url=settings.RAZORPAY_BASE_URL,
+            timeout=settings.PAYMENT_GATEWAY_TIMEOUT_SECONDS,
+            connect_timeout=settings.PAYMENT_GATEWAY_CONNECT_TIMEOUT_SECONDS,
+            max_retries=settings.PAYMENT_GATEWAY_MAX_RETRIES,
+            max_connections=settings.PAYMENT_GATEWAY_MAX_CONNECTIONS,
+            breaker=CircuitBreaker(
+                failure_threshold=settings.PAYMENT_GATEWAY_BREAKER_THRESHOLD,
+                reset_timeout=settings.PAYMENT_GATEWAY_BREAKER_RESET_SECONDS
+            )
+        )
+    return _gateway
+
+
+async def close_payment_gateway() -> None:
+    if _gateway is not None:
+        await _gateway.close()
@@ -0,0 +1,73 @@
+"""Payment state transitions shared by browser verification and gateway webhooks.
+
+Each helper moves the payment with a single UPDATE conditional on its
+current status, so when verification and a webhook race only one of them
+makes the transition, and returns True when it did; replays are harmless.
+The caller commits.
+
+Captures and refunds also adjust the appointment's paid balance in SQL
+(``paid_paise = paid_paise + amount``), so simultaneous partial payments
+for one appointment all count.
+"""
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.settlements import to_paise
+from app.models.appointment import Appointment
+from app.models.payment import Payment
+
+
+def _transition(db: Session, payment: Payment, from_statuses: Iterable[str], values: Dict[str, Any]) -> bool:
+    changed = db.query(Payment).filter(
+        Payment.id == payment.id,
+        Payment.status.in_(list(from_statuses))
+    ).update({getattr(Payment, name): value for name, value in values.items()}, synchronize_session=False)
+    if changed:
+        for name, value in values.items():
+            set_committed_value(payment, name, value)
+    return bool(changed)
+
+
+def _adjust_balance(db: Session, payment: Payment, sign: int, status: Optional[str] = None) -> None:
+    amount = payment.amount_paise if payment.amount_paise is not None else to_paise(payment.total_amount)
+    values = {Appointment.paid_paise: Appointment.paid_paise + sign * amount}
+    if status:
+        values[Appointment.status] = status
+    db.query(Appointment).filter(Appointment.id == payment.appointment_id).update(
+        values, synchronize_session=False
+    )
+
+
+def mark_payment_captured(
+    db: Session,
+    payment: Payment,
+    razorpay_payment_id: str,
+    razorpay_signature: Optional[str] = None
+) -> bool:
+    values = {"razorpay_payment_id": razorpay_payment_id, "status": "SUCCESS"}
+    if razorpay_signature:
+        values["razorpay_signature"] = razorpay_signature
+    if not _transition(db, payment, ("PENDING", "FAILED"), values):
+        if razorpay_signature:
+            payment.razorpay_signature = razorpay_signature
+        return False
+
+    _adjust_balance(db, payment, 1, status="CONFIRMED")
+    return True
+
+
+def mark_payment_failed(db: Session, payment: Payment, razorpay_payment_id: Optional[str] = None) -> bool:
+    # A capture for the same order may already have landed; it wins
+    values = {"status": "FAILED"}
+    if razorpay_payment_id:
+        values["razorpay_payment_id"] = razorpay_payment_id
+    return _transition(db, payment, ("PENDING",), values)
+
+
+def mark_payment_refunded(db: Session, payment: Payment) -> bool:
+    if not _transition(db, payment, ("SUCCESS",), {"status": "REFUNDED"}):
+        return False
+    _adjust_balance(db, payment, -1)
+    return True
@@ -0,0 +1,118 @@
+"""Process-wide cache of authenticated principals.
+
+Authenticated requests only need a user's role and whether the account
+is active, so those are cached by user id (LRU, with a TTL) and the
+common request never queries the users table.
+
+Deactivating a user or changing their role must go through
+``principal_cache.user_changed``: it commits the change together with a
+bump of a shared version counter and drops the entry here, and every
+other worker clears its cache when it next checks the counter (at most
+once per CONFIG_CACHE_REFRESH_SECONDS).
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.config_cache import PRINCIPAL_VERSION_KEY, bump_version, read_version
+from app.models.user import User
+
+
+class Principal(NamedTuple):
+    """The authenticated user, as seen by route dependencies"""
+    id: int
+    role: str
+    is_active: bool
+
+
+class PrincipalCache:
+    def __init__(self, ttl: float, max_size: int, version_check_interval: float):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.version_check_interval = version_check_interval
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[int, Tuple[float, Optional[Principal]]]" = OrderedDict()
+        self._version: Optional[str] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _check_version(self, db: Session) -> None:
+        if time.monotonic() - self._checked_at < self.version_check_interval:
+            return
+        version = read_version(db, PRINCIPAL_VERSION_KEY)
+        with self._lock:
+            if version != self._version:
+                # A user changed in some worker; we do not know which, so start over
+                self._entries.clear()
+                self._version = version
+            self._checked_at = time.monotonic()
+
+    def get(self, db: Session, user_id: int) -> Optional[Principal]:
+        """The principal for ``user_id``, or None if no such user exists"""
+        if self.max_size <= 0:
+            return self._load(db, user_id)
+
+        self._check_version(db)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        principal = self._load(db, user_id)
+        with self._lock:
+            self._entries[user_id] = (now + self.ttl, principal)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return principal
+
+    def _load(self, db: Session, user_id: int) -> Optional[Principal]:
+        row = db.query(User.id, User.role, User.is_active).filter(User.id == user_id).first()
+        return Principal(row.id, row.role, bool(row.is_active)) if row else None
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def user_changed(self, db: Session, user_id: int) -> None:
+        """Commit the caller's change to a user's role or active flag and invalidate it everywhere"""
+        bump_version(db, PRINCIPAL_VERSION_KEY)
+        try:
+            db.commit()
+        finally:
+            # After the commit, so a concurrent miss cannot re-cache the old row
+            self.invalidate(user_id)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+principal_cache = PrincipalCache(
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    max_size=settings.PRINCIPAL_CACHE_SIZE,
+    version_check_interval=settings.CONFIG_CACHE_REFRESH_SECONDS
+)
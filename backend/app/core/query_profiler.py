@@ -0,0 +1,239 @@
+"""Opt-in SQL profiler (SQL_PROFILER_ENABLED).
+
+Counts the statements each request executes and how long they take, and
+adds both to the response as ``X-DB-Queries`` and ``X-DB-Time`` (ms).
+Statements are grouped by shape: the SQL with literals replaced by ``?``
+and IN lists collapsed, so ``WHERE hospital_id = 3`` and ``= 4`` are the
+same statement. A shape run ``SQL_N_PLUS_ONE_THRESHOLD`` or more times
+in one request is logged as a suspected N+1 (a query per row of an
+earlier result). Statements slower than ``SQL_SLOW_QUERY_MS`` are logged
+with their query plan. Totals per shape across requests are kept for
+/api/admin/metrics/sql-profile.
+
+``profile_queries`` gives the same per-statement counts for code run
+outside a request, e.g. in a benchmark.
+"""
+import contextvars
+import logging
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from starlette.datastructures import MutableHeaders
+
+from app.core.config import settings
+from app.core.metrics import on_timed_statement
+
+logger = logging.getLogger(__name__)
+
+# Distinct statement shapes kept in the totals; the least recently seen are dropped
+MAX_SHAPES = 1000
+
+EXPLAIN_PREFIXES = {"sqlite": "EXPLAIN QUERY PLAN ", "postgresql": "EXPLAIN "}
+EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+
+_STRING = re.compile(r"'(?:''|[^'])*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\$\d+")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize(statement: str) -> str:
+    """Shape of a statement: literals and placeholders as ``?``, IN lists as ``(...)``"""
+    shape = _STRING.sub("?", statement)
+    shape = _PLACEHOLDER.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    shape = _LIST.sub("(...)", shape)
+    return _SPACE.sub(" ", shape).strip()
+
+
+class QueryProfile:
+    """Statements executed within one request (or ``profile_queries`` block)"""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+        self.statements: Dict[str, List] = {}  # statement -> [count, seconds]
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.queries += 1
+        self.seconds += seconds
+        entry = self.statements.get(statement)
+        if entry is None:
+            self.statements[statement] = [1, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+
+    def by_shape(self) -> Dict[str, List]:
+        shapes: Dict[str, List] = {}
+        for statement, (count, seconds) in self.statements.items():
+            entry = shapes.setdefault(normalize(statement), [0, 0.0])
+            entry[0] += count
+            entry[1] += seconds
+        return shapes
+
+    def repeated(self, threshold: int) -> Dict[str, List]:
+        """Shapes run at least ``threshold`` times: suspected N+1s"""
+        return {shape: entry for shape, entry in self.by_shape().items() if entry[0] >= threshold}
+
+
+current_profile: contextvars.ContextVar[Optional[QueryProfile]] = contextvars.ContextVar("current_profile", default=None)
+
+
+class QueryProfiler:
+    def __init__(self, slow_query_ms: float, n_plus_one_threshold: int):
+        self.slow_query_seconds = slow_query_ms / 1000
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.requests = 0
+        self.slow_queries = 0
+        self._shapes: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._explaining = threading.local()
+        self._installed = False
+
+    def install(self) -> None:
+        """Start profiling statements on every engine, existing and future"""
+        if not self._installed:
+            # Timed by the engine listeners the request metrics already use
+            on_timed_statement(lambda: current_profile.get() is not None, self._on_statement)
+            self._installed = True
+
+    def _on_statement(self, conn, statement, parameters, executemany, elapsed):
+        profile = current_profile.get()
+        if profile is None or getattr(self._explaining, "active", False):
+            return
+        profile.record(statement, elapsed)
+        if elapsed >= self.slow_query_seconds:
+            self.slow_queries += 1
+            plan = None if executemany else self._explain(conn, statement, parameters)
+            logger.warning(
+                "Slow query (%.1f ms): %s\nparameters: %r%s",
+                elapsed * 1000, statement, parameters, f"\nplan:\n{plan}" if plan else ""
+            )
+
+    def _explain(self, conn, statement: str, parameters) -> Optional[str]:
+        prefix = EXPLAIN_PREFIXES.get(conn.dialect.name)
+        if prefix is None or not statement.lstrip().upper().startswith(EXPLAINABLE):
+            return None
+        # A cursor of its own: the statement's results have not been fetched yet
+        self._explaining.active = True
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.execute(prefix + statement, parameters)
+            return "\n".join("  " + " | ".join(str(value) for value in row) for row in cursor.fetchall())
+        except Exception as e:
+            return f"  (EXPLAIN failed: {e})"
+        finally:
+            cursor.close()
+            self._explaining.active = False
+
+    def finish(self, profile: QueryProfile, label: str) -> None:
+        """Add a finished request's statements to the totals and report its N+1s"""
+        shapes = profile.by_shape()
+        repeated = {shape: entry for shape, entry in shapes.items() if entry[0] >= self.n_plus_one_threshold}
+        for shape, (count, seconds) in repeated.items():
+            logger.warning("Suspected N+1 in %s: %d x %s (%.1f ms)", label, count, shape, seconds * 1000)
+
+        with self._lock:
+            self.requests += 1
+            for shape, (count, seconds) in shapes.items():
+                totals = self._shapes.get(shape)
+                if totals is None:
+                    totals = self._shapes[shape] = {
+                        "calls": 0, "seconds": 0.0, "max_per_request": 0, "n_plus_one_requests": 0, "routes": set()
+                    }
+                    if len(self._shapes) > MAX_SHAPES:
+                        self._shapes.popitem(last=False)
+                else:
+                    self._shapes.move_to_end(shape)
+                totals["calls"] += count
+                totals["seconds"] += seconds
+                totals["max_per_request"] = max(totals["max_per_request"], count)
+                totals["routes"].add(label)
+                if shape in repeated:
+                    totals["n_plus_one_requests"] += 1
+
+    def stats(self, limit: int = 20) -> Dict[str, Any]:
+        with self._lock:
+            shapes = [
+                {
+                    "statement": shape,
+                    "calls": totals["calls"],
+                    "total_ms": totals["seconds"] * 1000,
+                    "avg_ms": totals["seconds"] / totals["calls"] * 1000,
+                    "max_per_request": totals["max_per_request"],
+                    "n_plus_one_requests": totals["n_plus_one_requests"],
+                    "routes": sorted(totals["routes"])
+                }
+                for shape, totals in self._shapes.items()
+            ]
+            requests = self.requests
+        return {
+            "requests": requests,
+            "slow_queries": self.slow_queries,
+            "slow_query_ms": self.slow_query_seconds * 1000,
+            "n_plus_one_threshold": self.n_plus_one_threshold,
+            "suspected_n_plus_one": sorted(
+                (shape for shape in shapes if shape["n_plus_one_requests"]),
+                key=lambda shape: -shape["n_plus_one_requests"]
+            )[:limit],
+            "top_by_time": sorted(shapes, key=lambda shape: -shape["total_ms"])[:limit]
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._shapes.clear()
+            self.requests = 0
+            self.slow_queries = 0
+
+
+query_profiler = QueryProfiler(
+    slow_query_ms=settings.SQL_SLOW_QUERY_MS,
+    n_plus_one_threshold=settings.SQL_N_PLUS_ONE_THRESHOLD
+)
+
+
+@contextmanager
+def profile_queries() -> Iterator[QueryProfile]:
+    """Profile the statements run in this block (and threads it starts with its context)"""
+    query_profiler.install()
+    profile = QueryProfile()
+    token = current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        current_profile.reset(token)
+
+
+class QueryProfilerMiddleware:
+    """Profiles each HTTP request's statements and reports them in response headers"""
+
+    def __init__(self, app, profiler: QueryProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = QueryProfile()
+        token = current_profile.set(profile)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Queries"] = str(profile.queries)
+                headers["X-DB-Time"] = f"{profile.seconds * 1000:.2f}"
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            current_profile.reset(token)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.profiler.finish(profile, f"{scope['method']} {route}")
@@ -0,0 +1,232 @@
+"""Token-bucket rate limiting for unauthenticated, abuse-prone endpoints.
+
+Each limited route has one or more limits, each over a scope:
+
+- ``ip``: the client address
+- ``account``: the ``email`` field of the JSON body (credential stuffing
+  spread over many addresses still hits one bucket per account)
+- ``user``: the authenticated user (bearer token subject)
+- ``route``: everyone together, a ceiling for the endpoint
+
+A limit like ``10/minute`` is a bucket of 10 tokens refilled at 10 per
+minute, so clients may burst up to the limit and then continue at the
+average rate. Denied requests get a 429 with Retry-After.
+
+Buckets live in an in-process LRU (constant time per request, at most
+``max_keys`` buckets; a bucket evicted for being idle would have refilled
+anyway) or, with RATE_LIMIT_STORAGE_URL, in Redis so all workers share them.
+"""
+import json
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from starlette.datastructures import Headers
+
+from app.core.config import settings
+from app.core.security import decode_access_token
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+SCOPES = ("ip", "account", "user", "route")
+
+# Bodies are only read for account-scoped limits, and only this much of them
+MAX_INSPECTED_BODY = 64 * 1024
+
+
+class Limit(NamedTuple):
+    scope: str
+    capacity: int
+    refill_per_second: float
+
+
+def parse_limits(spec: str) -> List[Limit]:
+    """Parse ``"ip=10/minute,route=600/minute"``; raises ValueError"""
+    limits = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        scope, _, rate = part.partition("=")
+        count, _, period = rate.partition("/")
+        if scope not in SCOPES or period not in PERIODS or not count.isdigit() or int(count) < 1:
+            raise ValueError(f"Invalid rate limit '{part}'; expected <scope>=<count>/<period>")
+        limits.append(Limit(scope, int(count), int(count) / PERIODS[period]))
+    # Narrow scopes first, so a client refused for its own limit does not use up the route's
+    return sorted(limits, key=lambda limit: SCOPES.index(limit.scope))
+
+
+class MemoryBucketStore:
+    """Buckets for this process only; used from the event loop thread"""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, capacity: int, refill_per_second: float) -> float:
+        """Take one token; returns 0 if allowed, else seconds until one is available"""
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * refill_per_second)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / refill_per_second
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+# Refill, take and store atomically; returns milliseconds to wait (0 when allowed)
+_REDIS_TAKE = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + (now - updated) / 1000 * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return wait
+"""
+
+
+class RedisBucketStore:
+    """Buckets shared by every worker; needs the optional ``redis`` package"""
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("RATE_LIMIT_STORAGE_URL needs the 'redis' package (pip install redis)")
+        self.prefix = prefix
+        self._client = redis.from_url(url)
+        self._take = self._client.register_script(_REDIS_TAKE)
+
+    async def take(self, key: str, capacity: int, refill_per_second: float) -> float:
+        # Server-independent clock in milliseconds; buckets expire once they would be full again
+        wait_ms = await self._take(keys=[self.prefix + key], args=[capacity, refill_per_second, int(time.time() * 1000)])
+        return int(wait_ms) / 1000
+
+
+class RateLimiter:
+    def __init__(self, rules: Dict[Tuple[str, str], List[Limit]], store, trust_forwarded_for: bool = False):
+        self.rules = rules
+        self.store = store
+        self.trust_forwarded_for = trust_forwarded_for
+        self.limited = 0
+
+    def limits_for(self, method: str, path: str) -> Optional[List[Limit]]:
+        return self.rules.get((method, path.rstrip("/") or "/"))
+
+    def client_ip(self, scope, headers: Headers) -> str:
+        if self.trust_forwarded_for and "x-forwarded-for" in headers:
+            return headers["x-forwarded-for"].split(",")[0].strip()
+        return scope["client"][0] if scope.get("client") else "unknown"
+
+    async def check(self, route: str, limits: List[Limit], identities: Dict[str, Optional[str]]) -> float:
+        """Seconds the request must wait, or 0 if it may proceed"""
+        for limit in limits:
+            identity = identities.get(limit.scope)
+            if identity is None:
+                continue
+            wait = await self.store.take(f"{route}|{limit.scope}|{identity}", limit.capacity, limit.refill_per_second)
+            if wait > 0:
+                self.limited += 1
+                return wait
+        return 0.0
+
+
+def _bearer_subject(headers: Headers) -> Optional[str]:
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return decode_access_token(token).get("sub")
+    except ValueError:
+        return None
+
+
+def _body_email(body: bytes) -> Optional[str]:
+    try:
+        email = json.loads(body).get("email")
+    except (ValueError, AttributeError):
+        return None
+    return email.strip().lower() if isinstance(email, str) else None
+
+
+class RateLimitMiddleware:
+    def __init__(self, app, limiter: RateLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        limits = self.limiter.limits_for(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if not limits:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        scopes = {limit.scope for limit in limits}
+        identities = {
+            "route": "*",
+            "ip": self.limiter.client_ip(scope, headers),
+            "user": _bearer_subject(headers) if "user" in scopes else None
+        }
+
+        if "account" in scopes:
+            # Read the body for the account, then replay it to the route
+            messages, size = [], 0
+            while True:
+                message = await receive()
+                messages.append(message)
+                size += len(message.get("body", b""))
+                if not message.get("more_body") or size > MAX_INSPECTED_BODY:
+                    break
+            if size <= MAX_INSPECTED_BODY:
+                identities["account"] = _body_email(b"".join(m.get("body", b"") for m in messages))
+
+            async def replay():
+                return messages.pop(0) if messages else await receive()
+            downstream_receive = replay
+        else:
+            downstream_receive = receive
+
+        wait = await self.limiter.check(f"{scope['method']} {scope['path']}", limits, identities)
+        if wait > 0:
+            retry_after = str(max(1, math.ceil(wait)))
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [(b"content-type", b"application/json"), (b"retry-after", retry_after.encode())]
+            })
+            await send({
+                "type": "http.response.body",
+                "body": json.dumps({"detail": f"Too many requests, retry in {retry_after}s"}).encode()
+            })
+            return
+
+        await self.app(scope, downstream_receive, send)
+
+
+def build_rate_limiter() -> RateLimiter:
+    rules = {
+        ("POST", "/api/auth/login"): parse_limits(settings.RATE_LIMIT_LOGIN),
+        ("POST", "/api/auth/register"): parse_limits(settings.RATE_LIMIT_REGISTER),
+        ("POST", "/api/contact/enquiry"): parse_limits(settings.RATE_LIMIT_ENQUIRY)
+    }
+    store = (
+        RedisBucketStore(settings.RATE_LIMIT_STORAGE_URL) if settings.RATE_LIMIT_STORAGE_URL
+        else MemoryBucketStore(max_keys=settings.RATE_LIMIT_MAX_KEYS)
+    )
+    return RateLimiter(
+        {route: limits for route, limits in rules.items() if limits},
+        store,
+        trust_forwarded_for=settings.RATE_LIMIT_TRUST_FORWARDED_FOR
+    )
@@ -0,0 +1,175 @@
+"""Reconcile gateway settlement reports against the payments table.
+
+The settlement CSV is read as a stream and matched in chunks: each chunk
+costs one lookup by gateway payment id plus one by order id for the rows
+that did not match, so memory is bounded by the chunk size and the query
+count by the number of chunks, however large the file is.
+"""
+import csv
+import io
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.payment import Payment
+
+DEFAULT_CHUNK_SIZE = 5000
+
+ISSUE_MISSING = "missing"
+ISSUE_AMOUNT = "amount_differs"
+ISSUE_STATUS = "status_differs"
+ISSUE_INVALID = "invalid_row"
+
+# Payment statuses consistent with each kind of settlement line
+EXPECTED_STATUSES = {
+    "payment": {"SUCCESS", "REFUNDED"},
+    "refund": {"REFUNDED"}
+}
+
+SETTLEMENT_COLUMNS = ("type", "entity_id", "payment_id", "order_id", "amount")
+
+REPORT_COLUMNS = [
+    "line", "type", "payment_id", "order_id", "settlement_amount",
+    "db_payment_id", "db_amount", "db_status", "issue"
+]
+
+
+class ReconciliationSummary:
+    def __init__(self):
+        self.rows = 0
+        self.matched = 0
+        self.skipped = 0
+        self.issues = {ISSUE_MISSING: 0, ISSUE_AMOUNT: 0, ISSUE_STATUS: 0, ISSUE_INVALID: 0}
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"rows": self.rows, "matched": self.matched, "skipped": self.skipped, **self.issues}
+
+
+def _to_paise(value: str, amount_in_paise: bool) -> int:
+    amount = Decimal(value.replace(",", ""))
+    return int(amount if amount_in_paise else amount * 100)
+
+
+def _lookup(db: Session, column, keys: List[str]) -> Dict[str, Tuple]:
+    if not keys:
+        return {}
+    # Core select on the session's connection: plain tuples, no ORM row processing
+    # and nothing accumulating in the identity map
+    rows = db.connection().execute(select(
+        Payment.id, Payment.razorpay_payment_id, Payment.razorpay_order_id, Payment.total_amount, Payment.status
+    ).where(column.in_(keys)))
+    index = 1 if column is Payment.razorpay_payment_id else 2
+    return {row[index]: row for row in rows}
+
+
+def settlement_columns(header: List[str]) -> Dict[str, int]:
+    """Positions of the columns used for matching; raises ValueError if any are missing"""
+    header = [name.strip().lower() for name in header]
+    columns = {name: header.index(name) for name in SETTLEMENT_COLUMNS if name in header}
+    if "amount" not in columns or not {"entity_id", "payment_id", "order_id"} & columns.keys():
+        raise ValueError("Settlement CSV needs an amount column and a payment_id, entity_id or order_id column")
+    return columns
+
+
+def reconcile(
+    db: Session,
+    lines: Iterable[str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    amount_in_paise: bool = False,
+    summary: Optional[ReconciliationSummary] = None
+) -> Iterator[Dict[str, object]]:
+    """Yield one report row per settlement line that does not match a payment.
+
+    Amounts are rupees unless ``amount_in_paise``. Lines of types other
+    than payment and refund (adjustments, transfers) are skipped. Raises
+    ValueError if the header lacks the columns needed for matching.
+    """
+    summary = summary if summary is not None else ReconciliationSummary()
+    reader = csv.reader(lines)
+    columns = settlement_columns(next(reader, []))
+
+    def field(row: List[str], name: str) -> str:
+        index = columns.get(name)
+        return row[index].strip() if index is not None and index < len(row) else ""
+
+    numbered = enumerate(reader, start=2)  # Line 1 is the header
+    while True:
+        chunk = list(islice(numbered, chunk_size))
+        if not chunk:
+            return
+
+        parsed = []
+        for line, row in chunk:
+            summary.rows += 1
+            kind = field(row, "type").lower() or "payment"
+            if kind not in EXPECTED_STATUSES:
+                summary.skipped += 1
+                continue
+            # Refund lines carry the refund id in entity_id and the original payment in payment_id
+            payment_id = field(row, "payment_id") or (field(row, "entity_id") if kind == "payment" else "")
+            parsed.append((line, kind, payment_id, field(row, "order_id"), field(row, "amount")))
+
+        by_payment_id = _lookup(db, Payment.razorpay_payment_id, list({p[2] for p in parsed if p[2]}))
+        unmatched_orders = {p[3] for p in parsed if p[3] and p[2] not in by_payment_id}
+        by_order_id = _lookup(db, Payment.razorpay_order_id, list(unmatched_orders))
+
+        for line, kind, payment_id, order_id, raw_amount in parsed:
+            payment = by_payment_id.get(payment_id) or by_order_id.get(order_id)
+            if payment is None:
+                issue = ISSUE_MISSING
+            else:
+                try:
+                    amount = _to_paise(raw_amount, amount_in_paise)
+                except (InvalidOperation, ValueError):
+                    issue = ISSUE_INVALID
+                else:
+                    expected = round(payment[3] * 100)
+                    # Refunds may be partial; payments must settle the full amount
+                    amount_ok = amount <= expected if kind == "refund" else amount == expected
+                    if not amount_ok:
+                        issue = ISSUE_AMOUNT
+                    elif payment[4] not in EXPECTED_STATUSES[kind]:
+                        issue = ISSUE_STATUS
+                    else:
+                        summary.matched += 1
+                        continue
+
+            summary.issues[issue] += 1
+            yield {
+                "line": line,
+                "type": kind,
+                "payment_id": payment_id,
+                "order_id": order_id,
+                "settlement_amount": raw_amount,
+                "db_payment_id": payment[0] if payment else None,
+                "db_amount": payment[3] if payment else None,
+                "db_status": payment[4] if payment else None,
+                "issue": issue
+            }
+
+
+def reconcile_csv(
+    db: Session,
+    lines: Iterable[str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    amount_in_paise: bool = False,
+    summary: Optional[ReconciliationSummary] = None
+) -> Iterator[str]:
+    """The mismatch report as CSV text, yielded in pieces of up to ``chunk_size`` rows"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=REPORT_COLUMNS)
+    writer.writeheader()
+
+    pending = 0
+    for mismatch in reconcile(db, lines, chunk_size, amount_in_paise, summary):
+        writer.writerow(mismatch)
+        pending += 1
+        if pending >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
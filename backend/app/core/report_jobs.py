@@ -0,0 +1,182 @@
+"""Background admin report jobs executed in a bounded process pool"""
+import asyncio
+import hashlib
+import inspect
+import json
+import logging
+import multiprocessing
+import threading
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.reports import REPORTS, data_version
+from app.db.session import SessionLocal
+from app.db.sqlite import BEGIN_OPTION
+from app.models.report_job import ReportJob
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("QUEUED", "RUNNING")
+
+
+class ReportQueueFull(Exception):
+    pass
+
+
+def _run_report_job(job_id: str, report_type: str, params: Dict[str, Any]) -> None:
+    """Build a report inside a pool worker and persist the outcome"""
+    db = SessionLocal()
+    try:
+        job = db.get(ReportJob, job_id)
+        job.status = "RUNNING"
+        job.started_at = datetime.utcnow()
+        db.commit()
+
+        try:
+            # Reports only read: on SQLite, build them outside the write lock
+            db.connection(execution_options={BEGIN_OPTION: "DEFERRED"})
+            result = REPORTS[report_type](db, **params)
+        except Exception as e:
+            db.rollback()
+            job.status = "FAILED"
+            job.error = str(e)
+        else:
+            db.rollback()
+            job.status = "SUCCEEDED"
+            job.result = result
+        job.finished_at = datetime.utcnow()
+        db.commit()
+    finally:
+        db.close()
+
+
+def _mark_failed(job_id: str, error: str) -> None:
+    db = SessionLocal()
+    try:
+        job = db.get(ReportJob, job_id)
+        if job and job.status in ACTIVE_STATUSES:
+            job.status = "FAILED"
+            job.error = error
+            job.finished_at = datetime.utcnow()
+            db.commit()
+    finally:
+        db.close()
+
+
+def params_hash(report_type: str, params: Dict[str, Any]) -> str:
+    canonical = json.dumps({"report_type": report_type, "params": params}, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class ReportJobManager:
+    """Submits report jobs, deduplicating identical requests.
+
+    A request is served by an existing job when one with the same report
+    type, parameters and data version is still running or has succeeded,
+    so results stay cached until the underlying data changes.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, job_timeout: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.job_timeout = job_timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawned (not forked) workers never inherit the server's threads or pooled connections
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def submit(self, db: Session, report_type: str, params: Dict[str, Any]) -> ReportJob:
+        if report_type not in REPORTS:
+            raise ValueError(f"Unknown report type '{report_type}'. Available: {', '.join(REPORTS)}")
+        try:
+            inspect.signature(REPORTS[report_type]).bind(db, **params)
+        except TypeError as e:
+            raise ValueError(f"Invalid parameters for '{report_type}' report: {e}")
+
+        key = params_hash(report_type, params)
+        version = data_version(db)
+
+        with self._lock:
+            existing = db.query(ReportJob).filter(
+                ReportJob.params_hash == key,
+                ReportJob.data_version == version,
+                ReportJob.status != "FAILED"
+            ).order_by(ReportJob.created_at.desc()).first()
+
+            stale_before = datetime.utcnow() - timedelta(seconds=self.job_timeout)
+            if existing and (existing.status == "SUCCEEDED" or existing.created_at >= stale_before):
+                return existing
+
+            if len(self._futures) >= self.max_pending:
+                raise ReportQueueFull()
+
+            job = ReportJob(
+                id=uuid.uuid4().hex,
+                report_type=report_type,
+                params=params,
+                params_hash=key,
+                data_version=version,
+                status="QUEUED"
+            )
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+
+            future = self._get_executor().submit(_run_report_job, job.id, report_type, params)
+            self._futures[job.id] = future
+            future.add_done_callback(partial(self._on_done, job.id))
+
+        return job
+
+    def _on_done(self, job_id: str, future: Future) -> None:
+        error = future.exception() if not future.cancelled() else None
+        with self._lock:
+            self._futures.pop(job_id, None)
+            if isinstance(error, BrokenProcessPool):
+                # A worker died; start a fresh pool for the next submission
+                self._executor = None
+        if future.cancelled() or error is not None:
+            # The worker never got to record an outcome (e.g. it crashed)
+            logger.error("Report job %s did not complete: %s", job_id, error or "cancelled")
+            _mark_failed(job_id, str(error) if error else "Job cancelled")
+
+    def is_local(self, job_id: str) -> bool:
+        return job_id in self._futures
+
+    async def wait(self, job_id: str, timeout: float) -> None:
+        """Wait up to ``timeout`` seconds for a job submitted by this process"""
+        future = self._futures.get(job_id)
+        if future is None:
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+        except Exception:
+            # Timeouts and job failures alike: the caller reads the outcome from the database
+            pass
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+report_jobs = ReportJobManager(
+    max_workers=settings.REPORT_WORKERS,
+    max_pending=settings.REPORT_MAX_PENDING,
+    job_timeout=settings.REPORT_JOB_TIMEOUT_SECONDS
+)
@@ -0,0 +1,212 @@
+"""Admin report builders shared by the synchronous admin endpoints and the
+background report jobs."""
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import desc, func
+from sqlalchemy.orm import Session
+
+from app.core.analytics import funnel_report
+from app.models.appointment import Appointment
+from app.models.hospital import Hospital
+from app.models.payment import Payment
+from app.models.user import User
+
+
+def payment_tracking_report(
+    db: Session,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    hospital_id: Optional[int] = None
+) -> Dict[str, Any]:
+    """Detailed payment tracking with commission breakdown"""
+
+    # Names come from the same query; Appointment has no relationships to load them lazily
+    query = db.query(Payment, Hospital.name, User.name).join(
+        Appointment, Appointment.id == Payment.appointment_id
+    ).join(
+        Hospital, Hospital.id == Appointment.hospital_id
+    ).outerjoin(
+        User, User.id == Appointment.patient_id
+    )
+
+    # Date filtering
+    if start_date:
+        start = datetime.fromisoformat(start_date)
+        query = query.filter(Payment.created_at >= start)
+
+    if end_date:
+        end = datetime.fromisoformat(end_date)
+        query = query.filter(Payment.created_at <= end)
+
+    # Hospital filtering
+    if hospital_id:
+        query = query.filter(Appointment.hospital_id == hospital_id)
+
+    # Only successful payments
+    query = query.filter(Payment.status == "SUCCESS")
+
+    rows = query.order_by(desc(Payment.created_at)).all()
+
+    # Calculate totals
+    total_amount = sum(p.total_amount for p, _, _ in rows)
+    total_commission = sum(p.admin_commission for p, _, _ in rows)
+    total_hospital_payout = sum(p.hospital_payout for p, _, _ in rows)
+
+    return {
+        "summary": {
+            "total_payments": len(rows),
+            "total_amount": float(total_amount),
+            "total_commission": float(total_commission),
+            "total_hospital_payout": float(total_hospital_payout),
+            "commission_rate": float(total_commission / total_amount * 100) if total_amount > 0 else 0
+        },
+        "payments": [
+            {
+                "id": p.id,
+                "appointment_id": p.appointment_id,
+                "hospital_name": hospital_name or "Unknown",
+                "patient_name": patient_name or "Unknown",
+                "total_amount": float(p.total_amount),
+                "admin_commission": float(p.admin_commission),
+                "hospital_payout": float(p.hospital_payout),
+                "commission_percentage": float(p.admin_commission / p.total_amount * 100) if p.total_amount > 0 else 0,
+                "status": p.status,
+                "created_at": p.created_at.isoformat() if p.created_at else None
+            }
+            for p, hospital_name, patient_name in rows
+        ]
+    }
+
+
+def hospital_performance_report(db: Session) -> Dict[str, Any]:
+    """Performance metrics for all approved hospitals"""
+
+    hospitals = db.query(Hospital).filter(Hospital.is_approved == True).all()
+
+    # One grouped query per figure rather than three queries per hospital
+    appointment_counts = dict(
+        db.query(Appointment.hospital_id, func.count(Appointment.id)).group_by(Appointment.hospital_id).all()
+    )
+    payment_totals = {
+        hospital_id: (revenue or 0, commission or 0)
+        for hospital_id, revenue, commission in db.query(
+            Appointment.hospital_id, func.sum(Payment.total_amount), func.sum(Payment.admin_commission)
+        ).select_from(Payment).join(
+            Appointment, Appointment.id == Payment.appointment_id
+        ).filter(Payment.status == "SUCCESS").group_by(Appointment.hospital_id)
+    }
+
+    performance_data = []
+    for hospital in hospitals:
+        revenue, commission = payment_totals.get(hospital.id, (0, 0))
+        performance_data.append({
+            "hospital_id": hospital.id,
+            "hospital_name": hospital.name,
+            "city": hospital.city,
+            "appointments_count": appointment_counts.get(hospital.id, 0),
+            "total_revenue": float(revenue),
+            "commission_earned": float(commission),
+            "hospital_payout": float(revenue - commission)
+        })
+
+    # Sort by revenue
+    performance_data.sort(key=lambda x: x["total_revenue"], reverse=True)
+
+    return {
+        "hospitals": performance_data,
+        "summary": {
+            "total_hospitals": len(performance_data),
+            "total_revenue": sum(h["total_revenue"] for h in performance_data),
+            "total_commission": sum(h["commission_earned"] for h in performance_data)
+        }
+    }
+
+
+def revenue_report(db: Session, start_date: str, end_date: Optional[str] = None) -> Dict[str, Any]:
+    """Daily revenue between two ISO dates (end defaults to now)"""
+
+    start = datetime.fromisoformat(start_date)
+    end = datetime.fromisoformat(end_date) if end_date else datetime.now()
+
+    # Get payments grouped by date
+    payments = db.query(
+        func.date(Payment.created_at).label('date'),
+        func.sum(Payment.total_amount).label('revenue'),
+        func.sum(Payment.admin_commission).label('commission'),
+        func.count(Payment.id).label('payment_count')
+    ).filter(
+        Payment.status == "SUCCESS",
+        Payment.created_at >= start,
+        Payment.created_at <= end
+    ).group_by(func.date(Payment.created_at)).all()
+
+    return {
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "data": [
+            {
+                "date": str(p.date),
+                "revenue": float(p.revenue or 0),
+                "commission": float(p.commission or 0),
+                "payment_count": p.payment_count or 0
+            }
+            for p in payments
+        ],
+        "summary": {
+            "total_revenue": float(sum(p.revenue or 0 for p in payments)),
+            "total_commission": float(sum(p.commission or 0 for p in payments)),
+            "total_payments": sum(p.payment_count or 0 for p in payments)
+        }
+    }
+
+
+def funnel_analytics_report(
+    db: Session,
+    period: str = "month",
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    hospital_id: Optional[int] = None
+) -> Dict[str, Any]:
+    """Booking-to-payment funnel, cohort retention and time-to-payment percentiles"""
+
+    start = datetime.fromisoformat(start_date) if start_date else None
+    end = datetime.fromisoformat(end_date) if end_date else None
+
+    report = funnel_report(db, period=period, start=start, end=end, hospital_id=hospital_id)
+    return {
+        "period": period,
+        "start_date": start.isoformat() if start else None,
+        "end_date": end.isoformat() if end else None,
+        **report
+    }
+
+
+# Reports that can be run as background jobs
+REPORTS = {
+    "performance": hospital_performance_report,
+    "payment_tracking": payment_tracking_report,
+    "revenue": revenue_report,
+    "funnel": funnel_analytics_report
+}
+
+
+def data_version(db: Session) -> str:
+    """Version of the data the reports read, from indexed lookups only.
+
+    Every insert or update stamps updated_at on the row, so the newest
+    stamp of each table the reports read moves with any change to a column
+    they output. Hospitals are also counted, as deleting one changes the
+    reports; that table stays small. Nothing is written to keep it current,
+    so writers never contend for it.
+
+    SQLite flushes under the write lock, so stamps follow commit order. On
+    Postgres a transaction committing after a later-stamped one can go
+    unseen until the next write.
+    """
+    watermarks = [
+        db.query(func.max(model.updated_at)).scalar()
+        for model in (Appointment, Payment, Hospital, User)
+    ]
+    hospitals = db.query(func.count(Hospital.id)).scalar()
+    return "|".join(str(value) for value in (*watermarks, hospitals))
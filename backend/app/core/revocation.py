@@ -0,0 +1,129 @@
+"""Revocation set for stateless access tokens.
+
+Access tokens are checked against a Bloom filter of revoked keys held in
+memory, so the usual (not revoked) answer costs one hash and no I/O.
+Only a Bloom hit, i.e. a revoked token or the rare false positive, is
+confirmed against the revoked_tokens table.
+
+Two kinds of key are stored: ``jti:<token id>`` for a single token (e.g.
+on logout) and ``user:<id>`` for every token a user was issued before a
+time (deactivation, role change). Workers pick up revocations made
+elsewhere by reading new rows at most once per ``sync_interval`` seconds.
+Rows outlive the tokens they can match by no more than the access token
+lifetime and are pruned whenever the filter is rebuilt.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.bloom import BloomFilter
+from app.core.config import settings
+from app.db.session import SessionLocal, read_engine
+from app.models.revoked_token import RevokedToken
+
+
+class TokenRevocations:
+    def __init__(self, capacity: int, error_rate: float, sync_interval: float, token_lifetime: timedelta):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.token_lifetime = token_lifetime
+        self.checks = 0
+        self.bloom_hits = 0  # Checks that needed the database
+        self.revoked = 0
+        self._bloom: Optional[BloomFilter] = None
+        self._last_id = 0
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+
+    def _rebuild(self, db: Session) -> None:
+        db.query(RevokedToken).filter(RevokedToken.expires_at < datetime.utcnow()).delete(synchronize_session=False)
+        db.commit()
+        rows = db.query(RevokedToken.id, RevokedToken.key).all()
+        bloom = BloomFilter(max(self.capacity, 2 * len(rows)), self.error_rate)
+        for _, key in rows:
+            bloom.add(key)
+        self._bloom = bloom
+        self._last_id = max((row_id for row_id, _ in rows), default=self._last_id)
+
+    def _sync(self) -> None:
+        if self._bloom is not None and time.monotonic() - self._synced_at < self.sync_interval:
+            return
+        with self._lock:
+            if self._bloom is not None and time.monotonic() - self._synced_at < self.sync_interval:
+                return
+            db = SessionLocal(bind=read_engine)
+            try:
+                if self._bloom is None:
+                    self._rebuild(db)
+                else:
+                    for row_id, key in db.query(RevokedToken.id, RevokedToken.key).filter(
+                        RevokedToken.id > self._last_id
+                    ).order_by(RevokedToken.id):
+                        self._bloom.add(key)
+                        self._last_id = row_id
+                    if self._bloom.count > self._bloom.capacity:
+                        self._rebuild(db)
+            finally:
+                db.close()
+            self._synced_at = time.monotonic()
+
+    def is_revoked(self, db: Session, claims: Dict[str, Any]) -> bool:
+        """Whether the decoded access token ``claims`` have been revoked"""
+        self._sync()
+        bloom = self._bloom
+        self.checks += 1
+
+        revoked = False
+        jti_key = f"jti:{claims.get('jti')}"
+        if claims.get("jti") and jti_key in bloom:
+            self.bloom_hits += 1
+            revoked = db.query(RevokedToken.id).filter(RevokedToken.key == jti_key).first() is not None
+
+        user_key = f"user:{claims.get('sub')}"
+        if not revoked and user_key in bloom:
+            self.bloom_hits += 1
+            revoked_before = db.query(func.max(RevokedToken.revoked_before)).filter(
+                RevokedToken.key == user_key
+            ).scalar()
+            # Tokens without an issue time count as issued at the epoch, so are revoked too
+            revoked = revoked_before is not None and float(claims.get("iat") or 0) < revoked_before
+
+        self.revoked += revoked
+        return revoked
+
+    def _add(self, db: Session, key: str, expires_at: datetime, revoked_before: Optional[float] = None) -> None:
+        db.add(RevokedToken(key=key, revoked_before=revoked_before, expires_at=expires_at))
+        self._sync()
+        self._bloom.add(key)
+
+    def revoke_token(self, db: Session, jti: str, expires_at: datetime) -> None:
+        """Revoke one access token in the caller's transaction"""
+        self._add(db, f"jti:{jti}", expires_at)
+
+    def revoke_user(self, db: Session, user_id: int) -> None:
+        """Revoke every access token issued to a user so far, in the caller's transaction"""
+        self._add(db, f"user:{user_id}", datetime.utcnow() + self.token_lifetime, revoked_before=time.time())
+
+    def stats(self) -> Dict[str, Any]:
+        bloom = self._bloom
+        return {
+            "insertions": bloom.count if bloom else 0,
+            "capacity": bloom.capacity if bloom else self.capacity,
+            "filter_bytes": bloom.bits.nbytes if bloom else 0,
+            "checks": self.checks,
+            "bloom_hits": self.bloom_hits,
+            "revoked": self.revoked
+        }
+
+
+token_revocations = TokenRevocations(
+    capacity=settings.TOKEN_REVOCATION_CAPACITY,
+    error_rate=settings.TOKEN_REVOCATION_ERROR_RATE,
+    sync_interval=settings.TOKEN_REVOCATION_SYNC_SECONDS,
+    token_lifetime=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+)
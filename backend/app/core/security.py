@@ -1,13 +1,21 @@
+import time
+import uuid
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing; hashes made with any other cost are flagged for rehashing
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS
+)
 
 
 def get_password_hash(password: str) -> str:
@@ -18,31 +26,55 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password; also returns a fresh hash when the stored one uses outdated parameters"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
 # JWT utilities
 
+def _encode(claims: dict) -> str:
+    return jwt.encode(claims, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+    """Short-lived token; its claims (sub, role) are trusted without a user lookup until it expires"""
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
 
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(
-        to_encode,
-        settings.SECRET_KEY,
-        algorithm=settings.ALGORITHM
-    )
-    return encoded_jwt
+    # Fractional iat, so a revocation only catches tokens issued strictly before it
+    to_encode.update({"exp": expire, "iat": time.time(), "jti": uuid.uuid4().hex, "type": "access"})
+    return _encode(to_encode)
 
 
-def decode_access_token(token: str) -> dict:
+def create_refresh_token(user_id: int, jti: str, family_id: str, expires_at: datetime) -> str:
+    return _encode({"sub": str(user_id), "jti": jti, "fam": family_id, "exp": expires_at, "type": "refresh"})
+
+
+def _decode(token: str) -> dict:
     try:
-        payload = jwt.decode(
+        return jwt.decode(
             token,
             settings.SECRET_KEY,
             algorithms=[settings.ALGORITHM]
         )
-        return payload
     except JWTError:
         raise ValueError("Invalid or expired token")
+
+
+def decode_access_token(token: str) -> dict:
+    payload = _decode(token)
+    # Tokens issued before refresh support have no type and are access tokens
+    if payload.get("type", "access") != "access":
+        raise ValueError("Not an access token")
+    return payload
+
+
+def decode_refresh_token(token: str) -> dict:
+    payload = _decode(token)
+    if payload.get("type") != "refresh":
+        raise ValueError("Not a refresh token")
+    return payload
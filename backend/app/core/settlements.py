@@ -0,0 +1,166 @@
+"""Hospital payout settlement.
+
+A settlement run groups every successful, not yet settled payment in a
+period into one batch per hospital. Payments refunded after they were
+settled are taken back in the same run: each is linked to its hospital's
+new batch as a refund and subtracted from its totals, whatever period it
+was settled in. The run is a fixed number of set-based statements
+regardless of how many payments it covers:
+
+1. backfill paise ledger amounts for payments created before the ledger,
+2. insert an empty batch per hospital with eligible payments or refunds,
+3. link the eligible payments and refunds to their hospital's batch,
+4. total each batch from exactly the payments linked to it, net of refunds,
+5. drop batches that ended up empty (a concurrent run got there first).
+
+Totals are integer paise, so they are exact and sum in the database. A
+batch whose refunds outweigh its payments has a negative payout: money
+the hospital owes back.
+"""
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import BigInteger, and_, cast, func, insert, literal, or_, select, text
+from sqlalchemy.orm import Session
+
+from app.models.appointment import Appointment
+from app.models.payment import Payment
+from app.models.settlement_batch import SettlementBatch
+
+# Serializes settlement runs on Postgres; SQLite already allows one writer at a time
+SETTLEMENT_LOCK_KEY = 0x5E771E
+
+
+def to_paise(amount: float) -> int:
+    return int(round(amount * 100))
+
+
+def ledger_amounts(total_amount: float, admin_commission: float) -> Dict[str, int]:
+    """Paise ledger columns for a new payment; payout is the exact remainder"""
+    amount_paise = to_paise(total_amount)
+    commission_paise = to_paise(admin_commission)
+    return {
+        "amount_paise": amount_paise,
+        "commission_paise": commission_paise,
+        "payout_paise": amount_paise - commission_paise
+    }
+
+
+def _backfill_ledger(db: Session) -> int:
+    amount = cast(func.round(Payment.total_amount * 100), BigInteger)
+    commission = cast(func.round(Payment.admin_commission * 100), BigInteger)
+    return db.query(Payment).filter(Payment.amount_paise.is_(None)).update({
+        Payment.amount_paise: amount,
+        Payment.commission_paise: commission,
+        Payment.payout_paise: amount - commission
+    }, synchronize_session=False)
+
+
+def settle_payments(db: Session, period_end: datetime, period_start: Optional[datetime] = None) -> Dict[str, Any]:
+    """Create payout batches for successful payments created before ``period_end``,
+    less the payouts of settled payments refunded since the last run"""
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SETTLEMENT_LOCK_KEY})
+
+    run_id = uuid.uuid4().hex
+    now = datetime.utcnow()
+
+    _backfill_ledger(db)
+
+    eligible = [
+        Payment.status == "SUCCESS",
+        Payment.settlement_batch_id.is_(None),
+        Payment.created_at < period_end
+    ]
+    if period_start:
+        eligible.append(Payment.created_at >= period_start)
+
+    # Settled, then refunded, and not yet taken back
+    refunded = [
+        Payment.status == "REFUNDED",
+        Payment.settlement_batch_id.isnot(None),
+        Payment.refund_batch_id.is_(None)
+    ]
+
+    # 2. One empty batch per hospital with something to settle or take back
+    hospitals = select(
+        Appointment.hospital_id,
+        literal(run_id),
+        literal(period_start),
+        literal(period_end),
+        literal(0), literal(0), literal(0), literal(0), literal(0),
+        literal("PENDING"),
+        literal(now)
+    ).select_from(Payment).join(Appointment, Appointment.id == Payment.appointment_id).where(
+        or_(and_(*eligible), and_(*refunded))
+    ).group_by(Appointment.hospital_id)
+    db.execute(insert(SettlementBatch).from_select([
+        "hospital_id", "run_id", "period_start", "period_end",
+        "payment_count", "refund_count", "gross_paise", "commission_paise", "payout_paise",
+        "status", "created_at"
+    ], hospitals))
+
+    # 3. Link payments and refunds to their hospital's batch from this run
+    batch_for_payment = select(SettlementBatch.id).join(
+        Appointment, Appointment.hospital_id == SettlementBatch.hospital_id
+    ).where(
+        Appointment.id == Payment.appointment_id,
+        SettlementBatch.run_id == run_id
+    ).scalar_subquery()
+    db.query(Payment).filter(*eligible).update(
+        {Payment.settlement_batch_id: batch_for_payment},
+        synchronize_session=False
+    )
+    db.query(Payment).filter(*refunded).update(
+        {Payment.refund_batch_id: batch_for_payment},
+        synchronize_session=False
+    )
+
+    # 4. Totals from exactly the linked payments, less the linked refunds
+    def linked(aggregate, batch_column):
+        return select(aggregate).where(batch_column == SettlementBatch.id).scalar_subquery()
+
+    def total(column):
+        return (
+            linked(func.coalesce(func.sum(column), 0), Payment.settlement_batch_id)
+            - linked(func.coalesce(func.sum(column), 0), Payment.refund_batch_id)
+        )
+
+    db.query(SettlementBatch).filter(SettlementBatch.run_id == run_id).update({
+        SettlementBatch.payment_count: linked(func.count(Payment.id), Payment.settlement_batch_id),
+        SettlementBatch.refund_count: linked(func.count(Payment.id), Payment.refund_batch_id),
+        SettlementBatch.gross_paise: total(Payment.amount_paise),
+        SettlementBatch.commission_paise: total(Payment.commission_paise),
+        SettlementBatch.payout_paise: total(Payment.payout_paise)
+    }, synchronize_session=False)
+
+    # 5. Batches whose payments and refunds were taken by a concurrent run
+    db.query(SettlementBatch).filter(
+        SettlementBatch.run_id == run_id,
+        SettlementBatch.payment_count == 0,
+        SettlementBatch.refund_count == 0
+    ).delete(synchronize_session=False)
+
+    db.commit()
+
+    totals = db.query(
+        func.count(SettlementBatch.id),
+        func.coalesce(func.sum(SettlementBatch.payment_count), 0),
+        func.coalesce(func.sum(SettlementBatch.refund_count), 0),
+        func.coalesce(func.sum(SettlementBatch.gross_paise), 0),
+        func.coalesce(func.sum(SettlementBatch.commission_paise), 0),
+        func.coalesce(func.sum(SettlementBatch.payout_paise), 0)
+    ).filter(SettlementBatch.run_id == run_id).one()
+
+    return {
+        "run_id": run_id,
+        "period_start": period_start.isoformat() if period_start else None,
+        "period_end": period_end.isoformat(),
+        "batches": totals[0],
+        "payments": totals[1],
+        "refunds": totals[2],
+        "gross_paise": int(totals[3]),
+        "commission_paise": int(totals[4]),
+        "payout_paise": int(totals[5])
+    }
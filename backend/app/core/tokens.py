@@ -0,0 +1,86 @@
+"""Access/refresh token pairs with refresh-token rotation.
+
+Each refresh returns a new pair and retires the refresh token it used.
+Presenting a retired refresh token again means it was copied, so every
+token descended from the same login (its family) is revoked. Renewal
+reads only the refresh_tokens row and the cached principal; it never
+hashes a password.
+"""
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.principals import Principal, principal_cache
+from app.core.security import create_access_token, create_refresh_token, decode_refresh_token
+from app.models.refresh_token import RefreshToken
+
+
+class InvalidRefreshToken(Exception):
+    pass
+
+
+def issue_tokens(db: Session, principal: Principal, family_id: Optional[str] = None) -> Dict[str, Any]:
+    """Create an access token and a refresh token for ``principal``, committing the latter"""
+    jti = uuid.uuid4().hex
+    family_id = family_id or uuid.uuid4().hex
+    expires_at = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    db.add(RefreshToken(jti=jti, user_id=principal.id, family_id=family_id, expires_at=expires_at))
+    db.commit()
+
+    return {
+        "access_token": create_access_token(data={"sub": str(principal.id), "role": principal.role}),
+        "refresh_token": create_refresh_token(principal.id, jti, family_id, expires_at),
+        "token_type": "bearer",
+        "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    }
+
+
+def _revoke_family(db: Session, family_id: str) -> None:
+    db.query(RefreshToken).filter(
+        RefreshToken.family_id == family_id,
+        RefreshToken.revoked_at.is_(None)
+    ).update({RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+
+
+def rotate_refresh_token(db: Session, refresh_token: str) -> Dict[str, Any]:
+    """Exchange a refresh token for a new pair; raises InvalidRefreshToken"""
+    try:
+        claims = decode_refresh_token(refresh_token)
+    except ValueError as e:
+        raise InvalidRefreshToken(str(e))
+
+    now = datetime.utcnow()
+    # Conditional, so of two concurrent uses of one token only one succeeds
+    claimed = db.query(RefreshToken).filter(
+        RefreshToken.jti == claims["jti"],
+        RefreshToken.used_at.is_(None),
+        RefreshToken.revoked_at.is_(None),
+        RefreshToken.expires_at > now
+    ).update({RefreshToken.used_at: now}, synchronize_session=False)
+    if not claimed:
+        db.rollback()
+        token = db.get(RefreshToken, claims["jti"])
+        if token is not None and token.used_at is not None:
+            _revoke_family(db, token.family_id)
+            raise InvalidRefreshToken("Refresh token reuse detected; please sign in again")
+        raise InvalidRefreshToken("Refresh token revoked or expired")
+
+    principal = principal_cache.get(db, int(claims["sub"]))
+    if not principal or not principal.is_active:
+        db.rollback()
+        raise InvalidRefreshToken("Inactive or invalid user")
+
+    return issue_tokens(db, principal, family_id=claims["fam"])
+
+
+def revoke_refresh_token(db: Session, refresh_token: str) -> None:
+    """Sign out: revoke the refresh token's whole family"""
+    try:
+        claims = decode_refresh_token(refresh_token)
+    except ValueError as e:
+        raise InvalidRefreshToken(str(e))
+    _revoke_family(db, claims["fam"])
@@ -0,0 +1,151 @@
+"""Approximate distinct-patient counts backed by per-(hospital, day) HyperLogLog sketches"""
+import logging
+from collections import defaultdict
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.hll import HyperLogLog, precision_for_error, standard_error
+from app.models.appointment import Appointment
+from app.models.patient_sketch import PatientSketch
+
+logger = logging.getLogger(__name__)
+
+
+def record_patient_visit(db: Session, hospital_id: int, patient_id: int, day: date) -> None:
+    """Add a patient to the (hospital, day) sketch and commit.
+
+    Runs after the booking itself has been committed, so a failure here is
+    logged rather than surfaced to the patient.
+    """
+    try:
+        _add_to_sketch(db, hospital_id, patient_id, day)
+    except SQLAlchemyError:
+        db.rollback()
+        logger.exception("Failed to update patient sketch for hospital %s on %s", hospital_id, day)
+
+
+def _add_to_sketch(db: Session, hospital_id: int, patient_id: int, day: date) -> None:
+    for _ in range(2):
+        sketch = db.query(PatientSketch).filter(
+            PatientSketch.hospital_id == hospital_id,
+            PatientSketch.day == day
+        ).with_for_update().first()
+
+        if sketch:
+            hll = HyperLogLog.from_bytes(sketch.registers)
+            if not hll.add(patient_id):
+                # Repeat patients usually leave the sketch unchanged; skip the write
+                db.rollback()
+                return
+            sketch.registers = hll.to_bytes()
+        else:
+            hll = HyperLogLog(settings.HLL_PRECISION)
+            hll.add(patient_id)
+            db.add(PatientSketch(
+                hospital_id=hospital_id,
+                day=day,
+                precision=hll.precision,
+                registers=hll.to_bytes()
+            ))
+
+        try:
+            db.commit()
+            return
+        except IntegrityError:
+            # Another booking created the row first; merge into it instead
+            db.rollback()
+
+
+def rebuild_patient_sketches(db: Session) -> int:
+    """Rebuild every sketch from the appointments table; returns the number of sketches"""
+    sketches: Dict[tuple, HyperLogLog] = defaultdict(lambda: HyperLogLog(settings.HLL_PRECISION))
+    rows = db.query(
+        Appointment.hospital_id,
+        func.date(Appointment.appointment_date),
+        Appointment.patient_id
+    ).execution_options(yield_per=50_000)
+    for hospital_id, day, patient_id in rows:
+        sketches[(hospital_id, str(day))].add(patient_id)
+
+    db.query(PatientSketch).delete()
+    db.bulk_save_objects([
+        PatientSketch(
+            hospital_id=hospital_id,
+            day=date.fromisoformat(day),
+            precision=hll.precision,
+            registers=hll.to_bytes()
+        )
+        for (hospital_id, day), hll in sketches.items()
+    ])
+    db.commit()
+    return len(sketches)
+
+
+def _period_key(day: date, group_by: str) -> str:
+    if group_by == "day":
+        return day.isoformat()
+    if group_by == "month":
+        return day.strftime("%Y-%m")
+    return "all"
+
+
+def unique_patients(
+    db: Session,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    hospital_ids: Optional[List[int]] = None,
+    group_by: str = "month",
+    max_error: Optional[float] = None
+) -> Dict[str, Any]:
+    """Merge stored sketches into per-hospital, per-period and overall estimates.
+
+    ``max_error`` trades accuracy for speed by folding sketches down to the
+    coarsest precision that still meets the requested standard error; it can
+    never be tighter than the precision the sketches were stored at.
+    """
+    query = db.query(PatientSketch.hospital_id, PatientSketch.day, PatientSketch.registers)
+    if start:
+        query = query.filter(PatientSketch.day >= start)
+    if end:
+        query = query.filter(PatientSketch.day <= end)
+    if hospital_ids:
+        query = query.filter(PatientSketch.hospital_id.in_(hospital_ids))
+
+    precision = settings.HLL_PRECISION
+    if max_error:
+        precision = min(precision_for_error(max_error), precision)
+
+    groups: Dict[tuple, HyperLogLog] = {}
+    total = HyperLogLog(precision)
+    for hospital_id, day, registers in query.execution_options(yield_per=10_000):
+        hll = HyperLogLog.from_bytes(registers)
+        if hll.precision > precision:
+            hll = hll.reduce(precision)
+        elif hll.precision < precision:
+            # Sketches written under an older, coarser setting bound the precision
+            precision = hll.precision
+            total = total.reduce(precision)
+            groups = {key: g.reduce(precision) for key, g in groups.items()}
+
+        key = (hospital_id, _period_key(day, group_by))
+        if key in groups:
+            groups[key].merge(hll)
+        else:
+            groups[key] = hll
+        total.merge(hll)
+
+    return {
+        "precision": precision,
+        "standard_error": round(standard_error(precision), 5),
+        "group_by": group_by,
+        "hospitals": [
+            {"hospital_id": hospital_id, "period": period, "unique_patients": hll.estimate()}
+            for (hospital_id, period), hll in sorted(groups.items())
+        ],
+        "total_unique_patients": total.estimate()
+    }
@@ -0,0 +1,298 @@
+"""Gateway webhook ingestion.
+
+Receiving and applying events are decoupled. The webhook endpoint hands
+each verified event to ``webhook_queue``, which group-commits everything
+that arrived while the previous INSERT was running, so a burst costs a
+handful of transactions rather than one per event. ``webhook_processor``
+then applies stored events to payments and appointments in batches; if a
+batch fails, its events are retried one at a time, and an event that keeps
+failing is set aside as FAILED rather than holding back the queue.
+"""
+import asyncio
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, or_
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.events import dashboard_feed
+from app.core.payments import mark_payment_captured, mark_payment_failed, mark_payment_refunded
+from app.db.session import SessionLocal
+from app.models.payment import Payment
+from app.models.webhook_event import WebhookEvent
+
+logger = logging.getLogger(__name__)
+
+HANDLED_EVENTS = {"payment.captured", "payment.failed", "refund.processed"}
+
+
+def _insert_ignoring_duplicates(db: Session, rows: List[Dict[str, Any]]) -> None:
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        existing = {
+            event_id for (event_id,) in db.query(WebhookEvent.event_id).filter(
+                WebhookEvent.event_id.in_([row["event_id"] for row in rows])
+            )
+        }
+        rows = [row for row in rows if row["event_id"] not in existing]
+        if rows:
+            db.execute(insert(WebhookEvent), rows)
+        return
+    db.execute(dialect_insert(WebhookEvent).on_conflict_do_nothing(index_elements=["event_id"]), rows)
+
+
+class WebhookQueue:
+    """Durably stores incoming events using group commit"""
+
+    def __init__(self, max_batch: int, on_flush: Optional[Callable[[], None]] = None):
+        self.max_batch = max_batch
+        self.on_flush = on_flush
+        self._queue: "queue.Queue[Optional[Tuple[Dict[str, Any], Future]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="webhook-writer", daemon=True)
+                self._thread.start()
+
+    async def enqueue(self, event_id: str, event_type: str, payload: Dict[str, Any]) -> None:
+        """Returns once the event is committed; duplicates of stored events are dropped"""
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put(({
+            "event_id": event_id,
+            "event_type": event_type,
+            "payload": payload,
+            "status": "PENDING",
+            "received_at": datetime.utcnow()
+        }, future))
+        await asyncio.wrap_future(future)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            # Everything that queued up during the last commit goes into this one
+            batch = [item]
+            stopping = False
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+            if stopping:
+                return
+
+    def _flush(self, batch: List[Tuple[Dict[str, Any], Future]]) -> None:
+        rows = list({row["event_id"]: row for row, _ in batch}.values())
+        db = SessionLocal()
+        try:
+            _insert_ignoring_duplicates(db, rows)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.exception("Failed to store %d webhook events", len(rows))
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        finally:
+            db.close()
+
+        for _, future in batch:
+            future.set_result(None)
+        if self.on_flush:
+            self.on_flush()
+
+    def shutdown(self) -> None:
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+def _entity(event: WebhookEvent, name: str) -> Dict[str, Any]:
+    return event.payload["payload"][name]["entity"]
+
+
+def apply_webhook_events(db: Session, events: List[WebhookEvent]) -> List[Payment]:
+    """Apply events in order; returns payments that became successful"""
+    now = datetime.utcnow()
+    order_ids, gateway_payment_ids = set(), set()
+    for event in events:
+        if event.event_type in HANDLED_EVENTS:
+            try:
+                entity = _entity(event, "payment")
+            except (KeyError, TypeError):
+                continue
+            if entity.get("order_id"):
+                order_ids.add(entity["order_id"])
+            if entity.get("id"):
+                gateway_payment_ids.add(entity["id"])
+
+    # Two queries for the whole batch instead of two per event
+    payments = db.query(Payment).filter(or_(
+        Payment.razorpay_order_id.in_(list(order_ids)),
+        Payment.razorpay_payment_id.in_(list(gateway_payment_ids))
+    )).all() if order_ids or gateway_payment_ids else []
+    by_order = {p.razorpay_order_id: p for p in payments if p.razorpay_order_id}
+    by_gateway_id = {p.razorpay_payment_id: p for p in payments if p.razorpay_payment_id}
+
+    succeeded = []
+    for event in events:
+        event.processed_at = now
+        if event.event_type not in HANDLED_EVENTS:
+            event.status = "IGNORED"
+            continue
+        try:
+            entity = _entity(event, "payment")
+        except (KeyError, TypeError):
+            event.status = "FAILED"
+            event.error = "Payload has no payment entity"
+            continue
+
+        payment = by_order.get(entity.get("order_id")) or by_gateway_id.get(entity.get("id"))
+        if payment is None:
+            event.status = "IGNORED"
+            event.error = f"No payment for order {entity.get('order_id')}"
+            continue
+
+        if event.event_type == "payment.captured":
+            if mark_payment_captured(db, payment, entity.get("id")):
+                by_gateway_id[payment.razorpay_payment_id] = payment
+                succeeded.append(payment)
+        elif event.event_type == "payment.failed":
+            mark_payment_failed(db, payment, entity.get("id"))
+        elif event.event_type == "refund.processed":
+            mark_payment_refunded(db, payment)
+        event.status = "PROCESSED"
+
+    return succeeded
+
+
+class WebhookProcessor:
+    """Background thread applying stored events in batched transactions"""
+
+    def __init__(self, batch_size: int, poll_interval: float):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="webhook-processor", daemon=True)
+            self._thread.start()
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    @staticmethod
+    def _pending(db: Session):
+        # Other workers' processors skip rows this one has locked (Postgres)
+        return db.query(WebhookEvent).filter(
+            WebhookEvent.status == "PENDING"
+        ).order_by(WebhookEvent.id).with_for_update(skip_locked=True)
+
+    def process_batch(self) -> int:
+        # Nothing reads the events or payments lazily after commit, so keep them loaded
+        db = SessionLocal(expire_on_commit=False)
+        try:
+            events = self._pending(db).limit(self.batch_size).all()
+            if not events:
+                return 0
+            event_ids = [event.id for event in events]
+            try:
+                succeeded = apply_webhook_events(db, events)
+                db.commit()
+            except OperationalError:
+                # The database itself failed; retrying event by event would too
+                db.rollback()
+                raise
+            except Exception:
+                db.rollback()
+                logger.exception("Failed to apply %d webhook events; retrying them one at a time", len(event_ids))
+                succeeded = [payment for event_id in event_ids for payment in self._apply_one(event_id)]
+        finally:
+            db.close()
+
+        for payment in succeeded:
+            dashboard_feed.payment_succeeded(payment)
+        return len(event_ids)
+
+    def _apply_one(self, event_id: int) -> List[Payment]:
+        """Apply one event in its own transaction; a failure counts against the event"""
+        db = SessionLocal(expire_on_commit=False)
+        try:
+            event = self._pending(db).filter(WebhookEvent.id == event_id).first()
+            if event is None:
+                return []
+            try:
+                succeeded = apply_webhook_events(db, [event])
+                db.commit()
+                return succeeded
+            except OperationalError:
+                db.rollback()
+                raise
+            except Exception as e:
+                db.rollback()
+                logger.exception("Failed to apply webhook event %s", event.event_id)
+                event = self._pending(db).filter(WebhookEvent.id == event_id).first()
+                if event is None:
+                    return []
+                event.attempts += 1
+                event.error = f"{e.__class__.__name__}: {e}"
+                if event.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+                    event.status = "FAILED"
+                    event.processed_at = datetime.utcnow()
+                db.commit()
+                return []
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                processed = self.process_batch()
+            except Exception:
+                logger.exception("Failed to apply webhook events")
+                processed = 0
+            if processed < self.batch_size:
+                # Caught up; wait for new events here or poll for ones stored by other workers
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stopping.set()
+            self._wakeup.set()
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+webhook_processor = WebhookProcessor(
+    batch_size=settings.WEBHOOK_BATCH_SIZE,
+    poll_interval=settings.WEBHOOK_POLL_SECONDS
+)
+webhook_queue = WebhookQueue(max_batch=settings.WEBHOOK_BATCH_SIZE, on_flush=webhook_processor.wake)
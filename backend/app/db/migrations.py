@@ -0,0 +1,215 @@
+"""Versioned schema migrations.
+
+Each script in ``app/db/versions`` (``v0001_initial.py``, ...) has a
+docstring describing it and an ``upgrade(op)`` function. ``upgrade``
+applies pending scripts in order and records each version in the
+``schema_migrations`` table; ``python migrate.py upgrade`` runs it.
+
+Operations skip work that is already done (tables, columns and indexes
+that exist), so databases created by the old ``create_all`` at startup
+are brought up to date by the same scripts, and a script interrupted
+halfway can simply be run again. On Postgres, indexes on existing
+tables are built ``CONCURRENTLY`` so writes continue meanwhile.
+
+App startup only calls ``check_schema``: one query comparing the
+recorded versions with the script file names.
+"""
+import importlib
+import logging
+import pkgutil
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_PACKAGE = "app.db.versions"
+VERSIONS_PATH = Path(__file__).parent / "versions"
+
+# Serializes concurrent upgrades on Postgres
+MIGRATION_LOCK_KEY = 0x5C4E3A
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", String, primary_key=True),
+    Column("description", String, nullable=True),
+    Column("applied_at", DateTime, nullable=False)
+)
+
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+
+class Migration(NamedTuple):
+    version: str
+    description: str
+    upgrade: Callable[["Operations"], None]
+
+
+class Operations:
+    """Schema changes available to migration scripts; each is a no-op when already applied"""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.dialect = engine.dialect
+        self.metadata = MetaData()
+
+    def _quote(self, name: str) -> str:
+        return self.dialect.identifier_preparer.quote(name)
+
+    def has_table(self, name: str) -> bool:
+        return inspect(self.engine).has_table(name)
+
+    def has_column(self, table_name: str, column_name: str) -> bool:
+        return column_name in {column["name"] for column in inspect(self.engine).get_columns(table_name)}
+
+    def has_index(self, table_name: str, index_name: str) -> bool:
+        inspector = inspect(self.engine)
+        indexes = {index["name"] for index in inspector.get_indexes(table_name)}
+        # Unique column constraints may be backed by a unique index reported only here
+        indexes |= {constraint["name"] for constraint in inspector.get_unique_constraints(table_name)}
+        return index_name in indexes
+
+    def execute(self, statement: str, **params) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(text(statement), params)
+
+    def create_table(self, name: str, *columns_and_constraints) -> Table:
+        """Create a table, with the indexes its columns declare"""
+        table = Table(name, self.metadata, *columns_and_constraints)
+        if self.has_table(name):
+            return table
+        with self.engine.begin() as conn:
+            # Foreign keys compile against their target tables; load those as they are now
+            for fk in table.foreign_keys:
+                target = fk.target_fullname.split(".")[0]
+                if target not in self.metadata.tables:
+                    Table(target, self.metadata, autoload_with=conn)
+            table.create(conn)
+        return table
+
+    def add_column(self, table_name: str, column: Column, references: Optional[str] = None) -> None:
+        """Add a nullable column, or a NOT NULL one with a server default"""
+        if self.has_column(table_name, column.name):
+            return
+        ddl = f"ALTER TABLE {self._quote(table_name)} ADD COLUMN {self._quote(column.name)} {column.type.compile(self.dialect)}"
+        if column.server_default is not None:
+            ddl += f" DEFAULT {column.server_default.arg}"
+        if not column.nullable:
+            ddl += " NOT NULL"
+        if references:
+            target_table, target_column = references.split(".")
+            ddl += f" REFERENCES {self._quote(target_table)} ({self._quote(target_column)})"
+        self.execute(ddl)
+
+    def create_index(self, name: str, table_name: str, columns: Sequence[str], unique: bool = False) -> None:
+        """Create an index; on Postgres without blocking writes to the table"""
+        postgres = self.dialect.name == "postgresql"
+        if postgres and self._invalid_postgres_index(name):
+            # A failed concurrent build leaves an invalid index behind; start over
+            self._autocommit(f"DROP INDEX CONCURRENTLY IF EXISTS {self._quote(name)}")
+        elif self.has_index(table_name, name):
+            return
+
+        ddl = "CREATE {unique}INDEX {concurrently}{name} ON {table} ({columns})".format(
+            unique="UNIQUE " if unique else "",
+            concurrently="CONCURRENTLY " if postgres else "",
+            name=self._quote(name),
+            table=self._quote(table_name),
+            columns=", ".join(self._quote(column) for column in columns)
+        )
+        if postgres:
+            self._autocommit(ddl)
+        else:
+            self.execute(ddl)
+
+    def _autocommit(self, statement: str) -> None:
+        # CONCURRENTLY cannot run inside a transaction block
+        with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text(statement))
+
+    def _invalid_postgres_index(self, name: str) -> bool:
+        with self.engine.connect() as conn:
+            return bool(conn.execute(text(
+                "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name AND NOT i.indisvalid"
+            ), {"name": name}).first())
+
+
+def _script_modules() -> List[Tuple[str, str]]:
+    """(version, module name) of every script in order, without importing them"""
+    names = sorted(m.name for m in pkgutil.iter_modules([str(VERSIONS_PATH)]) if m.name.startswith("v"))
+    return [(name.split("_", 1)[0][1:], name) for name in names]
+
+
+def load_migrations() -> List[Migration]:
+    migrations = []
+    for version, name in _script_modules():
+        module = importlib.import_module(f"{VERSIONS_PACKAGE}.{name}")
+        description = module.__doc__.strip().splitlines()[0] if module.__doc__ else name
+        migrations.append(Migration(version, description, module.upgrade))
+    return migrations
+
+
+def applied_versions(engine: Engine) -> List[str]:
+    try:
+        with engine.connect() as conn:
+            return [row[0] for row in conn.execute(select(schema_migrations.c.version))]
+    except DBAPIError:
+        # No schema_migrations table yet
+        return []
+
+
+def pending_migrations(engine: Engine) -> List[Migration]:
+    applied = set(applied_versions(engine))
+    return [migration for migration in load_migrations() if migration.version not in applied]
+
+
+def upgrade(engine: Engine, target: Optional[str] = None) -> List[Migration]:
+    """Apply pending migrations up to and including ``target`` (default: all)"""
+    schema_migrations.create(engine, checkfirst=True)
+    postgres = engine.dialect.name == "postgresql"
+    with engine.connect() as lock_conn:
+        if postgres:
+            # Autocommit, so the lock holder's open transaction cannot stall concurrent index builds
+            lock_conn = lock_conn.execution_options(isolation_level="AUTOCOMMIT")
+            lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        try:
+            applied = []
+            for migration in pending_migrations(engine):
+                if target is not None and migration.version > target:
+                    break
+                logger.info("Applying migration %s: %s", migration.version, migration.description)
+                migration.upgrade(Operations(engine))
+                with engine.begin() as conn:
+                    conn.execute(schema_migrations.insert().values(
+                        version=migration.version,
+                        description=migration.description,
+                        applied_at=datetime.utcnow()
+                    ))
+                applied.append(migration)
+            return applied
+        finally:
+            if postgres:
+                lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+
+def check_schema(engine: Engine, auto_upgrade: bool = False) -> None:
+    """Raise SchemaOutOfDate unless every migration has been applied"""
+    applied = set(applied_versions(engine))
+    pending = [version for version, _ in _script_modules() if version not in applied]
+    if not pending:
+        return
+    if auto_upgrade:
+        upgrade(engine)
+        return
+    raise SchemaOutOfDate(
+        f"Database schema is missing migrations {', '.join(pending)}; "
+        f"run `python migrate.py upgrade`"
+    )
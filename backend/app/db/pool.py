@@ -0,0 +1,230 @@
+"""Connection pools that record how long requests wait for a connection.
+
+Every engine is created through ``create_db_engine``, which picks the
+pool class and sizing from settings and registers the engine so
+``pool_stats`` can report on it. Checkout latency is the time spent
+obtaining a connection (including opening one); a checkout counts as a
+wait when the pool was already at its limit and had to block for a
+connection to be returned.
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
+
+from app.core.config import settings
+from app.db.sqlite import configure_sqlite
+
+# Checkout latencies kept for percentiles
+LATENCY_SAMPLES = 2048
+
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.checkouts = 0
+        self.checkout_seconds = 0.0
+        self.checkout_max_seconds = 0.0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.wait_max_seconds = 0.0
+        self.timeouts = 0
+        self.overflow_events = 0
+        self.in_use = 0
+        self.opened = 0
+        self.closed = 0
+        self.invalidated = 0
+
+    def record_checkout(self, seconds: float, waited: bool, overflowed: bool) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.checkout_seconds += seconds
+            self.checkout_max_seconds = max(self.checkout_max_seconds, seconds)
+            self._latencies.append(seconds)
+            if waited:
+                self.waits += 1
+                self.wait_seconds += seconds
+                self.wait_max_seconds = max(self.wait_max_seconds, seconds)
+            if overflowed:
+                self.overflow_events += 1
+
+    def record_timeout(self, seconds: float) -> None:
+        with self._lock:
+            self.timeouts += 1
+            self.waits += 1
+            self.wait_seconds += seconds
+            self.wait_max_seconds = max(self.wait_max_seconds, seconds)
+
+    def record_checkin(self) -> None:
+        with self._lock:
+            self.in_use -= 1
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            checkouts = self.checkouts
+
+            def percentile(p: float) -> float:
+                if not latencies:
+                    return 0.0
+                return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+
+            return {
+                "in_use": self.in_use,
+                "idle": max(self.opened - self.closed - self.in_use, 0),
+                "open": self.opened - self.closed,
+                "checkouts": checkouts,
+                "checkout_ms": {
+                    "avg": self.checkout_seconds / checkouts * 1000 if checkouts else 0.0,
+                    "p50": percentile(0.50),
+                    "p95": percentile(0.95),
+                    "p99": percentile(0.99),
+                    "max": self.checkout_max_seconds * 1000
+                },
+                "waits": self.waits,
+                "wait_ms": {
+                    "total": self.wait_seconds * 1000,
+                    "max": self.wait_max_seconds * 1000
+                },
+                "timeouts": self.timeouts,
+                "overflow_events": self.overflow_events,
+                "connections_opened": self.opened,
+                "connections_closed": self.closed,
+                "invalidations": self.invalidated
+            }
+
+
+class InstrumentedPool:
+    """Mixin timing ``_do_get`` on any SQLAlchemy pool class"""
+
+    metrics: PoolMetrics
+
+    def _at_capacity(self) -> bool:
+        if not isinstance(self, QueuePool) or self._max_overflow < 0:
+            return False
+        return self._pool.empty() and self._overflow >= self._max_overflow
+
+    def _do_get(self):
+        waited = self._at_capacity()
+        overflow_before = self.overflow() if isinstance(self, QueuePool) else 0
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record_timeout(time.perf_counter() - start)
+            raise
+        overflowed = isinstance(self, QueuePool) and self.overflow() > max(overflow_before, 0)
+        self.metrics.record_checkout(time.perf_counter() - start, waited, overflowed)
+        return record
+
+    def _do_return_conn(self, record) -> None:
+        self.metrics.record_checkin()
+        super()._do_return_conn(record)
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep counting into the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class InstrumentedQueuePool(InstrumentedPool, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(InstrumentedPool, AsyncAdaptedQueuePool):
+    pass
+
+
+class InstrumentedStaticPool(InstrumentedPool, StaticPool):
+    pass
+
+
+# Engines reported by pool_stats, by name
+_engines: Dict[str, Engine] = {}
+
+
+def _is_memory_sqlite(url) -> bool:
+    return url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+
+
+def pool_options(url: str, is_async: bool = False) -> Dict[str, Any]:
+    """Pool class and sizing for an engine on ``url``"""
+    parsed = make_url(url)
+    options: Dict[str, Any] = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE
+    }
+
+    if parsed.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        # An in-memory database exists only on its one connection
+        if _is_memory_sqlite(parsed):
+            options["poolclass"] = InstrumentedStaticPool
+            return options
+
+    # File SQLite queues like any other database: a connection per thread
+    # would hand nested sessions on one thread the same transaction
+    options["poolclass"] = InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool
+    options["pool_size"] = settings.DB_POOL_SIZE
+    options["max_overflow"] = settings.DB_MAX_OVERFLOW
+    options["pool_timeout"] = settings.DB_POOL_TIMEOUT
+    return options
+
+
+def _instrument(engine: Engine, name: str) -> None:
+    metrics = PoolMetrics()
+    engine.pool.metrics = metrics
+
+    # Engine-level listeners carry over to pools recreated by dispose()
+    event.listen(engine, "connect", lambda *args: metrics._count("opened"))
+    event.listen(engine, "close", lambda *args: metrics._count("closed"))
+    event.listen(engine, "close_detached", lambda *args: metrics._count("closed"))
+    event.listen(engine, "invalidate", lambda *args: metrics._count("invalidated"))
+    _engines[name] = engine
+
+
+def _prepare(engine: Engine, name: str) -> None:
+    _instrument(engine, name)
+    if engine.dialect.name == "sqlite" and settings.SQLITE_TUNING:
+        configure_sqlite(engine)
+
+
+def create_db_engine(url: str, name: str) -> Engine:
+    engine = create_engine(url, **pool_options(url))
+    _prepare(engine, name)
+    return engine
+
+
+def create_async_db_engine(url: str, name: str) -> AsyncEngine:
+    engine = create_async_engine(url, **pool_options(url, is_async=True))
+    _prepare(engine.sync_engine, name)
+    return engine
+
+
+def pool_stats(names: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """Live metrics for every registered engine's pool"""
+    stats = {}
+    for name, engine in _engines.items():
+        if names and name not in names:
+            continue
+        pool = engine.pool
+        stats[name] = {
+            "url": engine.url.render_as_string(hide_password=True),
+            "pool": type(pool).__name__.replace("Instrumented", ""),
+            "size": pool.size() if isinstance(pool, QueuePool) else getattr(pool, "size", 1),
+            "max_overflow": pool._max_overflow if isinstance(pool, QueuePool) else 0,
+            **pool.metrics.snapshot()
+        }
+    return stats
@@ -0,0 +1,176 @@
+import base64
+import json
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from starlette.datastructures import Headers
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Lag of a Postgres standby; 0 when every received WAL record has been replayed
+POSTGRES_LAG_QUERY = text(
+    "SELECT CASE "
+    "WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class Replica:
+    def __init__(self, url: str, engine_factory: Callable[[str], Engine] = create_engine):
+        self.url = url
+        self.engine = engine_factory(url)
+        self.healthy = True
+        self.lag_seconds = 0.0
+        self.checked_at = 0.0
+        self._check_lock = threading.Lock()
+
+        @event.listens_for(self.engine, "handle_error")
+        def _mark_unhealthy(context):
+            # A dropped replica is taken out of rotation until the next health check
+            if context.is_disconnect:
+                self.healthy = False
+
+    def measure_lag(self) -> float:
+        with self.engine.connect() as conn:
+            if self.engine.dialect.name == "postgresql":
+                return float(conn.execute(POSTGRES_LAG_QUERY).scalar() or 0)
+            # Other backends have no replication status; treat a reachable replica as current
+            conn.execute(text("SELECT 1"))
+            return 0.0
+
+
+class ReplicaRouter:
+    """Chooses where read-only sessions connect.
+
+    Replicas are health- and lag-checked at most once per ``check_interval``
+    seconds; unhealthy or lagging replicas are skipped and reads fall back to
+    the primary when none qualify.
+    """
+
+    def __init__(
+        self,
+        primary: Engine,
+        urls: List[str],
+        max_lag: float,
+        check_interval: float,
+        engine_factory: Callable[[str], Engine] = create_engine
+    ):
+        self.primary = primary
+        self.replicas = [Replica(url, engine_factory) for url in urls]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+
+    def _refresh(self, replica: Replica) -> None:
+        if time.monotonic() - replica.checked_at < self.check_interval:
+            return
+        # Only one request pays for the check; others use the last known state
+        if not replica._check_lock.acquire(blocking=False):
+            return
+        try:
+            replica.lag_seconds = replica.measure_lag()
+            replica.healthy = True
+        except Exception:
+            replica.healthy = False
+        finally:
+            replica.checked_at = time.monotonic()
+            replica._check_lock.release()
+
+    def available(self) -> List[Replica]:
+        for replica in self.replicas:
+            self._refresh(replica)
+        return [r for r in self.replicas if r.healthy and r.lag_seconds <= self.max_lag]
+
+    def engine_for_read(self, sticky: bool = False) -> Engine:
+        if sticky or not self.replicas:
+            return self.primary
+        candidates = self.available()
+        return random.choice(candidates).engine if candidates else self.primary
+
+    def status(self) -> List[dict]:
+        return [
+            {
+                "url": replica.engine.url.render_as_string(hide_password=True),
+                "healthy": replica.healthy,
+                "lag_seconds": replica.lag_seconds
+            }
+            for replica in self.replicas
+        ]
+
+
+def client_key(headers) -> Optional[str]:
+    """Who is asking: the subject of the request's bearer token, if any.
+
+    The signature is not checked; the key only decides where a read goes,
+    and the auth dependencies verify the token itself.
+    """
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer":
+        return None
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return f"user:{claims['sub']}"
+    except (IndexError, ValueError, KeyError, TypeError):
+        return None
+
+
+class RecentWriters:
+    """Clients that wrote within the last ``window`` seconds, in this process.
+
+    Keyed on what every API request already carries (see ``client_key``)
+    rather than a cookie, which the cross-origin frontend never sends back.
+    Anonymous writes are not tracked. With several workers, a read served by
+    a worker other than the one that took the write is not pinned.
+    """
+
+    def __init__(self, window: float, max_size: int = 100000):
+        self.window = window
+        self.max_size = max_size
+        self._writes: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, key: Optional[str]) -> None:
+        if key is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._writes[key] = now
+            self._writes.move_to_end(key)
+            # Oldest first: drop what has expired, and the oldest beyond max_size
+            while self._writes:
+                oldest_key, written_at = next(iter(self._writes.items()))
+                if now - written_at < self.window and len(self._writes) <= self.max_size:
+                    break
+                del self._writes[oldest_key]
+
+    def wrote_recently(self, key: Optional[str]) -> bool:
+        if key is None:
+            return False
+        written_at = self._writes.get(key)
+        return written_at is not None and time.monotonic() - written_at < self.window
+
+
+class ReadYourWritesMiddleware:
+    """Notes clients whose writes succeeded, so get_read_db pins them to the primary"""
+
+    def __init__(self, app, writers: RecentWriters):
+        self.app = app
+        self.writers = writers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_and_record(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                self.writers.record(client_key(Headers(scope=scope)))
+            await send(message)
+
+        await self.app(scope, receive, send_and_record)
@@ -1,13 +1,32 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
 from app.core.config import settings
+from app.db.pool import create_async_db_engine, create_db_engine
+from app.db.replicas import SAFE_METHODS, RecentWriters, ReplicaRouter, client_key
+from app.db.sqlite import BEGIN_OPTION
+
+# Async drivers for the backends we deploy on
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg"
+}
+
+
+def async_url(url: str) -> str:
+    """The same database addressed through its async driver"""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver configured for {parsed.get_backend_name()}")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
 
-# Create SQLAlchemy engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True
-)
+
+# Create SQLAlchemy engine (pool sized from settings, see app.db.pool)
+engine = create_db_engine(settings.DATABASE_URL, "primary")
 
 # Create session factory
 SessionLocal = sessionmaker(
@@ -16,11 +35,83 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
-# Dependency to get DB session
+# Async engine and session factory for the async route handlers. Objects stay
+# loaded after commit, since lazy refreshes are not possible outside run_sync.
+async_engine = create_async_db_engine(async_url(settings.DATABASE_URL), "primary-async")
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    autoflush=False,
+    expire_on_commit=False
+)
 
-def get_db():
-    db = SessionLocal()
+# The primary for read-only sessions. On SQLite their transactions begin
+# DEFERRED, so they never wait for (or hold up) writers; see app.db.sqlite.
+read_engine = engine.execution_options(**{BEGIN_OPTION: "DEFERRED"})
+async_read_engine = async_engine.execution_options(**{BEGIN_OPTION: "DEFERRED"})
+
+# Read replicas (optional)
+replica_urls = [url.strip() for url in (settings.DATABASE_REPLICA_URLS or "").split(",") if url.strip()]
+replica_router = ReplicaRouter(
+    read_engine,
+    replica_urls,
+    max_lag=settings.REPLICA_MAX_LAG_SECONDS,
+    check_interval=settings.REPLICA_HEALTH_CHECK_SECONDS,
+    engine_factory=lambda url: create_db_engine(url, f"replica-{replica_urls.index(url) + 1}")
+)
+recent_writers = RecentWriters(window=settings.READ_YOUR_WRITES_SECONDS)
+
+# Async engine per replica, keyed by the sync engine the router hands out
+async_replica_engines = {
+    replica.engine: create_async_db_engine(async_url(replica.url), f"replica-{number}-async")
+    for number, replica in enumerate(replica_router.replicas, start=1)
+}
+
+# Dependency to get DB session. Requests with safe methods only read, so
+# their sessions do not take SQLite's write lock.
+
+def get_db(request: Request):
+    db = SessionLocal(bind=read_engine if request.method in SAFE_METHODS else engine)
     try:
         yield db
     finally:
         db.close()
+
+
+# Dependency to get a read-only DB session, served by a replica when one is
+# healthy and the client has not written recently
+
+def get_read_db(request: Request):
+    sticky = recent_writers.wrote_recently(client_key(request.headers))
+    db = SessionLocal(bind=replica_router.engine_for_read(sticky=sticky))
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Async counterparts of get_db and get_read_db
+
+async def get_async_db(request: Request):
+    bind = async_read_engine if request.method in SAFE_METHODS else async_engine
+    async with AsyncSessionLocal(bind=bind) as db:
+        yield db
+
+
+async def get_async_read_db(request: Request):
+    bind = async_read_engine
+    if replica_router.replicas and not recent_writers.wrote_recently(client_key(request.headers)):
+        # Replica health checks are blocking; keep them off the event loop
+        chosen = await run_in_threadpool(replica_router.engine_for_read)
+        bind = async_replica_engines.get(chosen, async_read_engine)
+    async with AsyncSessionLocal(bind=bind) as db:
+        yield db
+
+
+def end_read_transaction(db: Session) -> None:
+    """Finish a session's reads before a slow await (password hashing, gateway
+    calls) so its transaction, and on SQLite the write lock, is not held
+    across it. Objects already loaded stay usable, detached; anything not
+    yet committed is discarded."""
+    db.expunge_all()
+    db.rollback()
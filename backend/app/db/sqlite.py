@@ -0,0 +1,61 @@
+"""Connection setup for deployments on a single SQLite file.
+
+Each new connection gets WAL journaling (readers no longer block the
+writer), relaxed fsyncs, a memory map and page cache, a busy timeout and
+in-memory temp tables.
+
+Transactions are begun explicitly instead of by the driver. Write
+sessions start with ``BEGIN IMMEDIATE``: they take SQLite's write lock
+up front and queue on the busy timeout. A deferred transaction that
+reads first and writes later (a booking validating the hospital, then
+inserting) fails with "database is locked" the moment another writer
+commits in between, whatever the timeout. Sessions bound with the
+``sqlite_begin="DEFERRED"`` execution option, i.e. the read-only
+dependencies, keep deferred transactions and never wait for writers.
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+# Execution option naming how a connection's transactions begin
+BEGIN_OPTION = "sqlite_begin"
+
+BEGIN_MODES = {"DEFERRED", "IMMEDIATE", "EXCLUSIVE"}
+
+
+def connect_pragmas() -> list:
+    return [
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}",
+        # Negative cache sizes are in KiB rather than pages
+        f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}",
+        f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}",
+        "PRAGMA temp_store=MEMORY"
+    ]
+
+
+def configure_sqlite(engine: Engine) -> None:
+    """Apply the pragmas and explicit transaction handling to a sync engine
+    (for an async engine, pass its ``sync_engine``)"""
+    default_mode = settings.SQLITE_BEGIN_MODE.upper()
+    if default_mode not in BEGIN_MODES:
+        raise ValueError(f"SQLITE_BEGIN_MODE must be one of {sorted(BEGIN_MODES)}")
+    pragmas = connect_pragmas()
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        # Stop the driver issuing its own BEGIN; _on_begin below does it
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _on_begin(conn):
+        mode = conn.get_execution_options().get(BEGIN_OPTION, default_mode)
+        conn.exec_driver_sql(f"BEGIN {mode}")
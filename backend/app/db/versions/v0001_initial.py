@@ -0,0 +1,108 @@
+"""Initial schema: users, hospitals, appointments, services, enquiries, settings and payments"""
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Integer, JSON, String, Text
+
+
+def upgrade(op):
+    op.create_table(
+        "users",
+        Column("id", Integer, primary_key=True, index=True),
+        Column("name", String, nullable=False),
+        Column("email", String, unique=True, index=True, nullable=False),
+        Column("password", String, nullable=False),
+        Column("role", String, nullable=False),
+        Column("is_active", Boolean)
+    )
+    op.create_table(
+        "hospitals",
+        Column("id", Integer, primary_key=True, index=True),
+        Column("name", String, nullable=False),
+        Column("logo_url", String),
+        Column("address", String, nullable=False),
+        Column("city", String, nullable=False),
+        Column("state", String),
+        Column("zip_code", String),
+        Column("contact_email", String, nullable=False),
+        Column("contact_phone", String, nullable=False),
+        Column("website", String),
+        Column("category", String, nullable=False),
+        Column("specialties", JSON),
+        Column("facilities", JSON),
+        Column("services", JSON),
+        Column("timings", JSON),
+        Column("images", JSON),
+        Column("description", Text),
+        Column("emergency_services", Boolean),
+        Column("rating", Integer),
+        Column("price_range", String),
+        Column("established_year", Integer),
+        Column("bed_count", Integer),
+        Column("doctor_count", Integer),
+        Column("accreditation", JSON),
+        Column("insurance_accepted", JSON),
+        Column("is_approved", Boolean),
+        Column("owner_id", Integer)
+    )
+    op.create_table(
+        "appointments",
+        Column("id", Integer, primary_key=True, index=True),
+        Column("patient_id", Integer, ForeignKey("users.id"), nullable=False),
+        Column("hospital_id", Integer, ForeignKey("hospitals.id"), nullable=False),
+        Column("service", String, nullable=False),
+        Column("appointment_date", DateTime, nullable=False),
+        Column("status", String),
+        Column("created_at", DateTime)
+    )
+    op.create_table(
+        "services",
+        Column("id", Integer, primary_key=True, index=True),
+        Column("hospital_id", Integer, ForeignKey("hospitals.id"), nullable=False),
+        Column("service_name", String, nullable=False),
+        Column("price", Float, nullable=False),
+        Column("description", Text),
+        Column("category", String),
+        Column("duration_minutes", Integer),
+        Column("is_active", String)
+    )
+    op.create_table(
+        "contacts",
+        Column("id", Integer, primary_key=True, index=True),
+        Column("name", String, nullable=False),
+        Column("email", String, nullable=False),
+        Column("phone", String),
+        Column("subject", String, nullable=False),
+        Column("message", Text, nullable=False),
+        Column("hospital_id", Integer),
+        Column("status", String),
+        Column("created_at", DateTime),
+        Column("resolved_at", DateTime)
+    )
+    op.create_table(
+        "settings",
+        Column("id", Integer, primary_key=True, index=True),
+        Column("key", String, nullable=False, unique=True),
+        Column("value", Text),
+        Column("description", Text),
+        Column("is_active", Boolean)
+    )
+    op.create_table(
+        "commission_settings",
+        Column("id", Integer, primary_key=True, index=True),
+        Column("commission_percentage", Float, nullable=False),
+        Column("description", String),
+        Column("is_active", Boolean),
+        Column("created_at", String),
+        Column("updated_at", String)
+    )
+    op.create_table(
+        "payments",
+        Column("id", Integer, primary_key=True, index=True),
+        Column("appointment_id", Integer, ForeignKey("appointments.id"), nullable=False),
+        Column("razorpay_order_id", String),
+        Column("razorpay_payment_id", String),
+        Column("razorpay_signature", String),
+        Column("total_amount", Float, nullable=False),
+        Column("admin_commission", Float, nullable=False),
+        Column("hospital_payout", Float, nullable=False),
+        Column("status", String),
+        Column("created_at", DateTime)
+    )
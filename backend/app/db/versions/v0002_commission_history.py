@@ -0,0 +1,8 @@
+"""Version commission rates with an effective-from time"""
+from sqlalchemy import Column, DateTime, Integer
+
+
+def upgrade(op):
+    op.add_column("commission_settings", Column("version", Integer))
+    op.add_column("commission_settings", Column("effective_from", DateTime))
+    op.create_index("ix_commission_settings_effective_from", "commission_settings", ["effective_from"])
@@ -0,0 +1,24 @@
+"""Settlement batches and the paise ledger on payments"""
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Integer, String
+
+
+def upgrade(op):
+    op.create_table(
+        "settlement_batches",
+        Column("id", Integer, primary_key=True, index=True),
+        Column("run_id", String, nullable=False, index=True),
+        Column("hospital_id", Integer, ForeignKey("hospitals.id"), nullable=False, index=True),
+        Column("period_start", DateTime),
+        Column("period_end", DateTime, nullable=False),
+        Column("payment_count", Integer, nullable=False),
+        Column("gross_paise", BigInteger, nullable=False),
+        Column("commission_paise", BigInteger, nullable=False),
+        Column("payout_paise", BigInteger, nullable=False),
+        Column("status", String),
+        Column("created_at", DateTime)
+    )
+    op.add_column("payments", Column("amount_paise", BigInteger))
+    op.add_column("payments", Column("commission_paise", BigInteger))
+    op.add_column("payments", Column("payout_paise", BigInteger))
+    op.add_column("payments", Column("settlement_batch_id", Integer), references="settlement_batches.id")
+    op.create_index("ix_payments_settlement_batch_id", "payments", ["settlement_batch_id"])
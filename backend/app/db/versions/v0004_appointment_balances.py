@@ -0,0 +1,7 @@
+"""Amount due and paid on appointments"""
+from sqlalchemy import BigInteger, Column
+
+
+def upgrade(op):
+    op.add_column("appointments", Column("total_due_paise", BigInteger))
+    op.add_column("appointments", Column("paid_paise", BigInteger, nullable=False, server_default="0"))
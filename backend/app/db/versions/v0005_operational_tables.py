@@ -0,0 +1,53 @@
+"""Idempotency keys, webhook events, report jobs and patient sketches"""
+from sqlalchemy import Column, Date, DateTime, Integer, JSON, LargeBinary, String, Text, UniqueConstraint
+
+
+def upgrade(op):
+    op.create_table(
+        "idempotency_keys",
+        Column("id", Integer, primary_key=True, index=True),
+        Column("scope", String, nullable=False),
+        Column("key", String(255), nullable=False),
+        Column("request_hash", String, nullable=False),
+        Column("status", String),
+        Column("status_code", Integer),
+        Column("response", JSON),
+        Column("created_at", DateTime),
+        Column("expires_at", DateTime, nullable=False, index=True),
+        UniqueConstraint("scope", "key", name="uq_idempotency_scope_key")
+    )
+    op.create_table(
+        "webhook_events",
+        Column("id", Integer, primary_key=True, index=True),
+        Column("event_id", String, nullable=False, unique=True),
+        Column("event_type", String, nullable=False),
+        Column("payload", JSON, nullable=False),
+        Column("status", String, index=True),
+        Column("error", Text),
+        Column("received_at", DateTime),
+        Column("processed_at", DateTime)
+    )
+    op.create_table(
+        "report_jobs",
+        Column("id", String, primary_key=True, index=True),
+        Column("report_type", String, nullable=False),
+        Column("params", JSON),
+        Column("params_hash", String, nullable=False, index=True),
+        Column("data_version", String, nullable=False),
+        Column("status", String),
+        Column("result", JSON),
+        Column("error", Text),
+        Column("created_at", DateTime),
+        Column("started_at", DateTime),
+        Column("finished_at", DateTime)
+    )
+    op.create_table(
+        "patient_sketches",
+        Column("id", Integer, primary_key=True, index=True),
+        Column("hospital_id", Integer, nullable=False),
+        Column("day", Date, nullable=False, index=True),
+        Column("precision", Integer, nullable=False),
+        Column("registers", LargeBinary, nullable=False),
+        Column("updated_at", DateTime),
+        UniqueConstraint("hospital_id", "day", name="uq_patient_sketch_hospital_day")
+    )
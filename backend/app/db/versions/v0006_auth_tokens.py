@@ -0,0 +1,23 @@
+"""Refresh token families and revoked access tokens"""
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String
+
+
+def upgrade(op):
+    op.create_table(
+        "refresh_tokens",
+        Column("jti", String, primary_key=True),
+        Column("user_id", Integer, ForeignKey("users.id"), nullable=False, index=True),
+        Column("family_id", String, nullable=False, index=True),
+        Column("expires_at", DateTime, nullable=False),
+        Column("used_at", DateTime),
+        Column("revoked_at", DateTime),
+        Column("created_at", DateTime)
+    )
+    op.create_table(
+        "revoked_tokens",
+        Column("id", Integer, primary_key=True, index=True),
+        Column("key", String, nullable=False, index=True),
+        Column("revoked_before", Float),
+        Column("expires_at", DateTime, nullable=False, index=True),
+        Column("created_at", DateTime)
+    )
@@ -0,0 +1,9 @@
+"""Index payment lookups by gateway order and payment id, appointment, and status with created_at"""
+
+
+def upgrade(op):
+    # Fails on duplicate order ids; resolve those before upgrading
+    op.create_index("ix_payments_razorpay_order_id", "payments", ["razorpay_order_id"], unique=True)
+    op.create_index("ix_payments_razorpay_payment_id", "payments", ["razorpay_payment_id"])
+    op.create_index("ix_payments_appointment_id", "payments", ["appointment_id"])
+    op.create_index("ix_payments_status_created_at", "payments", ["status", "created_at"])
@@ -0,0 +1,8 @@
+"""Claw back refunded payments from later settlement batches"""
+from sqlalchemy import Column, Integer
+
+
+def upgrade(op):
+    op.add_column("settlement_batches", Column("refund_count", Integer, nullable=False, server_default="0"))
+    op.add_column("payments", Column("refund_batch_id", Integer), references="settlement_batches.id")
+    op.create_index("ix_payments_refund_batch_id", "payments", ["refund_batch_id"])
@@ -0,0 +1,21 @@
+"""Stamp updated_at on the tables the reports read; seed the shared version counters"""
+from sqlalchemy import Column, DateTime
+
+REPORT_TABLES = ("appointments", "payments", "hospitals", "users")
+
+
+def upgrade(op):
+    for table in REPORT_TABLES:
+        op.add_column(table, Column("updated_at", DateTime))
+        op.create_index(f"ix_{table}_updated_at", table, ["updated_at"])
+
+    # Seeded here so concurrent first bumps never race to insert the row
+    for key in ("config_version", "principal_version"):
+        op.execute(
+            "INSERT INTO settings (key, value, description, is_active) "
+            "SELECT :key, '0', 'Version counter; bumped to invalidate caches', :active "
+            "WHERE NOT EXISTS (SELECT 1 FROM settings WHERE key = :key)",
+            key=key, active=True
+        )
+    # Left by an interim counter that versioned the report data
+    op.execute("DELETE FROM settings WHERE key = 'report_data_version'")
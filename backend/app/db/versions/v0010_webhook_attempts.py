@@ -0,0 +1,6 @@
+"""Count failed applies of each webhook event"""
+from sqlalchemy import Column, Integer
+
+
+def upgrade(op):
+    op.add_column("webhook_events", Column("attempts", Integer, nullable=False, server_default="0"))
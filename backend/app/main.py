@@ -1,11 +1,20 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import auth, hospitals, appointments, payments, contact, services, admin
-from app.db.session import engine
-from app.db.base import Base
-
-# Create all tables
-Base.metadata.create_all(bind=engine)
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from app.routes import auth, hospitals, appointments, payments, contact, services, admin, reports
+from app.core.config import settings
+from app.db.session import async_engine, async_replica_engines, engine, read_engine, recent_writers, replica_router
+from app.db.migrations import check_schema
+from app.db.replicas import ReadYourWritesMiddleware
+from app.core.report_jobs import report_jobs
+from app.core.password_hashing import password_hasher
+from app.core.rate_limit import RateLimitMiddleware, build_rate_limiter
+from app.core.payment_gateway import close_payment_gateway
+from app.core.webhooks import webhook_processor, webhook_queue
+from app.core.metrics import MetricsMiddleware, instrument_engines, render_metrics
+from app.core.query_profiler import QueryProfilerMiddleware, query_profiler
 
 app = FastAPI(
     title="Hospital Appointment Booking API",
@@ -13,6 +22,11 @@ app = FastAPI(
     version="2.0.0"
 )
 
+# Throttle login, registration and enquiries before they reach bcrypt or the database
+# (added before CORS so that refusals still carry CORS headers)
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware, limiter=build_rate_limiter())
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -22,6 +36,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Pin clients to the primary for a short while after they write
+if replica_router.replicas:
+    app.add_middleware(ReadYourWritesMiddleware, writers=recent_writers)
+
+if settings.SQL_PROFILER_ENABLED:
+    query_profiler.install()
+    app.add_middleware(QueryProfilerMiddleware, profiler=query_profiler)
+
+# Outermost, so that latencies include every other middleware
+if settings.METRICS_ENABLED:
+    instrument_engines()
+    app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(hospitals.router, prefix="/api/hospitals", tags=["Hospitals"])
@@ -30,6 +57,38 @@ app.include_router(appointments.router, prefix="/api/appointments", tags=["Appoi
 app.include_router(payments.router, prefix="/api/payments", tags=["Payments"])
 app.include_router(contact.router, prefix="/api/contact", tags=["Contact"])
 app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
+app.include_router(reports.router, prefix="/api/admin/reports", tags=["Reports"])
+
+@app.on_event("startup")
+def verify_schema():
+    # Schema changes are made by `python migrate.py upgrade`; only check they have been
+    check_schema(engine, auto_upgrade=settings.DB_AUTO_MIGRATE)
+
+@app.on_event("startup")
+def start_webhook_processor():
+    webhook_processor.start()
+
+@app.on_event("shutdown")
+def shutdown_webhook_pipeline():
+    webhook_queue.shutdown()
+    webhook_processor.stop()
+
+@app.on_event("shutdown")
+def shutdown_report_workers():
+    report_jobs.shutdown()
+
+@app.on_event("shutdown")
+def shutdown_password_hashers():
+    password_hasher.shutdown()
+
+@app.on_event("shutdown")
+async def shutdown_payment_gateway():
+    await close_payment_gateway()
+
+@app.on_event("shutdown")
+async def dispose_async_engines():
+    for async_db_engine in (async_engine, *async_replica_engines.values()):
+        await async_db_engine.dispose()
 
 @app.get("/")
 def root():
@@ -37,4 +96,18 @@ def root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "version": "2.0.0"}
+    """Readiness: healthy only while the database answers"""
+    try:
+        with read_engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except SQLAlchemyError as e:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "unavailable", "version": "2.0.0", "database": e.__class__.__name__}
+        )
+    return {"status": "healthy", "version": "2.0.0", "database": "ok"}
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
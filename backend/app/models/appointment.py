@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey
+from typing import Optional
 from datetime import datetime
 
 from app.db.base import Base
@@ -16,9 +17,34 @@ class Appointment(Base):
     # Appointment details
     service = Column(String, nullable=False)
     appointment_date = Column(DateTime, nullable=False)
-    status = Column(String, default="BOOKED")  # BOOKED, COMPLETED, CANCELLED
+    status = Column(String, default="BOOKED")  # BOOKED, CONFIRMED, COMPLETED, CANCELLED
+
+    # Balance in paise, kept up to date as payments are captured and refunded
+    total_due_paise = Column(BigInteger, nullable=True)  # None when the service has no listed price
+    paid_paise = Column(BigInteger, nullable=False, default=0, server_default="0")
 
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Watermark for report caches (app.core.reports.data_version)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    @property
+    def outstanding_paise(self) -> Optional[int]:
+        if self.total_due_paise is None:
+            return None
+        return max(self.total_due_paise - (self.paid_paise or 0), 0)
+
+    @property
+    def total_due(self) -> Optional[float]:
+        return self.total_due_paise / 100 if self.total_due_paise is not None else None
+
+    @property
+    def paid_amount(self) -> float:
+        return (self.paid_paise or 0) / 100
+
+    @property
+    def outstanding_amount(self) -> Optional[float]:
+        outstanding = self.outstanding_paise
+        return outstanding / 100 if outstanding is not None else None
 
     # Temporarily remove all relationships to avoid circular imports
     # patient = relationship("User", back_populates="appointments")
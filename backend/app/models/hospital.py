@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Text, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, JSON
+from datetime import datetime
 
 from app.db.base import Base
 
@@ -41,6 +42,9 @@ class Hospital(Base):
     # owner_id = Column(Integer, ForeignKey("users.id"))
     owner_id = Column(Integer, nullable=True)
 
+    # Watermark for report caches (app.core.reports.data_version)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
     # Temporarily remove all relationships to avoid circular imports
     # owner = relationship("User", back_populates="hospital")
     # appointments = relationship("Appointment", back_populates="hospital")
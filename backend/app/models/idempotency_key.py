@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, UniqueConstraint
+from datetime import datetime
+
+from app.db.base import Base
+
+
+class IdempotencyKey(Base):
+    """Outcome of a request made with an Idempotency-Key header"""
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (UniqueConstraint("scope", "key", name="uq_idempotency_scope_key"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String, nullable=False)  # Endpoint the key was used on
+    key = Column(String(255), nullable=False)
+    request_hash = Column(String, nullable=False)  # Detects a key reused with a different body
+
+    status = Column(String, default="IN_PROGRESS")  # IN_PROGRESS, COMPLETED
+    status_code = Column(Integer, nullable=True)
+    response = Column(JSON, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
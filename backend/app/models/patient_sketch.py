@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, Date, DateTime, LargeBinary, UniqueConstraint
+from datetime import datetime
+
+from app.db.base import Base
+
+
+class PatientSketch(Base):
+    """HyperLogLog sketch of the distinct patients seen by a hospital on a day"""
+    __tablename__ = "patient_sketches"
+    __table_args__ = (UniqueConstraint("hospital_id", "day", name="uq_patient_sketch_hospital_day"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    hospital_id = Column(Integer, nullable=False)
+    day = Column(Date, nullable=False, index=True)
+    precision = Column(Integer, nullable=False)
+    registers = Column(LargeBinary, nullable=False)  # Serialized HyperLogLog (sparse or dense)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
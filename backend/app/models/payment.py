@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -7,15 +7,17 @@ from app.db.base import Base
 
 class Payment(Base):
     __tablename__ = "payments"
+    # Admin listings and reports filter on status and a created_at range
+    __table_args__ = (Index("ix_payments_status_created_at", "status", "created_at"),)
 
     id = Column(Integer, primary_key=True, index=True)
 
     # Foreign keys
-    appointment_id = Column(Integer, ForeignKey("appointments.id"), nullable=False)
+    appointment_id = Column(Integer, ForeignKey("appointments.id"), nullable=False, index=True)
 
     # Razorpay details
-    razorpay_order_id = Column(String, nullable=True)
-    razorpay_payment_id = Column(String, nullable=True)
+    razorpay_order_id = Column(String, nullable=True, unique=True, index=True)  # One payment per gateway order
+    razorpay_payment_id = Column(String, nullable=True, index=True)
     razorpay_signature = Column(String, nullable=True)
 
     # Payment amounts
@@ -23,10 +25,22 @@ class Payment(Base):
     admin_commission = Column(Float, nullable=False)   # 10%
     hospital_payout = Column(Float, nullable=False)    # 90%
 
+    # Ledger amounts in paise; exact, and what settlement batches sum
+    amount_paise = Column(BigInteger, nullable=True)
+    commission_paise = Column(BigInteger, nullable=True)
+    payout_paise = Column(BigInteger, nullable=True)
+
     # Payment status
-    status = Column(String, default="PENDING")  # PENDING, SUCCESS, FAILED
+    status = Column(String, default="PENDING")  # PENDING, SUCCESS, FAILED, REFUNDED
 
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Watermark for report caches (app.core.reports.data_version)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    # Payout batch this payment was settled in
+    settlement_batch_id = Column(Integer, ForeignKey("settlement_batches.id"), nullable=True, index=True)
+    # Later batch that took the payout back after the payment was refunded
+    refund_batch_id = Column(Integer, ForeignKey("settlement_batches.id"), nullable=True, index=True)
 
     # Relationships
     appointment = relationship("Appointment")
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from datetime import datetime
+
+from app.db.base import Base
+
+
+class RefreshToken(Base):
+    """One issued refresh token; each use replaces it with a new one in the same family"""
+    __tablename__ = "refresh_tokens"
+
+    jti = Column(String, primary_key=True)  # Token id carried in the JWT
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    family_id = Column(String, nullable=False, index=True)  # Shared by every rotation of one login
+
+    expires_at = Column(DateTime, nullable=False)
+    used_at = Column(DateTime, nullable=True)  # Set when rotated; a second use means the token leaked
+    revoked_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
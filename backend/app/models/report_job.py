@@ -0,0 +1,22 @@
+from sqlalchemy import Column, String, Text, DateTime, JSON
+from datetime import datetime
+
+from app.db.base import Base
+
+
+class ReportJob(Base):
+    __tablename__ = "report_jobs"
+
+    id = Column(String, primary_key=True, index=True)  # UUID hex
+    report_type = Column(String, nullable=False)
+    params = Column(JSON, nullable=True)
+    params_hash = Column(String, nullable=False, index=True)  # Identifies identical requests
+    data_version = Column(String, nullable=False)  # Report data version (app.core.reports) the result was built from
+
+    status = Column(String, default="QUEUED")  # QUEUED, RUNNING, SUCCEEDED, FAILED
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime
+from datetime import datetime
+
+from app.db.base import Base
+
+
+class RevokedToken(Base):
+    """A revoked access token (``jti:<id>``) or every token of a user issued before a time (``user:<id>``)"""
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String, nullable=False, index=True)
+    revoked_before = Column(Float, nullable=True)  # Epoch seconds; user keys only
+    expires_at = Column(DateTime, nullable=False, index=True)  # No token it could match is valid after this
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, Text
+from sqlalchemy import Column, Integer, String, Float, Boolean, Text, DateTime
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base
@@ -15,11 +15,14 @@ class Settings(Base):
 
 
 class CommissionSettings(Base):
+    """One version of the commission rate; rows are never edited once written"""
     __tablename__ = "commission_settings"
 
     id = Column(Integer, primary_key=True, index=True)
     commission_percentage = Column(Float, nullable=False, default=10.0)
     description = Column(String, nullable=True)
     is_active = Column(Boolean, default=True)
+    version = Column(Integer, nullable=True)
+    effective_from = Column(DateTime, nullable=True, index=True)  # NULL: effective since the beginning
     created_at = Column(String, nullable=True)
     updated_at = Column(String, nullable=True)
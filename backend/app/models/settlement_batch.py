@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey
+from datetime import datetime
+
+from app.db.base import Base
+
+
+class SettlementBatch(Base):
+    """Payout owed to one hospital for the successful payments linked to it"""
+    __tablename__ = "settlement_batches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    run_id = Column(String, nullable=False, index=True)  # Settlement run that created the batch
+    hospital_id = Column(Integer, ForeignKey("hospitals.id"), nullable=False, index=True)
+
+    # Covered payments were created in [period_start, period_end)
+    period_start = Column(DateTime, nullable=True)
+    period_end = Column(DateTime, nullable=False)
+
+    # Totals in paise over the payments with this settlement_batch_id, less
+    # those with this refund_batch_id (settled earlier, refunded since)
+    payment_count = Column(Integer, nullable=False, default=0)
+    refund_count = Column(Integer, nullable=False, default=0)
+    gross_paise = Column(BigInteger, nullable=False, default=0)
+    commission_paise = Column(BigInteger, nullable=False, default=0)
+    payout_paise = Column(BigInteger, nullable=False, default=0)
+
+    status = Column(String, default="PENDING")  # PENDING, PAID
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Boolean
+from sqlalchemy import Column, Integer, String, Boolean, DateTime
+from datetime import datetime
 
 from app.db.base import Base
 
@@ -12,6 +13,8 @@ class User(Base):
     password = Column(String, nullable=False)
     role = Column(String, nullable=False)  # admin, hospital, patient
     is_active = Column(Boolean, default=True)
+    # Watermark for report caches (app.core.reports.data_version)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     # Temporarily remove all relationships to avoid circular imports
     # hospital = relationship("Hospital", back_populates="owner", uselist=False)
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON
+from datetime import datetime
+
+from app.db.base import Base
+
+
+class WebhookEvent(Base):
+    """Gateway webhook event, stored on receipt and applied by the background processor"""
+    __tablename__ = "webhook_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_id = Column(String, nullable=False, unique=True)  # Gateway's event id; deduplicates redeliveries
+    event_type = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+
+    status = Column(String, default="PENDING", index=True)  # PENDING, PROCESSED, IGNORED, FAILED
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")  # Failed applies so far
+
+    received_at = Column(DateTime, default=datetime.utcnow)
+    processed_at = Column(DateTime, nullable=True)
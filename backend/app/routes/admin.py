@@ -1,22 +1,47 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
 from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+import csv
+import os
+import shutil
+import tempfile
 
-from app.db.session import get_db
+from app.db.pool import pool_stats
+from app.db.session import SessionLocal, get_db, get_read_db, replica_router
 from app.models.hospital import Hospital
 from app.models.appointment import Appointment
 from app.models.payment import Payment
 from app.models.user import User
 from app.models.contact import Contact
+from app.models.settlement_batch import SettlementBatch
+from app.core.principals import Principal, principal_cache
+from app.core.revocation import token_revocations
+from app.core.query_profiler import query_profiler
+from app.core.config import settings
 from app.core.dependencies import require_admin
+from app.core.reports import (
+    funnel_analytics_report,
+    hospital_performance_report,
+    payment_tracking_report,
+    revenue_report
+)
+from app.core.unique_patients import unique_patients, rebuild_patient_sketches
+from app.core.events import dashboard_feed, format_sse, heartbeat
+from app.core.reconciliation import reconcile_csv, settlement_columns
+from app.core.settlements import settle_payments
 
 router = APIRouter()
 
+# Seconds between keep-alive comments on idle dashboard streams
+STREAM_HEARTBEAT_INTERVAL = 15
+
 
 @router.get("/dashboard")
-def get_admin_dashboard(db: Session = Depends(get_db), current_user: User = Depends(require_admin)):
+def get_admin_dashboard(db: Session = Depends(get_read_db), current_user: Principal = Depends(require_admin)):
     """Get comprehensive admin dashboard statistics"""
     
     # Basic counts
@@ -32,7 +57,12 @@ def get_admin_dashboard(db: Session = Depends(get_db), current_user: User = Depe
     total_commission = db.query(func.sum(Payment.admin_commission)).filter(Payment.status == "SUCCESS").scalar() or 0
     
     # Recent activity
-    recent_appointments = db.query(Appointment).order_by(desc(Appointment.created_at)).limit(5).all()
+    # Names come from the same query; Appointment has no relationships to load them lazily
+    recent_appointments = db.query(Appointment, Hospital.name, User.name).outerjoin(
+        Hospital, Hospital.id == Appointment.hospital_id
+    ).outerjoin(
+        User, User.id == Appointment.patient_id
+    ).order_by(desc(Appointment.created_at)).limit(5).all()
     recent_payments = db.query(Payment).filter(Payment.status == "SUCCESS").order_by(desc(Payment.created_at)).limit(5).all()
     pending_enquiries = db.query(Contact).filter(Contact.status == "PENDING").count()
     
@@ -54,13 +84,13 @@ def get_admin_dashboard(db: Session = Depends(get_db), current_user: User = Depe
             "recent_appointments": [
                 {
                     "id": apt.id,
-                    "patient_name": apt.patient_name,
-                    "hospital_name": apt.hospital.name if apt.hospital else "Unknown",
-                    "service_name": apt.service_name,
+                    "patient_name": patient_name or "Unknown",
+                    "hospital_name": hospital_name or "Unknown",
+                    "service_name": apt.service,
                     "appointment_date": apt.appointment_date.isoformat() if apt.appointment_date else None,
                     "status": apt.status
                 }
-                for apt in recent_appointments
+                for apt, hospital_name, patient_name in recent_appointments
             ],
             "recent_payments": [
                 {
@@ -76,120 +106,65 @@ def get_admin_dashboard(db: Session = Depends(get_db), current_user: User = Depe
     }
 
 
+def _count_pending_enquiries(db: Session) -> int:
+    return db.query(Contact).filter(Contact.status == "PENDING").count()
+
+
+@router.get("/dashboard/stream")
+async def stream_admin_dashboard(
+    request: Request,
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(require_admin)
+):
+    """Server-sent events feed of incremental dashboard updates"""
+
+    if not dashboard_feed.is_seeded:
+        # Blocking query; keep it off the event loop
+        pending = await run_in_threadpool(_count_pending_enquiries, db)
+        dashboard_feed.seed(pending)
+    # Release the connection; the stream itself never touches the database
+    await run_in_threadpool(db.close)
+
+    async def event_stream():
+        # Subscribed here, not in the handler: if the client leaves before the
+        # body starts, this never runs and nothing is left on the bus.
+        # Subscribing before the snapshot means no delta is missed in between.
+        async with dashboard_feed.bus.subscribe() as subscription:
+            yield format_sse({"type": "snapshot", "data": dashboard_feed.snapshot()})
+            while not await request.is_disconnected():
+                event = await subscription.get(timeout=STREAM_HEARTBEAT_INTERVAL)
+                yield format_sse(event) if event else heartbeat()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/payments/tracking")
 def get_payment_tracking(
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
     hospital_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(require_admin)
 ):
     """Get detailed payment tracking with commission breakdown"""
-    
-    query = db.query(Payment).join(Appointment).join(Hospital)
-    
-    # Date filtering
-    if start_date:
-        start = datetime.fromisoformat(start_date)
-        query = query.filter(Payment.created_at >= start)
-    
-    if end_date:
-        end = datetime.fromisoformat(end_date)
-        query = query.filter(Payment.created_at <= end)
-    
-    # Hospital filtering
-    if hospital_id:
-        query = query.filter(Payment.appointment.has(Appointment.hospital_id == hospital_id))
-    
-    # Only successful payments
-    query = query.filter(Payment.status == "SUCCESS")
-    
-    payments = query.order_by(desc(Payment.created_at)).all()
-    
-    # Calculate totals
-    total_amount = sum(p.total_amount for p in payments)
-    total_commission = sum(p.admin_commission for p in payments)
-    total_hospital_payout = sum(p.hospital_payout for p in payments)
-    
-    return {
-        "summary": {
-            "total_payments": len(payments),
-            "total_amount": float(total_amount),
-            "total_commission": float(total_commission),
-            "total_hospital_payout": float(total_hospital_payout),
-            "commission_rate": float(total_commission / total_amount * 100) if total_amount > 0 else 0
-        },
-        "payments": [
-            {
-                "id": p.id,
-                "appointment_id": p.appointment_id,
-                "hospital_name": p.appointment.hospital.name if p.appointment and p.appointment.hospital else "Unknown",
-                "patient_name": p.appointment.patient_name if p.appointment else "Unknown",
-                "total_amount": float(p.total_amount),
-                "admin_commission": float(p.admin_commission),
-                "hospital_payout": float(p.hospital_payout),
-                "commission_percentage": float(p.admin_commission / p.total_amount * 100) if p.total_amount > 0 else 0,
-                "status": p.status,
-                "created_at": p.created_at.isoformat() if p.created_at else None
-            }
-            for p in payments
-        ]
-    }
+    return payment_tracking_report(db, start_date=start_date, end_date=end_date, hospital_id=hospital_id)
 
 
 @router.get("/hospitals/performance")
-def get_hospital_performance(db: Session = Depends(get_db), current_user: User = Depends(require_admin)):
+def get_hospital_performance(db: Session = Depends(get_read_db), current_user: Principal = Depends(require_admin)):
     """Get performance metrics for all hospitals"""
-    
-    hospitals = db.query(Hospital).filter(Hospital.is_approved == True).all()
-    
-    performance_data = []
-    for hospital in hospitals:
-        # Get appointments count
-        appointments_count = db.query(Appointment).filter(
-            Appointment.hospital_id == hospital.id
-        ).count()
-        
-        # Get revenue
-        revenue = db.query(func.sum(Payment.total_amount)).join(Appointment).filter(
-            Appointment.hospital_id == hospital.id,
-            Payment.status == "SUCCESS"
-        ).scalar() or 0
-        
-        # Get commission earned
-        commission = db.query(func.sum(Payment.admin_commission)).join(Appointment).filter(
-            Appointment.hospital_id == hospital.id,
-            Payment.status == "SUCCESS"
-        ).scalar() or 0
-        
-        performance_data.append({
-            "hospital_id": hospital.id,
-            "hospital_name": hospital.name,
-            "city": hospital.city,
-            "appointments_count": appointments_count,
-            "total_revenue": float(revenue),
-            "commission_earned": float(commission),
-            "hospital_payout": float(revenue - commission)
-        })
-    
-    # Sort by revenue
-    performance_data.sort(key=lambda x: x["total_revenue"], reverse=True)
-    
-    return {
-        "hospitals": performance_data,
-        "summary": {
-            "total_hospitals": len(performance_data),
-            "total_revenue": sum(h["total_revenue"] for h in performance_data),
-            "total_commission": sum(h["commission_earned"] for h in performance_data)
-        }
-    }
+    return hospital_performance_report(db)
 
 
 @router.get("/analytics/revenue")
 def get_revenue_analytics(
     period: str = Query("month", regex="^(week|month|year)$"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(require_admin)
 ):
     """Get revenue analytics over time"""
     
@@ -197,42 +172,221 @@ def get_revenue_analytics(
     end_date = datetime.now()
     if period == "week":
         start_date = end_date - timedelta(days=7)
-        date_trunc = "day"
     elif period == "month":
         start_date = end_date - timedelta(days=30)
-        date_trunc = "day"
     else:  # year
         start_date = end_date - timedelta(days=365)
-        date_trunc = "month"
-    
-    # Get payments grouped by date
-    payments = db.query(
-        func.date(Payment.created_at).label('date'),
-        func.sum(Payment.total_amount).label('revenue'),
-        func.sum(Payment.admin_commission).label('commission'),
-        func.count(Payment.id).label('payment_count')
-    ).filter(
-        Payment.status == "SUCCESS",
-        Payment.created_at >= start_date,
-        Payment.created_at <= end_date
-    ).group_by(func.date(Payment.created_at)).all()
-    
+
+    report = revenue_report(db, start_date.isoformat(), end_date.isoformat())
+    return {"period": period, **report}
+
+
+@router.get("/analytics/funnel")
+def get_funnel_analytics(
+    period: str = Query("month", regex="^(day|week|month)$"),
+    start_date: Optional[str] = Query(None),
+    end_date: Optional[str] = Query(None),
+    hospital_id: Optional[int] = Query(None),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(require_admin)
+):
+    """Get booking-to-payment conversion funnel, cohort retention and time-to-payment percentiles"""
+    return funnel_analytics_report(db, period=period, start_date=start_date, end_date=end_date, hospital_id=hospital_id)
+
+
+@router.get("/metrics/replicas")
+def get_replica_status(current_user: Principal = Depends(require_admin)):
+    """Get health and replication lag of the configured read replicas"""
     return {
-        "period": period,
-        "start_date": start_date.isoformat(),
-        "end_date": end_date.isoformat(),
-        "data": [
-            {
-                "date": str(p.date),
-                "revenue": float(p.revenue or 0),
-                "commission": float(p.commission or 0),
-                "payment_count": p.payment_count or 0
-            }
-            for p in payments
-        ],
-        "summary": {
-            "total_revenue": float(sum(p.revenue or 0 for p in payments)),
-            "total_commission": float(sum(p.commission or 0 for p in payments)),
-            "total_payments": sum(p.payment_count or 0 for p in payments)
-        }
+        "max_lag_seconds": replica_router.max_lag,
+        "replicas": replica_router.status()
     }
+
+
+@router.get("/metrics/principal-cache")
+def get_principal_cache_stats(current_user: Principal = Depends(require_admin)):
+    """Get size and hit rate of this worker's authenticated-user cache"""
+    return principal_cache.stats()
+
+
+@router.get("/metrics/token-revocations")
+def get_token_revocation_stats(current_user: Principal = Depends(require_admin)):
+    """Get size and lookup counts of this worker's token revocation filter"""
+    return token_revocations.stats()
+
+
+@router.get("/metrics/db-pool")
+def get_db_pool_stats(current_user: Principal = Depends(require_admin)):
+    """Get connection counts and checkout wait times of this worker's database pools"""
+    return pool_stats()
+
+
+@router.get("/metrics/sql-profile")
+def get_sql_profile(
+    limit: int = Query(20, ge=1, le=200),
+    reset: bool = Query(False),
+    current_user: Principal = Depends(require_admin)
+):
+    """Get this worker's slowest and most repeated statements (needs SQL_PROFILER_ENABLED)"""
+    stats = {"enabled": settings.SQL_PROFILER_ENABLED, **query_profiler.stats(limit)}
+    if reset:
+        query_profiler.reset()
+    return stats
+
+
+@router.put("/users/{user_id}")
+def update_user_access(
+    user_id: int,
+    is_active: Optional[bool] = None,
+    role: Optional[str] = Query(None, regex="^(admin|hospital|patient)$"),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_admin)
+):
+    """Activate or deactivate a user, or change their role"""
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    if is_active is not None:
+        user.is_active = is_active
+    if role is not None:
+        user.role = role
+
+    # Tokens issued so far carry the old role, and cached principals the old
+    # state; neither may outlive the change, in this worker or any other
+    token_revocations.revoke_user(db, user.id)
+    principal_cache.user_changed(db, user.id)
+    db.refresh(user)
+
+    return {"id": user.id, "role": user.role, "is_active": user.is_active}
+
+
+@router.get("/analytics/unique-patients")
+def get_unique_patients(
+    start_date: Optional[str] = Query(None),
+    end_date: Optional[str] = Query(None),
+    hospital_ids: Optional[str] = Query(None, description="Comma-separated hospital IDs to merge"),
+    group_by: str = Query("month", regex="^(day|month|total)$"),
+    max_error: Optional[float] = Query(None, gt=0, lt=1, description="Acceptable standard error, e.g. 0.02"),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(require_admin)
+):
+    """Get approximate distinct patients per hospital and period (HyperLogLog)"""
+    try:
+        ids = [int(i) for i in hospital_ids.split(",") if i.strip()] if hospital_ids else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="hospital_ids must be comma-separated integers")
+    try:
+        start = date.fromisoformat(start_date) if start_date else None
+        end = date.fromisoformat(end_date) if end_date else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be ISO 8601")
+
+    return unique_patients(
+        db,
+        start=start,
+        end=end,
+        hospital_ids=ids,
+        group_by=group_by,
+        max_error=max_error
+    )
+
+
+@router.post("/analytics/unique-patients/rebuild")
+def rebuild_unique_patients(db: Session = Depends(get_db), current_user: Principal = Depends(require_admin)):
+    """Rebuild all patient sketches from the appointments table"""
+    sketches = rebuild_patient_sketches(db)
+    return {"message": "Patient sketches rebuilt", "sketches": sketches}
+
+
+def _spool_settlement(upload: UploadFile) -> str:
+    with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as spooled:
+        shutil.copyfileobj(upload.file, spooled)
+    try:
+        # Reject a bad file now; once the response starts streaming it is too late for a 400
+        with open(spooled.name, newline="", encoding="utf-8-sig") as lines:
+            settlement_columns(next(csv.reader(lines), []))
+    except (ValueError, UnicodeDecodeError):
+        os.unlink(spooled.name)
+        raise
+    return spooled.name
+
+
+@router.post("/reconciliation")
+async def reconcile_settlement(
+    file: UploadFile = File(..., description="Gateway settlement report (CSV)"),
+    amount_in_paise: bool = Query(False),
+    current_user: Principal = Depends(require_admin)
+):
+    """Reconcile a settlement CSV against payments; streams the mismatches as CSV"""
+
+    # The upload is closed once this handler returns, before the response streams
+    try:
+        path = await run_in_threadpool(_spool_settlement, file)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid settlement file: {e}")
+
+    def report():
+        db = SessionLocal(bind=replica_router.engine_for_read())
+        try:
+            with open(path, newline="", encoding="utf-8-sig") as lines:
+                yield from reconcile_csv(db, lines, amount_in_paise=amount_in_paise)
+        finally:
+            db.close()
+            os.unlink(path)
+
+    return StreamingResponse(
+        report(),
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=reconciliation.csv"}
+    )
+
+
+@router.post("/settlements/run")
+def run_settlement(
+    end_date: Optional[str] = Query(None, description="Settle payments created before this time (default: start of today, UTC)"),
+    start_date: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_admin)
+):
+    """Group unsettled successful payments into payout batches per hospital, taking back refunded ones"""
+    try:
+        end = datetime.fromisoformat(end_date) if end_date else datetime.combine(datetime.utcnow().date(), datetime.min.time())
+        start = datetime.fromisoformat(start_date) if start_date else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be ISO 8601")
+    return settle_payments(db, period_end=end, period_start=start)
+
+
+@router.get("/settlements")
+def list_settlements(
+    hospital_id: Optional[int] = Query(None),
+    status: Optional[str] = Query(None, regex="^(PENDING|PAID)$"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(require_admin)
+):
+    """List payout batches, newest first"""
+    query = db.query(SettlementBatch)
+    if hospital_id:
+        query = query.filter(SettlementBatch.hospital_id == hospital_id)
+    if status:
+        query = query.filter(SettlementBatch.status == status)
+
+    return [
+        {
+            "id": batch.id,
+            "hospital_id": batch.hospital_id,
+            "period_start": batch.period_start,
+            "period_end": batch.period_end,
+            "payment_count": batch.payment_count,
+            "refund_count": batch.refund_count,
+            "gross_amount": batch.gross_paise / 100,
+            "commission": batch.commission_paise / 100,
+            "payout": batch.payout_paise / 100,
+            "payout_paise": batch.payout_paise,
+            "status": batch.status,
+            "created_at": batch.created_at
+        }
+        for batch in query.order_by(desc(SettlementBatch.created_at), SettlementBatch.id).limit(limit)
+    ]
@@ -1,38 +1,51 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import datetime
 
-from app.db.session import get_db
+from app.db.session import get_async_db, get_db
 from app.models.appointment import Appointment
 from app.models.hospital import Hospital
+from app.models.service import Service
 from app.models.user import User
 from app.schemas.appointment import AppointmentCreate, AppointmentResponse
+from app.core.principals import Principal
 from app.core.dependencies import require_patient, require_hospital, get_current_user
+from app.core.events import dashboard_feed
+from app.core.unique_patients import record_patient_visit
+from app.core.settlements import to_paise
 
 router = APIRouter(prefix="/appointments", tags=["Appointments"])
 
 
 @router.post("/", response_model=AppointmentResponse, status_code=status.HTTP_201_CREATED)
-def book_appointment(appointment_in: AppointmentCreate, db: Session = Depends(get_db), current_user: User = Depends(require_patient)):
+async def book_appointment(appointment_in: AppointmentCreate, db: AsyncSession = Depends(get_async_db), current_user: Principal = Depends(require_patient)):
     # Validate hospital
-    hospital = db.query(Hospital).filter(
+    hospital_id = await db.scalar(select(Hospital.id).where(
         Hospital.id == appointment_in.hospital_id,
         Hospital.is_approved == True
-    ).first()
+    ))
 
-    if not hospital:
+    if hospital_id is None:
         raise HTTPException(status_code=404, detail="Hospital not found or not approved")
 
     # Validate patient
-    patient = db.query(User).filter(
+    patient_id = await db.scalar(select(User.id).where(
         User.id == appointment_in.patient_id,
         User.role == "patient"
-    ).first()
+    ))
 
-    if not patient:
+    if patient_id is None:
         raise HTTPException(status_code=404, detail="Patient not found")
 
+    # Amount due is the hospital's listed price for the service, if it has one
+    price = await db.scalar(select(Service.price).where(
+        Service.hospital_id == appointment_in.hospital_id,
+        Service.service_name == appointment_in.service
+    ).order_by(Service.id).limit(1))
+
     # Create appointment
     appointment = Appointment(
         patient_id=appointment_in.patient_id,
@@ -40,18 +53,27 @@ def book_appointment(appointment_in: AppointmentCreate, db: Session = Depends(ge
         service=appointment_in.service,
         appointment_date=appointment_in.appointment_date,
         status="BOOKED",
+        total_due_paise=to_paise(price) if price is not None else None,
+        paid_paise=0,
         created_at=datetime.utcnow()
     )
 
     db.add(appointment)
-    db.commit()
-    db.refresh(appointment)
+    await db.commit()
+
+    # The sketch update is shared with sync callers; run it on this session's sync facade
+    await db.run_sync(
+        record_patient_visit, appointment_in.hospital_id, appointment_in.patient_id, appointment_in.appointment_date.date()
+    )
+    await db.refresh(appointment)
+
+    dashboard_feed.appointment_booked(appointment)
 
     return appointment
 
 
 @router.get("/hospital/{hospital_id}", response_model=List[AppointmentResponse])
-def get_hospital_appointments(hospital_id: int, db: Session = Depends(get_db), current_user: User = Depends(require_hospital)):
+def get_hospital_appointments(hospital_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(require_hospital)):
     hospital = db.query(Hospital).filter(Hospital.id == hospital_id).first()
     if not hospital:
         raise HTTPException(status_code=404, detail="Hospital not found")
@@ -60,7 +82,7 @@ def get_hospital_appointments(hospital_id: int, db: Session = Depends(get_db), c
 
 
 @router.get("/patient/{patient_id}", response_model=List[AppointmentResponse])
-def get_patient_appointments(patient_id: int, db: Session = Depends(get_db), current_user: User = Depends(require_patient)):
+def get_patient_appointments(patient_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(require_patient)):
     patient = db.query(User).filter(User.id == patient_id).first()
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
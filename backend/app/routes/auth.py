@@ -1,47 +1,134 @@
-from datetime import timedelta
+from datetime import datetime, timedelta
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 
-from app.db.session import get_db
-from app.core.security import verify_password, get_password_hash, create_access_token
+from app.db.session import end_read_transaction, get_db
+from app.core.security import decode_access_token
+from app.core.password_hashing import HashingOverloaded, password_hasher
+from app.core.principals import Principal
+from app.core.revocation import token_revocations
+from app.core.tokens import InvalidRefreshToken, issue_tokens, revoke_refresh_token, rotate_refresh_token
 from app.core.config import settings
 from app.models.user import User
-from app.schemas.user import UserCreate, UserLogin, UserResponse
+from app.schemas.user import TokenRefresh, UserCreate, UserLogin, UserResponse
 
 router = APIRouter(tags=["Authentication"])
 
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
+
+
+def _find_user(db: Session, email: str) -> Optional[User]:
+    user = db.query(User).filter(User.email == email).first()
+    end_read_transaction(db)
+    return user
+
+
+def _save(db: Session, obj) -> None:
+    db.add(obj)
+    db.commit()
+    db.refresh(obj)
+
+
+def _password_hashing_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-ins in progress, try again shortly",
+        headers={"Retry-After": "1"}
+    )
+
 
 @router.post("/register", response_model=UserResponse)
-def register_user(user_in: UserCreate, db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(User.email == user_in.email).first()
+async def register_user(user_in: UserCreate, db: Session = Depends(get_db)):
+    existing_user = await run_in_threadpool(_find_user, db, user_in.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
-    
+
+    try:
+        hashed_password = await password_hasher.hash(user_in.password)
+    except HashingOverloaded:
+        raise _password_hashing_busy()
+
     user = User(
         name=user_in.name,
         email=user_in.email,
-        password=get_password_hash(user_in.password),
+        password=hashed_password,
         role=user_in.role
     )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    await run_in_threadpool(_save, db, user)
     return user
 
 
 @router.post("/login")
-def login_user(user_in: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == user_in.email).first()
-    if not user or not verify_password(user_in.password, user.password):
+async def login_user(user_in: UserLogin, db: Session = Depends(get_db)):
+    user = await run_in_threadpool(_find_user, db, user_in.email)
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
         )
-    
-    access_token = create_access_token(
-        data={"sub": str(user.id), "role": user.role}
-    )
-    return {"access_token": access_token, "token_type": "bearer"}
+
+    # bcrypt runs in the hashing pool, not on the request threadpool
+    try:
+        valid, new_hash = await password_hasher.verify(user_in.password, user.password)
+    except HashingOverloaded:
+        raise _password_hashing_busy()
+    if not valid:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid credentials"
+        )
+
+    # Checked after the password, so it tells nothing to someone guessing it.
+    # Deactivation only revokes tokens already issued; this stops new ones.
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Account is deactivated"
+        )
+
+    # Hashed with other cost settings; upgrade it while we have the plain password
+    if new_hash:
+        user.password = new_hash
+        await run_in_threadpool(_save, db, user)
+
+    return await run_in_threadpool(issue_tokens, db, Principal(user.id, user.role, user.is_active))
+
+
+@router.post("/refresh")
+def refresh_tokens(token_in: TokenRefresh, db: Session = Depends(get_db)):
+    """Exchange a refresh token for a new access/refresh pair"""
+    try:
+        return rotate_refresh_token(db, token_in.refresh_token)
+    except InvalidRefreshToken as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e)
+        )
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout_user(
+    token_in: TokenRefresh,
+    access_token: Optional[str] = Depends(optional_oauth2_scheme),
+    db: Session = Depends(get_db)
+):
+    """Revoke the refresh token and, if sent, the access token"""
+    try:
+        revoke_refresh_token(db, token_in.refresh_token)
+    except InvalidRefreshToken as e:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
+
+    if access_token:
+        try:
+            claims = decode_access_token(access_token)
+        except ValueError:
+            return
+        if claims.get("jti"):
+            token_revocations.revoke_token(db, claims["jti"], datetime.utcfromtimestamp(claims["exp"]))
+            db.commit()
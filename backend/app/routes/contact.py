@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from typing import List
 
 from app.db.session import get_db
+from app.core.events import dashboard_feed
 from app.models.contact import Contact
 from app.schemas.contact import ContactCreate, ContactResponse
 
@@ -23,6 +24,9 @@ def create_enquiry(contact: ContactCreate, db: Session = Depends(get_db)):
     db.add(db_contact)
     db.commit()
     db.refresh(db_contact)
+
+    dashboard_feed.enquiries_changed(+1)
+
     return db_contact
 
 
@@ -49,6 +53,11 @@ def update_enquiry_status(enquiry_id: int, status: str, db: Session = Depends(ge
     if not enquiry:
         raise HTTPException(status_code=404, detail="Enquiry not found")
     
+    previous_status = enquiry.status
     enquiry.status = status
     db.commit()
+
+    if previous_status != status and "PENDING" in (previous_status, status):
+        dashboard_feed.enquiries_changed(1 if status == "PENDING" else -1)
+
     return {"message": f"Enquiry status updated to {status}"}
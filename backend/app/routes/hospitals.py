@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, and_, select
 from typing import List, Optional
 
-from app.db.session import get_db
+from app.db.session import get_async_read_db, get_db
 from app.models.hospital import Hospital
 from app.models.user import User
 from app.schemas.hospital import HospitalCreate, HospitalResponse, HospitalUpdate
@@ -49,7 +50,7 @@ def register_hospital(hospital_in: HospitalCreate, db: Session = Depends(get_db)
 
 
 @router.get("/")
-def list_hospitals(
+async def list_hospitals(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     search: Optional[str] = Query(None),
@@ -57,19 +58,19 @@ def list_hospitals(
     city: Optional[str] = Query(None),
     specialty: Optional[str] = Query(None),
     approved_only: bool = Query(True),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get hospitals with search and filtering capabilities"""
     try:
-        query = db.query(Hospital)
+        query = select(Hospital)
         
         # Filter by approval status
         if approved_only:
-            query = query.filter(Hospital.is_approved == True)
+            query = query.where(Hospital.is_approved == True)
         
         # Search by name, city, or description
         if search:
-            query = query.filter(
+            query = query.where(
                 or_(
                     Hospital.name.ilike(f"%{search}%"),
                     Hospital.city.ilike(f"%{search}%"),
@@ -79,18 +80,18 @@ def list_hospitals(
         
         # Filter by category
         if category:
-            query = query.filter(Hospital.category == category)
+            query = query.where(Hospital.category == category)
         
         # Filter by city
         if city:
-            query = query.filter(Hospital.city.ilike(f"%{city}%"))
+            query = query.where(Hospital.city.ilike(f"%{city}%"))
         
         # Filter by specialty (JSON field contains) - temporarily disabled due to JSON query issues
         if specialty:
             # For now, skip specialty filtering to avoid JSON query issues
             pass
         
-        hospitals = query.offset(skip).limit(limit).all()
+        hospitals = (await db.scalars(query.offset(skip).limit(limit))).all()
         
         # Manually serialize to avoid Pydantic response model issues
         result = []
@@ -104,9 +105,9 @@ def list_hospitals(
 
 
 @router.get("/{hospital_id}", response_model=HospitalResponse)
-def get_hospital(hospital_id: int, db: Session = Depends(get_db)):
+async def get_hospital(hospital_id: int, db: AsyncSession = Depends(get_async_read_db)):
     """Get hospital details by ID"""
-    hospital = db.query(Hospital).filter(Hospital.id == hospital_id).first()
+    hospital = await db.get(Hospital, hospital_id)
     if not hospital:
         raise HTTPException(status_code=404, detail="Hospital not found")
     return hospital
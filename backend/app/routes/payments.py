@@ -1,24 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import Dict, Optional
-import razorpay
-
-from app.db.session import get_db
-from app.core.config import settings
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+from app.db.session import end_read_transaction, get_async_db, get_db
+from app.core.config_cache import config_cache
+from app.core.events import dashboard_feed
+from app.core.idempotency import idempotency_store
+from app.core.webhooks import webhook_queue
+from app.core.payments import mark_payment_captured
+from app.core.settlements import ledger_amounts, to_paise
+from app.core.payment_gateway import GatewayError, GatewayUnavailable, RazorpayGateway, get_payment_gateway
 from app.models.payment import Payment
 from app.models.appointment import Appointment
-from app.models.settings import CommissionSettings
 from app.schemas.payment import PaymentCreate, PaymentResponse, PaymentVerification
 
 router = APIRouter()
 
 
-# Initialize Razorpay client
-razorpay_client = razorpay.Client(
-    auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET)
-)
-
-
 def calculate_payment_split(total_amount: float, commission_percentage: float = 10.0) -> Dict[str, float]:
     """Calculate payment split between admin and hospital"""
     admin_commission = round(total_amount * (commission_percentage / 100), 2)
@@ -30,54 +34,87 @@ def calculate_payment_split(total_amount: float, commission_percentage: float =
     }
 
 
-@router.post("/create-order", status_code=status.HTTP_201_CREATED)
-def create_payment_order(payment_data: PaymentCreate, db: Session = Depends(get_db)):
-    """Create a payment order with commission calculation"""
-    
-    # Validate appointment
-    appointment = db.query(Appointment).filter(Appointment.id == payment_data.appointment_id).first()
+def _load_order_context(db: Session, appointment_id: int) -> Tuple[Appointment, float]:
+    """Fetch the appointment and active commission rate for a new order"""
+    appointment = db.query(Appointment).filter(Appointment.id == appointment_id).first()
     if not appointment:
         raise HTTPException(status_code=404, detail="Appointment not found")
 
-    if payment_data.amount <= 0:
-        raise HTTPException(status_code=400, detail="Invalid payment amount")
+    commission_percentage = config_cache.commission_percentage(db)
+    # The gateway call comes next; don't keep the transaction open across it
+    end_read_transaction(db)
+    return appointment, commission_percentage
 
-    # Get commission settings
-    commission_setting = db.query(CommissionSettings).filter(CommissionSettings.is_active == True).first()
-    commission_percentage = commission_setting.commission_percentage if commission_setting else 10.0
 
-    # Calculate commission split
-    split = calculate_payment_split(payment_data.amount, commission_percentage)
-
-    # Create Razorpay order
-    try:
-        order = razorpay_client.order.create({
-            "amount": int(payment_data.amount * 100),  # Razorpay uses paise
-            "currency": "INR",
-            "payment_capture": 1,
-            "receipt": f"receipt_{appointment.id}",
-            "notes": {
-                "appointment_id": appointment.id,
-                "patient_name": appointment.patient_name,
-                "hospital_name": appointment.hospital.name if appointment.hospital else "Unknown"
-            }
-        })
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to create payment order: {str(e)}")
-
-    # Create payment record
+def _record_pending_payment(db: Session, appointment_id: int, order_id: str, amount: float, split: Dict[str, float]) -> Payment:
     payment = Payment(
-        appointment_id=appointment.id,
-        razorpay_order_id=order.get("id"),
-        total_amount=payment_data.amount,
+        appointment_id=appointment_id,
+        razorpay_order_id=order_id,
+        total_amount=amount,
         admin_commission=split["admin_commission"],
         hospital_payout=split["hospital_payout"],
+        **ledger_amounts(amount, split["admin_commission"]),
         status="PENDING"
     )
 
     db.add(payment)
     db.commit()
     db.refresh(payment)
+    return payment
+
+
+async def _create_gateway_order(gateway: RazorpayGateway, error_prefix: str, **order) -> dict:
+    try:
+        return await gateway.create_order(**order)
+    except GatewayUnavailable as e:
+        raise HTTPException(status_code=503, detail=f"{error_prefix}: {str(e)}", headers={"Retry-After": "30"})
+    except GatewayError as e:
+        raise HTTPException(status_code=502, detail=f"{error_prefix}: {str(e)}")
+
+
+@router.post("/create-order", status_code=status.HTTP_201_CREATED)
+async def create_payment_order(
+    payment_data: PaymentCreate,
+    idempotency_key: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    gateway: RazorpayGateway = Depends(get_payment_gateway)
+):
+    """Create a payment order with commission calculation"""
+    return await idempotency_store.execute(
+        idempotency_key, "create-order", payment_data, status.HTTP_201_CREATED,
+        lambda: _create_payment_order(payment_data, db, gateway)
+    )
+
+
+async def _create_payment_order(payment_data: PaymentCreate, db: Session, gateway: RazorpayGateway) -> dict:
+    # Validate appointment and get commission settings
+    appointment, commission_percentage = await run_in_threadpool(
+        _load_order_context, db, payment_data.appointment_id
+    )
+
+    if payment_data.amount <= 0:
+        raise HTTPException(status_code=400, detail="Invalid payment amount")
+
+    # Calculate commission split
+    split = calculate_payment_split(payment_data.amount, commission_percentage)
+
+    # Create Razorpay order
+    order = await _create_gateway_order(
+        gateway,
+        "Failed to create payment order",
+        amount=to_paise(payment_data.amount),  # Razorpay uses paise; the same conversion as the ledger
+        receipt=f"receipt_{appointment.id}",
+        notes={
+            "appointment_id": appointment.id,
+            "patient_id": appointment.patient_id,
+            "hospital_id": appointment.hospital_id
+        }
+    )
+
+    # Create payment record
+    await run_in_threadpool(
+        _record_pending_payment, db, appointment.id, order.get("id"), payment_data.amount, split
+    )
 
     return {
         "order_id": order.get("id"),
@@ -92,41 +129,50 @@ def create_payment_order(payment_data: PaymentCreate, db: Session = Depends(get_
 
 
 @router.post("/verify", status_code=status.HTTP_200_OK)
-def verify_payment(verification_data: PaymentVerification, db: Session = Depends(get_db)):
+async def verify_payment(
+    verification_data: PaymentVerification,
+    idempotency_key: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    gateway: RazorpayGateway = Depends(get_payment_gateway)
+):
     """Verify payment and update status"""
     
-    # Verify Razorpay signature
-    try:
-        payload = {
-            'razorpay_order_id': verification_data.razorpay_order_id,
-            'razorpay_payment_id': verification_data.razorpay_payment_id,
-            'razorpay_signature': verification_data.razorpay_signature
-        }
-        razorpay_client.utility.verify_payment_signature(payload)
-    except razorpay.errors.SignatureVerificationError:
+    # Verify Razorpay signature (local HMAC check, no gateway round trip)
+    if not gateway.verify_payment_signature(
+        verification_data.razorpay_order_id,
+        verification_data.razorpay_payment_id,
+        verification_data.razorpay_signature
+    ):
         raise HTTPException(status_code=400, detail="Payment verification failed")
 
+    return await idempotency_store.execute(
+        idempotency_key, "verify", verification_data, status.HTTP_200_OK,
+        lambda: _confirm_payment(verification_data, db)
+    )
+
+
+async def _confirm_payment(verification_data: PaymentVerification, db: AsyncSession) -> dict:
     # Find payment record
-    payment = db.query(Payment).filter(
+    payment = await db.scalar(select(Payment).where(
         Payment.razorpay_order_id == verification_data.razorpay_order_id
-    ).first()
+    ))
 
     if not payment:
         raise HTTPException(status_code=404, detail="Payment record not found")
 
-    # Update payment status
-    payment.razorpay_payment_id = verification_data.razorpay_payment_id
-    payment.razorpay_signature = verification_data.razorpay_signature
-    payment.status = "SUCCESS"
+    # Update payment status and the appointment balance (a webhook may already have done so)
+    captured = await db.run_sync(
+        mark_payment_captured,
+        payment,
+        verification_data.razorpay_payment_id,
+        verification_data.razorpay_signature
+    )
 
-    # Update appointment status
-    appointment = db.query(Appointment).filter(Appointment.id == payment.appointment_id).first()
-    if appointment:
-        appointment.status = "CONFIRMED"
-        appointment.paid_amount = payment.total_amount
+    await db.commit()
+    await db.refresh(payment)
 
-    db.commit()
-    db.refresh(payment)
+    if captured:
+        dashboard_feed.payment_succeeded(payment)
 
     return {
         "message": "Payment successful",
@@ -139,6 +185,82 @@ def verify_payment(verification_data: PaymentVerification, db: Session = Depends
     }
 
 
+@router.post("/webhook")
+async def receive_webhook(
+    request: Request,
+    x_razorpay_signature: Optional[str] = Header(None),
+    x_razorpay_event_id: Optional[str] = Header(None),
+    gateway: RazorpayGateway = Depends(get_payment_gateway)
+):
+    """Receive a gateway webhook; the event is stored now and applied in the background"""
+    
+    body = await request.body()
+    if not x_razorpay_signature or not gateway.verify_webhook_signature(body, x_razorpay_signature):
+        raise HTTPException(status_code=400, detail="Invalid webhook signature")
+
+    try:
+        event = json.loads(body)
+        event_type = event["event"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Malformed webhook payload")
+
+    # Redeliveries carry the same event id and are dropped on insert
+    event_id = x_razorpay_event_id or hashlib.sha256(body).hexdigest()
+    await webhook_queue.enqueue(event_id, event_type, event)
+
+    return {"status": "accepted"}
+
+
+@router.put("/commission-settings")
+def update_commission_settings(
+    commission_percentage: float,
+    effective_from: Optional[datetime] = None,
+    description: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Update commission percentage (admin only)"""
+    
+    if commission_percentage < 0 or commission_percentage > 100:
+        raise HTTPException(status_code=400, detail="Commission percentage must be between 0 and 100")
+
+    # Stored as naive UTC like every other timestamp
+    if effective_from and effective_from.tzinfo:
+        effective_from = effective_from.astimezone(timezone.utc).replace(tzinfo=None)
+
+    # Recorded as a new version so splits of earlier payments stay reproducible
+    commission = config_cache.update_commission(db, commission_percentage, effective_from, description)
+
+    return {
+        "message": "Commission settings updated successfully",
+        "commission_percentage": commission.commission_percentage,
+        "version": commission.version,
+        "effective_from": commission.effective_from
+    }
+
+
+@router.get("/commission-settings")
+def get_commission_settings(at: Optional[datetime] = None, db: Session = Depends(get_db)):
+    """Get the commission settings in effect now, or at a given time"""
+    
+    if at and at.tzinfo:
+        at = at.astimezone(timezone.utc).replace(tzinfo=None)
+    commission = config_cache.commission(db, at)
+
+    return {
+        "commission_percentage": commission.commission_percentage,
+        "description": commission.description,
+        "updated_at": commission.updated_at,
+        "version": commission.version,
+        "effective_from": commission.effective_from
+    }
+
+
+@router.get("/commission-settings/history")
+def get_commission_history(db: Session = Depends(get_db)):
+    """List every commission version in effective order"""
+    return [commission._asdict() for commission in config_cache.commission_history(db)]
+
+
 @router.get("/{payment_id}", response_model=PaymentResponse)
 def get_payment(payment_id: int, db: Session = Depends(get_db)):
     """Get payment details by ID"""
@@ -173,65 +295,69 @@ def get_payment_status(payment_id: int, db: Session = Depends(get_db)):
 
 
 @router.post("/initiate-partial")
-def initiate_partial_payment(
+async def initiate_partial_payment(
     appointment_id: int,
     partial_amount: float,
-    db: Session = Depends(get_db)
+    idempotency_key: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    gateway: RazorpayGateway = Depends(get_payment_gateway)
 ):
     """Initiate partial payment for appointment"""
-    
-    # Validate appointment
-    appointment = db.query(Appointment).filter(Appointment.id == appointment_id).first()
-    if not appointment:
-        raise HTTPException(status_code=404, detail="Appointment not found")
+    return await idempotency_store.execute(
+        idempotency_key,
+        "initiate-partial",
+        {"appointment_id": appointment_id, "partial_amount": partial_amount},
+        status.HTTP_200_OK,
+        lambda: _initiate_partial_payment(appointment_id, partial_amount, db, gateway)
+    )
+
+
+async def _initiate_partial_payment(
+    appointment_id: int,
+    partial_amount: float,
+    db: Session,
+    gateway: RazorpayGateway
+) -> dict:
+    # Validate appointment and get commission settings
+    appointment, commission_percentage = await run_in_threadpool(_load_order_context, db, appointment_id)
 
     if partial_amount <= 0:
         raise HTTPException(status_code=400, detail="Invalid partial payment amount")
 
-    if partial_amount > appointment.total_amount:
-        raise HTTPException(status_code=400, detail="Partial amount cannot exceed total amount")
+    # Balance is kept on the appointment, so this needs no sum over its payments
+    outstanding = appointment.outstanding_paise
+    if outstanding is None:
+        raise HTTPException(status_code=400, detail="Appointment has no amount due")
 
-    # Get commission settings
-    commission_setting = db.query(CommissionSettings).filter(CommissionSettings.is_active == True).first()
-    commission_percentage = commission_setting.commission_percentage if commission_setting else 10.0
+    if to_paise(partial_amount) > outstanding:
+        raise HTTPException(status_code=400, detail="Partial amount cannot exceed outstanding amount")
+    remaining_amount = (outstanding - to_paise(partial_amount)) / 100
 
     # Calculate commission split for partial payment
     split = calculate_payment_split(partial_amount, commission_percentage)
 
     # Create Razorpay order for partial payment
-    try:
-        order = razorpay_client.order.create({
-            "amount": int(partial_amount * 100),
-            "currency": "INR",
-            "payment_capture": 1,
-            "receipt": f"partial_receipt_{appointment.id}",
-            "notes": {
-                "appointment_id": appointment.id,
-                "partial_payment": True,
-                "remaining_amount": appointment.total_amount - partial_amount
-            }
-        })
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to create partial payment order: {str(e)}")
+    order = await _create_gateway_order(
+        gateway,
+        "Failed to create partial payment order",
+        amount=to_paise(partial_amount),
+        receipt=f"partial_receipt_{appointment.id}",
+        notes={
+            "appointment_id": appointment.id,
+            "partial_payment": True,
+            "remaining_amount": remaining_amount
+        }
+    )
 
     # Create payment record for partial payment
-    payment = Payment(
-        appointment_id=appointment.id,
-        razorpay_order_id=order.get("id"),
-        total_amount=partial_amount,
-        admin_commission=split["admin_commission"],
-        hospital_payout=split["hospital_payout"],
-        status="PENDING"
+    await run_in_threadpool(
+        _record_pending_payment, db, appointment.id, order.get("id"), partial_amount, split
     )
 
-    db.add(payment)
-    db.commit()
-    db.refresh(payment)
-
     return {
         "order_id": order.get("id"),
         "partial_amount": partial_amount,
-        "remaining_amount": appointment.total_amount - partial_amount,
+        "remaining_amount": remaining_amount,
         "currency": "INR",
         "commission_split": {
             "admin_commission": split["admin_commission"],
@@ -239,49 +365,3 @@ def initiate_partial_payment(
             "commission_percentage": split["commission_percentage"]
         }
     }
-
-
-@router.put("/commission-settings")
-def update_commission_settings(
-    commission_percentage: float,
-    db: Session = Depends(get_db)
-):
-    """Update commission percentage (admin only)"""
-    
-    if commission_percentage < 0 or commission_percentage > 100:
-        raise HTTPException(status_code=400, detail="Commission percentage must be between 0 and 100")
-
-    # Update existing setting or create new one
-    setting = db.query(CommissionSettings).filter(CommissionSettings.is_active == True).first()
-    if setting:
-        setting.commission_percentage = commission_percentage
-    else:
-        setting = CommissionSettings(commission_percentage=commission_percentage)
-        db.add(setting)
-
-    db.commit()
-    db.refresh(setting)
-
-    return {
-        "message": "Commission settings updated successfully",
-        "commission_percentage": setting.commission_percentage
-    }
-
-
-@router.get("/commission-settings")
-def get_commission_settings(db: Session = Depends(get_db)):
-    """Get current commission settings"""
-    
-    setting = db.query(CommissionSettings).filter(CommissionSettings.is_active == True).first()
-    if not setting:
-        # Create default setting if none exists
-        setting = CommissionSettings(commission_percentage=10.0)
-        db.add(setting)
-        db.commit()
-        db.refresh(setting)
-
-    return {
-        "commission_percentage": setting.commission_percentage,
-        "description": setting.description,
-        "updated_at": setting.updated_at
-    }
@@ -0,0 +1,72 @@
+import asyncio
+import time
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from typing import List
+
+from app.db.session import get_db
+from app.models.report_job import ReportJob
+from app.core.principals import Principal
+from app.core.dependencies import require_admin
+from app.core.report_jobs import ACTIVE_STATUSES, ReportQueueFull, report_jobs
+from app.schemas.report import ReportJobCreate, ReportJobResponse
+
+router = APIRouter()
+
+# Seconds between status checks when a job runs in another worker process
+POLL_INTERVAL = 1.0
+
+
+def _load_job(db: Session, job_id: str) -> ReportJob:
+    # End the previous read so every poll sees freshly committed state
+    db.rollback()
+    job = db.get(ReportJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Report job not found")
+    return job
+
+
+@router.post("/", response_model=ReportJobResponse, status_code=status.HTTP_202_ACCEPTED)
+def submit_report(job_in: ReportJobCreate, db: Session = Depends(get_db), current_user: Principal = Depends(require_admin)):
+    """Submit a report to run in the background (identical requests share one job)"""
+    try:
+        return report_jobs.submit(db, job_in.report_type, job_in.params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ReportQueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many report jobs pending, try again later",
+            headers={"Retry-After": "30"}
+        )
+
+
+@router.get("/", response_model=List[ReportJobResponse])
+def list_reports(limit: int = Query(20, ge=1, le=100), db: Session = Depends(get_db), current_user: Principal = Depends(require_admin)):
+    """List the most recent report jobs"""
+    return db.query(ReportJob).order_by(ReportJob.created_at.desc()).limit(limit).all()
+
+
+@router.get("/{job_id}", response_model=ReportJobResponse)
+async def get_report(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=60, description="Seconds to long-poll for completion"),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_admin)
+):
+    """Get report job status and, once finished, its result"""
+    deadline = time.monotonic() + wait
+    job = await run_in_threadpool(_load_job, db, job_id)
+
+    while job.status in ACTIVE_STATUSES:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        if report_jobs.is_local(job_id):
+            await report_jobs.wait(job_id, remaining)
+        else:
+            await asyncio.sleep(min(POLL_INTERVAL, remaining))
+        job = await run_in_threadpool(_load_job, db, job_id)
+
+    return job
@@ -2,12 +2,12 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
 from app.models.service import Service
 from app.models.hospital import Hospital
 from app.schemas.service import ServiceCreate, ServiceResponse, ServiceUpdate
+from app.core.principals import Principal
 from app.core.dependencies import require_admin, require_hospital, get_current_user
-from app.models.user import User
 
 router = APIRouter()
 
@@ -16,7 +16,7 @@ router = APIRouter()
 def create_service(
     service: ServiceCreate, 
     db: Session = Depends(get_db), 
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Create a new service (hospital owner or admin only)"""
     # Verify hospital exists and user has permission
@@ -50,7 +50,7 @@ def get_services(
     hospital_id: Optional[int] = Query(None),
     category: Optional[str] = Query(None),
     active_only: bool = Query(True),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get services with filtering"""
     query = db.query(Service)
@@ -78,7 +78,7 @@ def get_service(service_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/hospital/{hospital_id}", response_model=List[ServiceResponse])
-def get_hospital_services(hospital_id: int, active_only: bool = Query(True), db: Session = Depends(get_db)):
+def get_hospital_services(hospital_id: int, active_only: bool = Query(True), db: Session = Depends(get_read_db)):
     """Get all services for a specific hospital"""
     # Verify hospital exists
     hospital = db.query(Hospital).filter(Hospital.id == hospital_id).first()
@@ -98,7 +98,7 @@ def update_service(
     service_id: int,
     service_update: ServiceUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Update service details (hospital owner or admin only)"""
     service = db.query(Service).filter(Service.id == service_id).first()
@@ -124,7 +124,7 @@ def update_service(
 def delete_service(
     service_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    current_user: Principal = Depends(require_admin)
 ):
     """Delete a service (admin only)"""
     service = db.query(Service).filter(Service.id == service_id).first()
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
+from typing import Optional
 
 
 class AppointmentBase(BaseModel):
@@ -17,6 +18,9 @@ class AppointmentResponse(AppointmentBase):
     id: int
     status: str
     created_at: datetime
+    total_due: Optional[float] = None
+    paid_amount: float = 0
+    outstanding_amount: Optional[float] = None
 
     class Config:
         orm_mode = True
@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+from typing import Optional, Dict, Any
+from datetime import datetime
+
+
+class ReportJobCreate(BaseModel):
+    report_type: str  # performance, payment_tracking, revenue, funnel
+    params: Dict[str, Any] = {}
+
+
+class ReportJobResponse(BaseModel):
+    id: str
+    report_type: str
+    params: Optional[Dict[str, Any]] = None
+    status: str
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
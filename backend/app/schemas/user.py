@@ -17,6 +17,10 @@ class UserLogin(BaseModel):
     password: str
 
 
+class TokenRefresh(BaseModel):
+    refresh_token: str
+
+
 class UserResponse(UserBase):
     id: int
     is_active: bool
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Compare sync and async route handlers under high concurrency.
+
+Serves the hospital detail and list endpoints both through the async
+handlers in the app and through sync copies of them (thread pool plus
+the sync engine), and reports requests/s for each at --concurrency
+in-flight requests. Sync handlers are capped by the thread pool
+(--threads, anyio's default is 40); async ones are not. Uses a scratch
+SQLite database unless DATABASE_URL is set; point it at Postgres to
+include real network round trips.
+
+Usage: python benchmarks/bench_async.py [--requests 5000] [--concurrency 500] [--threads 40]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench_async.db")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import anyio
+import httpx
+from fastapi import Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.main import app
+from app.db.migrations import upgrade
+from app.db.session import SessionLocal, async_engine, engine, get_db
+from app.models.hospital import Hospital
+from app.schemas.hospital import HospitalResponse
+
+
+@app.get("/bench/sync/hospitals/{hospital_id}")
+def sync_get_hospital(hospital_id: int, db: Session = Depends(get_db)):
+    hospital = db.query(Hospital).filter(Hospital.id == hospital_id).first()
+    if not hospital:
+        raise HTTPException(status_code=404, detail="Hospital not found")
+    return HospitalResponse.model_validate(hospital)
+
+
+@app.get("/bench/sync/hospitals")
+def sync_list_hospitals(limit: int = 20, db: Session = Depends(get_db)):
+    hospitals = db.query(Hospital).filter(Hospital.is_approved == True).limit(limit).all()
+    return [HospitalResponse.model_validate(hospital).model_dump() for hospital in hospitals]
+
+
+def seed(count: int) -> None:
+    db = SessionLocal()
+    try:
+        db.bulk_insert_mappings(Hospital, [
+            {
+                "name": f"Hospital {i}", "address": f"{i} Main Road", "city": "Pune",
+                "contact_email": f"hospital{i}@example.com", "contact_phone": "9000000000",
+                "category": "General", "specialties": ["Cardiology", "Orthopedics"],
+                "is_approved": True
+            }
+            for i in range(count)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run(client: httpx.AsyncClient, paths: list, requests: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(i: int):
+        async with semaphore:
+            response = await client.get(paths[i % len(paths)])
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call(i) for i in range(requests)))
+    return requests / (time.perf_counter() - start)
+
+
+async def main_async(args) -> None:
+    # Startup hooks (and their schema check) do not run in-process
+    upgrade(engine)
+    seed(args.hospitals)
+    anyio.to_thread.current_default_thread_limiter().total_tokens = args.threads
+    ids = range(1, args.hospitals + 1)
+
+    scenarios = {
+        "hospital detail": (
+            [f"/bench/sync/hospitals/{i}" for i in ids],
+            [f"/api/hospitals/{i}" for i in ids]
+        ),
+        "hospital list": (
+            ["/bench/sync/hospitals?limit=20"],
+            ["/api/hospitals/?limit=20"]
+        )
+    }
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for label, (sync_paths, async_paths) in scenarios.items():
+            # Warm both connection pools before measuring
+            await run(client, sync_paths, 100, 10)
+            await run(client, async_paths, 100, 10)
+            sync_rate = await run(client, sync_paths, args.requests, args.concurrency)
+            async_rate = await run(client, async_paths, args.requests, args.concurrency)
+            print(f"{label:16} sync {sync_rate:8,.0f} req/s  async {async_rate:8,.0f} req/s  ({async_rate / sync_rate:.2f}x)")
+
+    # No lifespan runs in-process; close the async driver's connection threads
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=40)
+    parser.add_argument("--hospitals", type=int, default=200)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Benchmark authenticated requests with and without the principal cache.
+
+Sends --requests authenticated requests to a minimal endpoint that only
+resolves the current user, first with the cache disabled and then
+enabled, and reports requests/s and SQL statements per request. Finally
+deactivates a user through the admin API and checks their next request
+is refused. Uses a scratch SQLite database unless DATABASE_URL is set.
+
+Usage: python benchmarks/bench_auth.py [--requests 5000] [--users 100] [--concurrency 50]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench_auth.db")
+os.environ.setdefault("SECRET_KEY", "bench")
+
+import httpx
+from fastapi import Depends
+from sqlalchemy import event
+
+from app.main import app
+from app.core.dependencies import get_current_user
+from app.core.principals import Principal, principal_cache
+from app.core.security import create_access_token
+from app.db.migrations import upgrade
+from app.db.session import SessionLocal, engine
+from app.models.user import User
+
+statements = 0
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count_statement(*args):
+    global statements
+    statements += 1
+
+
+@app.get("/bench/whoami")
+def whoami(current_user: Principal = Depends(get_current_user)):
+    return {"id": current_user.id, "role": current_user.role}
+
+
+def seed(users: int) -> list:
+    db = SessionLocal()
+    try:
+        db.bulk_insert_mappings(User, [{"name": "Admin", "email": "admin@example.com", "password": "x", "role": "admin"}] + [
+            {"name": f"Patient {i}", "email": f"patient{i}@example.com", "password": "x", "role": "patient"}
+            for i in range(users)
+        ])
+        db.commit()
+        return [user_id for (user_id,) in db.query(User.id).order_by(User.id)]
+    finally:
+        db.close()
+
+
+def token(user_id: int) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+
+
+async def run(client: httpx.AsyncClient, user_ids: list, requests: int, concurrency: int) -> tuple:
+    global statements
+    semaphore = asyncio.Semaphore(concurrency)
+    headers = [token(user_id) for user_id in user_ids]
+
+    async def call(i: int):
+        async with semaphore:
+            response = await client.get("/bench/whoami", headers=headers[i % len(headers)])
+            response.raise_for_status()
+
+    statements = 0
+    start = time.perf_counter()
+    await asyncio.gather(*(call(i) for i in range(requests)))
+    return time.perf_counter() - start, statements
+
+
+async def main_async(args) -> None:
+    upgrade(engine)
+    admin_id, *patient_ids = seed(args.users)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for label, size in (("without cache", 0), ("with cache", principal_cache.max_size or 10000)):
+            principal_cache.max_size = size
+            principal_cache.invalidate()
+            elapsed, executed = await run(client, patient_ids, args.requests, args.concurrency)
+            print(f"{label:14} {args.requests / elapsed:8,.0f} req/s  {executed / args.requests:.2f} SQL statements/request")
+        print(f"cache stats: {principal_cache.stats()}")
+
+        victim = patient_ids[0]
+        response = await client.put(f"/api/admin/users/{victim}", params={"is_active": False}, headers=token(admin_id))
+        response.raise_for_status()
+        after = await client.get("/bench/whoami", headers=token(victim))
+        print(f"request after deactivation: HTTP {after.status_code}")
+        if after.status_code != 401:
+            sys.exit("a deactivated user was still served from the cache")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=50)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Benchmark the vectorized funnel analytics on synthetic appointments.
+
+Usage: python benchmarks/bench_funnel.py [--appointments 10000000]
+"""
+
+import argparse
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.core.analytics import compute_cohort_retention, compute_funnel
+
+
+def synthetic_data(n_appointments: int, n_hospitals: int, n_patients: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    year = 365 * 86400
+    start = 1_700_000_000
+
+    appointments = {
+        "id": rng.permutation(n_appointments).astype(np.int64) + 1,
+        "hospital_id": rng.integers(1, n_hospitals + 1, n_appointments),
+        "patient_id": rng.integers(1, n_patients + 1, n_appointments),
+        "status": rng.choice(4, n_appointments, p=[0.4, 0.3, 0.2, 0.1]).astype(np.int8),
+        "created": start + rng.random(n_appointments) * year
+    }
+
+    # ~70% of appointments get an order, some of them a retried second order
+    with_order = rng.random(n_appointments) < 0.7
+    order_ids = appointments["id"][with_order]
+    retries = order_ids[rng.random(len(order_ids)) < 0.15]
+    payment_appointments = np.concatenate((order_ids, retries))
+
+    created_lookup = np.empty(n_appointments + 1)
+    created_lookup[appointments["id"]] = appointments["created"]
+    payments = {
+        "appointment_id": payment_appointments,
+        "status": rng.choice(3, len(payment_appointments), p=[0.15, 0.75, 0.1]).astype(np.int8),
+        "created": created_lookup[payment_appointments] + rng.exponential(3600, len(payment_appointments))
+    }
+    return appointments, payments
+
+
+def timed(label, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    print(f"{label:<28} {time.perf_counter() - start:8.2f}s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--appointments", type=int, default=10_000_000)
+    parser.add_argument("--hospitals", type=int, default=500)
+    parser.add_argument("--patients", type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    appointments, payments = timed("generate synthetic data", synthetic_data, args.appointments, args.hospitals, args.patients)
+    print(f"{args.appointments:,} appointments, {len(payments['appointment_id']):,} payments")
+
+    for period in ("day", "week", "month"):
+        rows = timed(f"funnel ({period})", compute_funnel, appointments, payments, period)
+        print(f"{'':<28} {len(rows):,} hospital/period rows")
+    cohorts = timed("cohort retention", compute_cohort_retention, appointments)
+    print(f"{'':<28} {len(cohorts)} cohorts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""End-to-end load test of the main API flows, with regression baselines.
+
+Seeds a synthetic dataset (--hospitals, --patients, and --history past
+appointments with captured payments for the reports), then drives the
+app through each scenario in turn at --concurrency in-flight requests:
+hospital list, search and detail, booking, payment order creation and
+verification, and the admin reports. Payments go to fake_gateway.py,
+started on a free port; the real gateway is never called. The app runs
+in-process by default, or with --server behind a local uvicorn
+(--workers processes). Prints requests/s and p50/p95/p99 latency per
+scenario, each the best of --rounds runs.
+
+--save-baseline stores the results in --baseline, per mode. Otherwise,
+if a baseline for the mode exists, exits non-zero when any scenario's
+throughput drops or its p95 latency rises by more than --tolerance, or
+when any request fails. Baselines only compare runs of the same dataset
+and load on the same machine; record one where the comparison will run.
+Uses a scratch SQLite database unless DATABASE_URL is set.
+
+Usage: python benchmarks/bench_load.py [--server] [--requests 400] [--concurrency 20] [--save-baseline]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+GATEWAY_PORT = free_port()
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench_load.db")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("RAZORPAY_KEY_ID", "rzp_bench")
+os.environ.setdefault("RAZORPAY_KEY_SECRET", "bench_key_secret")
+os.environ.setdefault("RAZORPAY_WEBHOOK_SECRET", "bench_webhook_secret")
+# Always the fake gateway, whatever the environment says
+os.environ["RAZORPAY_BASE_URL"] = f"http://127.0.0.1:{GATEWAY_PORT}/v1"
+
+import httpx
+
+from app.main import app
+from app.core.security import create_access_token
+from app.core.settlements import ledger_amounts, to_paise
+from app.db.migrations import upgrade
+from app.db.session import SessionLocal, async_engine, engine
+from app.models.appointment import Appointment
+from app.models.hospital import Hospital
+from app.models.payment import Payment
+from app.models.service import Service
+from app.models.user import User
+
+DEFAULT_BASELINE = os.path.join(BACKEND, "benchmarks", "baselines", "bench_load.json")
+
+CITIES = ("Pune", "Mumbai", "Delhi", "Bengaluru", "Chennai", "Hyderabad", "Kolkata", "Jaipur")
+CATEGORIES = ("General", "Specialty", "Multi-Specialty")
+SERVICES = (("Consultation", 500.0), ("Blood Test", 800.0), ("MRI Scan", 6500.0))
+SEARCHES = ("Pune", "Care", "cardiac", "City Hospital 1", "Chennai")
+
+
+def seed(hospitals: int, patients: int, history: int, rng: random.Random) -> dict:
+    """Insert the dataset; returns the ids the scenarios need"""
+    db = SessionLocal()
+    try:
+        db.bulk_insert_mappings(Hospital, [
+            {
+                "name": f"{rng.choice(('City', 'Care', 'Apollo', 'Sunrise'))} Hospital {i}", "address": f"{i} Main Road",
+                "city": CITIES[i % len(CITIES)], "contact_email": f"hospital{i}@example.com",
+                "contact_phone": "9000000000", "category": CATEGORIES[i % len(CATEGORIES)],
+                "specialties": ["Cardiology", "Orthopedics"], "description": "Cardiac and orthopaedic care",
+                "rating": rng.randint(1, 5), "is_approved": True
+            }
+            for i in range(hospitals)
+        ])
+        db.bulk_insert_mappings(User, [
+            {"name": f"Patient {i}", "email": f"patient{i}@example.com", "password": "!", "role": "patient"}
+            for i in range(patients)
+        ] + [{"name": "Admin", "email": "admin@example.com", "password": "!", "role": "admin"}])
+        hospital_ids = [id_ for (id_,) in db.query(Hospital.id).order_by(Hospital.id)]
+        patient_ids = [id_ for (id_,) in db.query(User.id).filter(User.role == "patient").order_by(User.id)]
+        admin_id = db.query(User.id).filter(User.role == "admin").scalar()
+
+        db.bulk_insert_mappings(Service, [
+            {"hospital_id": hospital_id, "service_name": name, "price": price, "category": "Consultation", "is_active": True}
+            for hospital_id in hospital_ids
+            for name, price in SERVICES
+        ])
+
+        # Past appointments, each paid in full, spread over the last 90 days
+        now = datetime.utcnow()
+        appointments = []
+        for _ in range(history):
+            name, price = rng.choice(SERVICES)
+            created_at = now - timedelta(days=rng.uniform(0, 90))
+            appointments.append({
+                "patient_id": rng.choice(patient_ids), "hospital_id": rng.choice(hospital_ids), "service": name,
+                "appointment_date": created_at + timedelta(days=3), "status": "COMPLETED",
+                "total_due_paise": to_paise(price), "paid_paise": to_paise(price), "created_at": created_at
+            })
+        db.bulk_insert_mappings(Appointment, appointments)
+        db.flush()
+        rows = db.query(Appointment.id, Appointment.service, Appointment.created_at).order_by(Appointment.id).all()
+        prices = dict(SERVICES)
+        db.bulk_insert_mappings(Payment, [
+            {
+                "appointment_id": id_, "razorpay_order_id": f"order_history{id_}", "razorpay_payment_id": f"pay_history{id_}",
+                "total_amount": prices[service], "admin_commission": prices[service] / 10,
+                "hospital_payout": prices[service] * 0.9, **ledger_amounts(prices[service], prices[service] / 10),
+                "status": "SUCCESS", "created_at": created_at + timedelta(hours=rng.uniform(0, 48))
+            }
+            for id_, service, created_at in rows
+        ])
+        db.commit()
+        return {"hospitals": hospital_ids, "patients": patient_ids, "admin": admin_id}
+    finally:
+        db.close()
+
+
+def percentile(ordered: list, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+async def measure(client: httpx.AsyncClient, calls: list, concurrency: int, expected: int) -> tuple:
+    """Issue (method, url, kwargs) calls; returns (stats, responses in call order)"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def call(method: str, url: str, kwargs: dict):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            return response
+
+    start = time.perf_counter()
+    responses = await asyncio.gather(*(call(method, url, kwargs) for method, url, kwargs in calls))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    errors = [response for response in responses if response.status_code != expected]
+    stats = {
+        "requests": len(calls),
+        "errors": len(errors),
+        "throughput": len(calls) / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000
+    }
+    if errors:
+        stats["first_error"] = f"HTTP {errors[0].status_code}: {errors[0].text[:200]}"
+    return stats, responses
+
+
+async def run_scenarios(client: httpx.AsyncClient, data: dict, args, rng: random.Random) -> dict:
+    patient_tokens = {
+        patient_id: {"Authorization": f"Bearer {create_access_token({'sub': str(patient_id), 'role': 'patient'})}"}
+        for patient_id in data["patients"]
+    }
+    admin = {"Authorization": f"Bearer {create_access_token({'sub': str(data['admin']), 'role': 'admin'})}"}
+    hospitals, requests = data["hospitals"], args.requests
+    results = {}
+
+    async def scenario(name: str, calls: list, expected: int = 200) -> list:
+        if not calls:
+            # Everything it depends on failed
+            results[name] = {"requests": 0, "errors": 0}
+            return []
+        results[name], responses = await measure(client, calls, args.concurrency, expected)
+        return responses
+
+    # Warm up connections and caches outside the measurements
+    for path in ("/health", "/api/hospitals/?limit=20", f"/api/hospitals/{hospitals[0]}"):
+        await client.get(path)
+
+    await scenario("hospital list", [
+        ("GET", "/api/hospitals/", {"params": {"skip": rng.randrange(max(len(hospitals) - 20, 1)), "limit": 20}})
+        for _ in range(requests)
+    ])
+    await scenario("hospital search", [
+        ("GET", "/api/hospitals/", {"params": {"search": rng.choice(SEARCHES), "limit": 20}})
+        for _ in range(requests)
+    ])
+    await scenario("hospital detail", [
+        ("GET", f"/api/hospitals/{rng.choice(hospitals)}", {}) for _ in range(requests)
+    ])
+
+    bookings = []
+    for _ in range(requests):
+        patient_id = rng.choice(data["patients"])
+        service, price = rng.choice(SERVICES)
+        bookings.append(("POST", "/api/appointments/appointments/", {
+            "headers": patient_tokens[patient_id],
+            "json": {
+                "patient_id": patient_id, "hospital_id": rng.choice(hospitals), "service": service,
+                "appointment_date": (datetime.utcnow() + timedelta(days=rng.randint(1, 30))).isoformat()
+            }
+        }))
+    booked = await scenario("booking", bookings, expected=201)
+
+    appointments = [response.json() for response in booked if response.status_code == 201]
+    orders = await scenario("payment create-order", [
+        ("POST", "/api/payments/create-order", {
+            "json": {"appointment_id": appointment["id"], "amount": appointment["total_due"]}
+        })
+        for appointment in appointments
+    ], expected=201)
+
+    # Checkout happens between the patient and the gateway; not part of the API's latency
+    order_ids = [response.json()["order_id"] for response in orders if response.status_code == 201]
+    async with httpx.AsyncClient(base_url=os.environ["RAZORPAY_BASE_URL"], timeout=30) as gateway:
+        checkouts = await asyncio.gather(*(gateway.post(f"/orders/{order_id}/pay", json={}) for order_id in order_ids))
+    await scenario("payment verify", [
+        ("POST", "/api/payments/verify", {"json": checkout.json()})
+        for checkout in checkouts if checkout.status_code == 200
+    ])
+
+    reports = (
+        ("report performance", "/api/admin/hospitals/performance", {}),
+        ("report tracking", "/api/admin/payments/tracking", {}),
+        ("report revenue", "/api/admin/analytics/revenue", {"period": "month"}),
+        ("report funnel", "/api/admin/analytics/funnel", {"period": "week"})
+    )
+    for name, path, params in reports:
+        await scenario(name, [
+            ("GET", path, {"headers": admin, "params": params}) for _ in range(args.report_requests)
+        ])
+    return results
+
+
+def wait_for(url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.TransportError:
+            time.sleep(0.05)
+    sys.exit(f"{url} did not answer within {timeout:.0f}s")
+
+
+def start_process(command: list, health_url: str, quiet: bool = False) -> subprocess.Popen:
+    process = subprocess.Popen(
+        command, cwd=BACKEND, env=dict(os.environ),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL if quiet else None
+    )
+    try:
+        wait_for(health_url, timeout=30)
+    except SystemExit:
+        process.terminate()
+        raise
+    return process
+
+
+async def drive(data: dict, args, rng: random.Random, base_url: str = None) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    if base_url:
+        client = httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60)
+    else:
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+    async with client:
+        rounds = [await run_scenarios(client, data, args, rng) for _ in range(args.rounds)]
+    await async_engine.dispose()
+    return {name: combine([results[name] for results in rounds]) for name in rounds[0]}
+
+
+def combine(rounds: list) -> dict:
+    """One scenario's results over all rounds: the best of each measurement, as noise only slows a run down"""
+    measured = [stats for stats in rounds if stats["requests"]]
+    combined = {
+        "requests": sum(stats["requests"] for stats in rounds),
+        "errors": sum(stats["errors"] for stats in rounds)
+    }
+    if measured:
+        combined["throughput"] = max(stats["throughput"] for stats in measured)
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            combined[key] = min(stats[key] for stats in measured)
+    errors = [stats["first_error"] for stats in rounds if "first_error" in stats]
+    if errors:
+        combined["first_error"] = errors[0]
+    return combined
+
+
+def print_results(results: dict) -> None:
+    for name, stats in results.items():
+        if not stats["requests"]:
+            print(f"{name:22} not run: the requests it depends on failed")
+            continue
+        print(f"{name:22} {stats['throughput']:8,.0f} req/s  p50 {stats['p50_ms']:7.1f} ms  "
+              f"p95 {stats['p95_ms']:7.1f} ms  p99 {stats['p99_ms']:7.1f} ms"
+              + (f"  {stats['errors']} errors ({stats['first_error']})" if stats["errors"] else ""))
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Scenarios that regressed against the baseline beyond the tolerance"""
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if base is None or not stats["requests"] or not base["requests"]:
+            continue
+        if stats["throughput"] < base["throughput"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {stats['throughput']:,.0f} req/s, baseline {base['throughput']:,.0f}")
+        if stats["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {stats['p95_ms']:.1f} ms, baseline {base['p95_ms']:.1f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hospitals", type=int, default=1000)
+    parser.add_argument("--patients", type=int, default=500)
+    parser.add_argument("--history", type=int, default=5000, help="Past paid appointments for the reports")
+    parser.add_argument("--requests", type=int, default=400, help="Requests per API scenario")
+    parser.add_argument("--report-requests", type=int, default=20, help="Requests per admin report")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=3, help="Runs of every scenario; the best is reported")
+    parser.add_argument("--server", action="store_true", help="Serve the app with uvicorn instead of in-process")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers with --server")
+    parser.add_argument("--gateway-latency-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed fractional regression")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    upgrade(engine)
+    data = seed(args.hospitals, args.patients, args.history, rng)
+    mode = f"uvicorn-{args.workers}" if args.server else "in-process"
+    workload = {
+        name: getattr(args, name)
+        for name in (
+            "hospitals", "patients", "history", "requests", "report_requests", "concurrency", "rounds", "gateway_latency_ms"
+        )
+    }
+    print(f"{mode}: {args.hospitals:,} hospitals, {args.patients:,} patients, {args.history:,} past payments, "
+          f"concurrency {args.concurrency}, best of {args.rounds} round(s)")
+
+    processes = [start_process(
+        [sys.executable, "fake_gateway.py", "--port", str(GATEWAY_PORT), "--latency-ms", str(args.gateway_latency_ms),
+         "--key-secret", os.environ["RAZORPAY_KEY_SECRET"]],
+        f"http://127.0.0.1:{GATEWAY_PORT}/docs", quiet=True
+    )]
+    try:
+        base_url = None
+        if args.server:
+            port = free_port()
+            base_url = f"http://127.0.0.1:{port}"
+            processes.append(start_process(
+                [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+                 "--workers", str(args.workers), "--log-level", "warning"],
+                f"{base_url}/health"
+            ))
+        results = asyncio.run(drive(data, args, rng, base_url))
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+    print_results(results)
+
+    failures = [f"{name}: {stats['errors']} failed requests" for name, stats in results.items() if stats["errors"]]
+    failures += [f"{name}: not run" for name, stats in results.items() if not stats["requests"]]
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+
+    if args.save_baseline and failures:
+        print("Not saving a baseline from a run with failures")
+    elif args.save_baseline:
+        baselines[mode] = {"workload": workload, "scenarios": results}
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"Saved {mode} baseline to {args.baseline}")
+    elif mode in baselines:
+        if baselines[mode]["workload"] != workload:
+            sys.exit(f"The {mode} baseline in {args.baseline} was recorded with a different workload "
+                     f"({baselines[mode]['workload']}); rerun with the same options or --save-baseline")
+        failures.extend(compare(results, baselines[mode]["scenarios"], args.tolerance))
+        if not failures:
+            print(f"No scenario regressed more than {args.tolerance:.0%} against the {mode} baseline")
+    else:
+        print(f"No {mode} baseline in {args.baseline}; record one with --save-baseline")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
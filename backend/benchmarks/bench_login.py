@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Benchmark a login storm and its effect on other endpoints.
+
+Seeds --users accounts, then sends --logins concurrent logins while
+probing /health. Reports login throughput, how many logins were shed
+with 503s, and /health latency during the storm. Accounts are seeded
+with a lower bcrypt cost than configured, so the run also exercises
+rehash-on-login. Uses a scratch SQLite database unless DATABASE_URL is set.
+
+Usage: python benchmarks/bench_login.py [--users 200] [--logins 400] [--concurrency 100]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench_login.db")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")  # Every login comes from one address
+
+import httpx
+from passlib.context import CryptContext
+
+from app.main import app
+from app.core.config import settings
+from app.core.password_hashing import password_hasher
+from app.db.migrations import upgrade
+from app.db.session import SessionLocal, engine
+from app.models.user import User
+
+PASSWORD = "correct horse battery staple"
+
+
+def seed(users: int) -> None:
+    # One hash shared by every account, made at a cost the server will upgrade
+    old_cost = CryptContext(schemes=["bcrypt"], bcrypt__rounds=max(settings.BCRYPT_ROUNDS - 1, 4))
+    hashed = old_cost.hash(PASSWORD)
+    db = SessionLocal()
+    try:
+        db.bulk_insert_mappings(User, [
+            {"name": f"Patient {i}", "email": f"patient{i}@example.com", "password": hashed, "role": "patient"}
+            for i in range(users)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+async def storm(users: int, logins: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses = []
+    health_latencies = []
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120) as client:
+        async def login(i: int):
+            async with semaphore:
+                response = await client.post("/api/auth/login", json={
+                    "email": f"patient{i % users}@example.com", "password": PASSWORD
+                })
+                statuses.append(response.status_code)
+
+        async def probe_health():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/health")
+                health_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.01)
+
+        prober = asyncio.create_task(probe_health())
+        start = time.perf_counter()
+        await asyncio.gather(*(login(i) for i in range(logins)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await prober
+
+    return {"elapsed": elapsed, "statuses": statuses, "health": health_latencies}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--logins", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+    upgrade(engine)
+
+    seed(args.users)
+    result = asyncio.run(storm(args.users, args.logins, args.concurrency))
+    password_hasher.shutdown()
+
+    ok = result["statuses"].count(200)
+    shed = result["statuses"].count(503)
+    health = sorted(result["health"])
+    db = SessionLocal()
+    try:
+        upgraded = db.query(User).filter(User.password.like(f"$2b${settings.BCRYPT_ROUNDS:02d}$%")).count()
+    finally:
+        db.close()
+
+    print(f"{ok} logins in {result['elapsed']:.2f}s ({ok / result['elapsed']:.1f}/s) "
+          f"with {settings.PASSWORD_HASH_WORKERS} hashing workers at cost {settings.BCRYPT_ROUNDS}; {shed} shed with 503")
+    print(f"/health during the storm: p50 {statistics.median(health) * 1000:.1f}ms, "
+          f"p99 {health[int(len(health) * 0.99)] * 1000:.1f}ms over {len(health)} probes")
+    print(f"{upgraded}/{args.users} accounts rehashed at the configured cost")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Benchmark a settlement run over one month of successful payments.
+
+Seeds --payments payments spread over a month across --hospitals
+hospitals, some of them created before the paise ledger existed, then
+settles the month and checks the batch totals against the seed. Uses a
+scratch SQLite database unless DATABASE_URL is set.
+
+Usage: python benchmarks/bench_settlement.py [--payments 1000000] [--hospitals 500]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench_settlement.db")
+os.environ.setdefault("SECRET_KEY", "bench")
+
+from sqlalchemy import insert
+
+import app.main  # noqa: F401 (registers every model)
+from app.core.settlements import ledger_amounts, settle_payments
+from app.db.migrations import upgrade
+from app.db.session import SessionLocal, engine
+from app.models.appointment import Appointment
+from app.models.payment import Payment
+
+MONTH_START = datetime(2026, 9, 1)
+MONTH_END = datetime(2026, 10, 1)
+SEED_CHUNK = 50000
+
+
+def seed(payments: int, hospitals: int) -> int:
+    """Insert the month's payments; returns the expected total payout in paise"""
+    rng = random.Random(42)
+    seconds = int((MONTH_END - MONTH_START).total_seconds())
+    expected_payout = 0
+
+    with engine.begin() as conn:
+        for start in range(1, payments + 1, SEED_CHUNK):
+            ids = range(start, min(start + SEED_CHUNK, payments + 1))
+            appointments, rows = [], []
+            for i in ids:
+                created = MONTH_START + timedelta(seconds=rng.randrange(seconds))
+                amount = rng.choice((300.0, 499.99, 750.5, 1200.0))
+                commission = round(amount * 0.1, 2)
+                row = {
+                    "id": i, "appointment_id": i, "razorpay_order_id": f"order_bench{i}",
+                    "total_amount": amount, "admin_commission": commission,
+                    "hospital_payout": amount - commission, "status": "SUCCESS", "created_at": created
+                }
+                # Every tenth payment predates the ledger and is backfilled by the run
+                ledger = ledger_amounts(amount, commission)
+                row.update(ledger if i % 10 else dict.fromkeys(ledger))
+                expected_payout += ledger["payout_paise"]
+                appointments.append({
+                    "id": i, "patient_id": 1, "hospital_id": rng.randint(1, hospitals),
+                    "service": "Consultation", "appointment_date": created, "status": "COMPLETED"
+                })
+                rows.append(row)
+            conn.execute(insert(Appointment), appointments)
+            conn.execute(insert(Payment), rows)
+    return expected_payout
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--payments", type=int, default=1_000_000)
+    parser.add_argument("--hospitals", type=int, default=500)
+    args = parser.parse_args()
+    upgrade(engine)
+
+    start = time.perf_counter()
+    expected_payout = seed(args.payments, args.hospitals)
+    print(f"seeded {args.payments:,} payments in {time.perf_counter() - start:.1f}s")
+
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        summary = settle_payments(db, period_end=MONTH_END, period_start=MONTH_START)
+        elapsed = time.perf_counter() - start
+
+        again = settle_payments(db, period_end=MONTH_END, period_start=MONTH_START)
+    finally:
+        db.close()
+
+    print(f"settled {summary['payments']:,} payments into {summary['batches']} batches in {elapsed:.2f}s")
+    print(f"payout {summary['payout_paise'] / 100:,.2f} (expected {expected_payout / 100:,.2f})")
+    assert summary["payments"] == args.payments
+    assert summary["payout_paise"] == expected_payout
+    assert again["payments"] == 0, "second run must not settle anything twice"
+
+
+if __name__ == "__main__":
+    main()
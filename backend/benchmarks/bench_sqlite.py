@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Concurrent read/write throughput on SQLite, default vs tuned connections.
+
+Runs the same workload twice, each on a fresh database file: --writers
+threads book appointments (read the hospital, insert, commit, like the
+booking route) while --readers threads list recent appointments. The
+first run uses SQLAlchemy's default SQLite engine (rollback journal,
+deferred transactions); the second uses engines built by app.db.pool,
+which apply the SQLite profile from app.db.sqlite. Reports committed
+bookings/s, reads/s and "database is locked" failures for each.
+
+Usage: python benchmarks/bench_sqlite.py [--seconds 5] [--writers 8] [--readers 8]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench_sqlite.db")
+os.environ.setdefault("SECRET_KEY", "bench")
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+import app.main  # noqa: F401  (registers every model)
+from app.db.base import Base
+from app.db.pool import create_db_engine
+from app.db.sqlite import BEGIN_OPTION
+from app.models.appointment import Appointment
+from app.models.hospital import Hospital
+
+HOSPITALS = 20
+
+
+def setup(engine) -> None:
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add_all([
+            Hospital(
+                name=f"Hospital {i}", address="Main Road", city="Pune", contact_email=f"h{i}@example.com",
+                contact_phone="9000000000", category="General", is_approved=True
+            )
+            for i in range(HOSPITALS)
+        ])
+        db.commit()
+
+
+def workload(write_engine, read_engine, seconds: float, writers: int, readers: int) -> dict:
+    counts = {"bookings": 0, "reads": 0, "locked": 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def count(name: str) -> None:
+        with lock:
+            counts[name] += 1
+
+    def book(worker: int) -> None:
+        n = 0
+        while time.monotonic() < deadline:
+            n += 1
+            try:
+                with Session(write_engine) as db:
+                    hospital_id = db.scalar(select(Hospital.id).where(Hospital.id == (worker + n) % HOSPITALS + 1))
+                    db.add(Appointment(
+                        patient_id=worker + 1, hospital_id=hospital_id, service="Consultation",
+                        appointment_date=datetime(2026, 11, 1), status="BOOKED", paid_paise=0
+                    ))
+                    db.commit()
+                count("bookings")
+            except OperationalError as e:
+                if "locked" not in str(e):
+                    raise
+                count("locked")
+
+    def read() -> None:
+        while time.monotonic() < deadline:
+            try:
+                with Session(read_engine) as db:
+                    db.scalars(select(Appointment).order_by(Appointment.id.desc()).limit(50)).all()
+                count("reads")
+            except OperationalError as e:
+                if "locked" not in str(e):
+                    raise
+                count("locked")
+
+    threads = [threading.Thread(target=book, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=read) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=8)
+    args = parser.parse_args()
+    directory = tempfile.mkdtemp()
+
+    default_engine = create_engine(f"sqlite:///{directory}/default.db")
+    tuned_engine = create_db_engine(f"sqlite:///{directory}/tuned.db", "bench-tuned")
+    runs = (
+        ("default", default_engine, default_engine),
+        ("tuned", tuned_engine, tuned_engine.execution_options(**{BEGIN_OPTION: "DEFERRED"}))
+    )
+
+    for label, write_engine, read_engine in runs:
+        setup(write_engine)
+        counts = workload(write_engine, read_engine, args.seconds, args.writers, args.readers)
+        print(
+            f"{label:8} {counts['bookings'] / args.seconds:8,.0f} bookings/s  "
+            f"{counts['reads'] / args.seconds:8,.0f} reads/s  {counts['locked']:6,} locked errors"
+        )
+
+
+if __name__ == "__main__":
+    main()
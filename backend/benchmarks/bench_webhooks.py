@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Benchmark webhook ingestion: a burst of signed payment.captured events.
+
+Reports how fast the endpoint accepts (durably stores) events and how
+fast the background processor applies them. Uses a scratch SQLite
+database unless DATABASE_URL is set.
+
+Usage: python benchmarks/bench_webhooks.py [--events 5000] [--concurrency 200]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench_webhooks.db")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("RAZORPAY_WEBHOOK_SECRET", "bench_webhook_secret")
+
+import httpx
+
+from app.main import app
+from app.core.config import settings
+from app.core.webhooks import webhook_processor
+from app.db.migrations import upgrade
+from app.db.session import SessionLocal, engine
+from app.models.appointment import Appointment
+from app.models.payment import Payment
+from app.models.webhook_event import WebhookEvent
+
+
+def seed_payments(n: int) -> None:
+    db = SessionLocal()
+    try:
+        db.bulk_insert_mappings(Appointment, [
+            {"id": i, "patient_id": 1, "hospital_id": 1, "service": "Consultation",
+             "appointment_date": datetime(2026, 1, 1, 10), "status": "BOOKED"}
+            for i in range(1, n + 1)
+        ])
+        db.bulk_insert_mappings(Payment, [
+            {"appointment_id": i, "razorpay_order_id": f"order_bench{i}", "total_amount": 500.0,
+             "admin_commission": 50.0, "hospital_payout": 450.0, "status": "PENDING"}
+            for i in range(1, n + 1)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def signed_event(i: int) -> tuple:
+    body = json.dumps({
+        "entity": "event",
+        "event": "payment.captured",
+        "payload": {"payment": {"entity": {"id": f"pay_bench{i}", "order_id": f"order_bench{i}", "amount": 50000}}}
+    }).encode()
+    signature = hmac.new(settings.RAZORPAY_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+    return body, {"X-Razorpay-Signature": signature, "X-Razorpay-Event-Id": f"evt_bench{i}"}
+
+
+async def send_burst(n: int, concurrency: int) -> float:
+    events = [signed_event(i) for i in range(1, n + 1)]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def send(body, headers):
+            async with semaphore:
+                response = await client.post("/api/payments/webhook", content=body, headers=headers)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(send(body, headers) for body, headers in events))
+        return time.perf_counter() - start
+
+
+def wait_until_applied(n: int, timeout: float = 120) -> float:
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        db = SessionLocal()
+        try:
+            pending = db.query(WebhookEvent).filter(WebhookEvent.status == "PENDING").count()
+        finally:
+            db.close()
+        if not pending:
+            break
+        time.sleep(0.05)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+    upgrade(engine)
+
+    seed_payments(args.events)
+    webhook_processor.start()
+
+    accept_seconds = asyncio.run(send_burst(args.events, args.concurrency))
+    apply_seconds = wait_until_applied(args.events)
+    webhook_processor.stop()
+
+    db = SessionLocal()
+    try:
+        succeeded = db.query(Payment).filter(Payment.status == "SUCCESS").count()
+    finally:
+        db.close()
+
+    print(f"accepted {args.events} events in {accept_seconds:.2f}s ({args.events / accept_seconds:,.0f}/s)")
+    print(f"applied after a further {apply_seconds:.2f}s; {succeeded} payments marked SUCCESS")
+
+
+if __name__ == "__main__":
+    main()
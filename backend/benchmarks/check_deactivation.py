@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Check that deactivating a user locks them out for good.
+
+Registers a patient, signs them in, deactivates them as an admin, then
+exits non-zero unless their access token, their refresh token and a fresh
+sign-in with the right password are all refused. Uses a scratch SQLite
+database unless DATABASE_URL is set.
+
+Usage: python benchmarks/check_deactivation.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/check_deactivation.db")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import httpx
+
+from app.main import app
+from app.core.security import create_access_token
+from app.db.migrations import upgrade
+from app.db.session import SessionLocal, async_engine, engine
+from app.models.user import User
+
+PASSWORD = "check-deactivation-1"
+
+
+def seed_admin() -> int:
+    db = SessionLocal()
+    try:
+        admin = User(name="Admin", email="admin@check.example.com", password="-", role="admin", is_active=True)
+        db.add(admin)
+        db.commit()
+        return admin.id
+    finally:
+        db.close()
+
+
+async def run(admin_id: int) -> list:
+    admin = {"Authorization": "Bearer " + create_access_token({"sub": str(admin_id), "role": "admin"})}
+    credentials = {"email": "patient@check.example.com", "password": PASSWORD}
+    results = []
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://check") as client:
+        response = await client.post("/api/auth/register", json={"name": "Patient", "role": "patient", **credentials})
+        response.raise_for_status()
+        patient_id = response.json()["id"]
+        response = await client.post("/api/auth/login", json=credentials)
+        response.raise_for_status()
+        tokens = response.json()
+
+        response = await client.put(f"/api/admin/users/{patient_id}", params={"is_active": "false"}, headers=admin)
+        response.raise_for_status()
+
+        response = await client.get(
+            f"/api/appointments/appointments/patient/{patient_id}",
+            headers={"Authorization": "Bearer " + tokens["access_token"]}
+        )
+        results.append(("access token issued before deactivation", response.status_code))
+        response = await client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+        results.append(("refresh token issued before deactivation", response.status_code))
+        response = await client.post("/api/auth/login", json=credentials)
+        results.append(("sign-in after deactivation", response.status_code))
+
+    # No lifespan runs in-process; close the async driver's connection threads
+    await async_engine.dispose()
+    return results
+
+
+def main():
+    upgrade(engine)
+    results = asyncio.run(run(seed_admin()))
+
+    failures = 0
+    for name, status_code in results:
+        refused = 400 <= status_code < 500
+        print(f"{'refused' if refused else 'ACCEPTED':8}  {name}: HTTP {status_code}")
+        failures += not refused
+
+    if failures:
+        sys.exit(f"{failures} request(s) from a deactivated user were accepted")
+
+
+if __name__ == "__main__":
+    main()
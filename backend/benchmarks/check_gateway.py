@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Safety checks for the payment gateway adapter.
+
+Runs entirely in-process, without a gateway, and exits non-zero if any
+check fails:
+
+- payment and webhook signatures are refused when their secret is not
+  configured, including a signature made with an empty key
+- a half-open circuit admits one trial call, and a call admitted before
+  the circuit opened cannot end that trial when it finishes
+
+Usage: python benchmarks/check_gateway.py
+"""
+
+import hashlib
+import hmac
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("SECRET_KEY", "bench")
+
+from app.core.payment_gateway import CircuitBreaker, RazorpayGateway
+
+
+def gateway(key_secret=None, webhook_secret=None) -> RazorpayGateway:
+    return RazorpayGateway(
+        key_id="rzp_check", key_secret=key_secret, webhook_secret=webhook_secret,
+        base_url="http://gateway.invalid", timeout=1, connect_timeout=1,
+        max_retries=0, max_connections=1, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    )
+
+
+def sign(key: str, message: bytes) -> str:
+    return hmac.new(key.encode(), message, hashlib.sha256).hexdigest()
+
+
+def signature_checks() -> dict:
+    payment = b"order_check|pay_check"
+    body = b'{"event": "payment.captured"}'
+    unconfigured, configured = gateway(), gateway("key_secret", "webhook_secret")
+    return {
+        "payment signature, no key secret, empty-key signature refused":
+            not unconfigured.verify_payment_signature("order_check", "pay_check", sign("", payment)),
+        "webhook signature, no webhook secret, empty-key signature refused":
+            not unconfigured.verify_webhook_signature(body, sign("", body)),
+        "payment signature, valid signature accepted":
+            configured.verify_payment_signature("order_check", "pay_check", sign("key_secret", payment)),
+        "payment signature, wrong signature refused":
+            not configured.verify_payment_signature("order_check", "pay_check", sign("other", payment)),
+        "webhook signature, valid signature accepted":
+            configured.verify_webhook_signature(body, sign("webhook_secret", body))
+    }
+
+
+def breaker_checks() -> dict:
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    early = breaker.allow()  # Admitted while closed; still running when the circuit opens
+    breaker.record_failure(breaker.allow())
+    opened = breaker.state == "open"
+    time.sleep(0.06)
+    trial = breaker.allow()
+    second_trial = breaker.allow()
+    breaker.release(early)
+    after_early_release = breaker.allow()
+    breaker.release(trial)
+    after_trial_release = breaker.allow()
+    return {
+        "circuit opens after the failure threshold": opened,
+        "half-open circuit admits a single trial": second_trial is None,
+        "a call from before the circuit opened does not end the trial": after_early_release is None,
+        "the trial's own release lets the next trial through": after_trial_release is not None
+    }
+
+
+def main():
+    results = {**signature_checks(), **breaker_checks()}
+
+    for name, passed in results.items():
+        print(f"{'ok' if passed else 'FAIL':4}  {name}")
+    failures = sum(not passed for passed in results.values())
+    if failures:
+        sys.exit(f"{failures} gateway check(s) failed")
+
+
+if __name__ == "__main__":
+    main()
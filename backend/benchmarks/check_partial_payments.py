@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Concurrency check for appointment balances under simultaneous partial payments.
+
+Creates one appointment with several pending partial payments, then
+verifies all of them at once, each twice, while the gateway's
+payment.captured webhooks for the same payments arrive. Exits non-zero
+unless every payment is counted exactly once in the appointment's paid
+balance and a further partial payment is refused. Uses a scratch SQLite
+database unless DATABASE_URL is set.
+
+Usage: python benchmarks/check_partial_payments.py [--payments 20]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/check_partial_payments.db")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("RAZORPAY_KEY_SECRET", "bench_key_secret")
+os.environ.setdefault("RAZORPAY_WEBHOOK_SECRET", "bench_webhook_secret")
+
+import httpx
+
+from app.main import app
+from app.core.config import settings
+from app.core.settlements import ledger_amounts
+from app.core.webhooks import webhook_processor
+from app.db.migrations import upgrade
+from app.db.session import SessionLocal, async_engine, engine
+from app.models.appointment import Appointment
+from app.models.payment import Payment
+from app.models.webhook_event import WebhookEvent
+
+INSTALMENT = 250.0
+
+
+def seed(payments: int) -> int:
+    db = SessionLocal()
+    try:
+        appointment = Appointment(
+            patient_id=1, hospital_id=1, service="Surgery", appointment_date=datetime(2026, 11, 2, 9),
+            status="BOOKED", total_due_paise=int(payments * INSTALMENT * 100), paid_paise=0
+        )
+        db.add(appointment)
+        db.flush()
+        for i in range(payments):
+            db.add(Payment(
+                appointment_id=appointment.id, razorpay_order_id=f"order_partial{i}",
+                total_amount=INSTALMENT, admin_commission=INSTALMENT / 10, hospital_payout=INSTALMENT * 0.9,
+                **ledger_amounts(INSTALMENT, INSTALMENT / 10), status="PENDING"
+            ))
+        db.commit()
+        return appointment.id
+    finally:
+        db.close()
+
+
+def verification(i: int) -> dict:
+    order_id, payment_id = f"order_partial{i}", f"pay_partial{i}"
+    signature = hmac.new(
+        settings.RAZORPAY_KEY_SECRET.encode(), f"{order_id}|{payment_id}".encode(), hashlib.sha256
+    ).hexdigest()
+    return {"razorpay_order_id": order_id, "razorpay_payment_id": payment_id, "razorpay_signature": signature}
+
+
+def captured_webhook(i: int) -> tuple:
+    body = json.dumps({
+        "entity": "event",
+        "event": "payment.captured",
+        "payload": {"payment": {"entity": {"id": f"pay_partial{i}", "order_id": f"order_partial{i}"}}}
+    }).encode()
+    signature = hmac.new(settings.RAZORPAY_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+    return body, {"X-Razorpay-Signature": signature, "X-Razorpay-Event-Id": f"evt_partial{i}"}
+
+
+async def pay_all_at_once(payments: int) -> None:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://check") as client:
+        requests = []
+        for i in range(payments):
+            requests.append(client.post("/api/payments/verify", json=verification(i)))
+            requests.append(client.post("/api/payments/verify", json=verification(i)))
+            body, headers = captured_webhook(i)
+            requests.append(client.post("/api/payments/webhook", content=body, headers=headers))
+        for response in await asyncio.gather(*requests):
+            response.raise_for_status()
+
+    # No lifespan runs in-process; close the async driver's connection threads
+    await async_engine.dispose()
+
+
+async def try_overpayment(appointment_id: int) -> int:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://check") as client:
+        response = await client.post(
+            "/api/payments/initiate-partial", params={"appointment_id": appointment_id, "partial_amount": 1}
+        )
+    await async_engine.dispose()
+    return response.status_code
+
+
+def wait_for_webhooks(timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        db = SessionLocal()
+        try:
+            if not db.query(WebhookEvent).filter(WebhookEvent.status == "PENDING").count():
+                return
+        finally:
+            db.close()
+        time.sleep(0.05)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--payments", type=int, default=20)
+    args = parser.parse_args()
+    upgrade(engine)
+
+    appointment_id = seed(args.payments)
+    webhook_processor.start()
+    asyncio.run(pay_all_at_once(args.payments))
+    wait_for_webhooks()
+    webhook_processor.stop()
+
+    db = SessionLocal()
+    try:
+        appointment = db.get(Appointment, appointment_id)
+        succeeded = db.query(Payment).filter(Payment.status == "SUCCESS").count()
+        print(f"{succeeded}/{args.payments} payments captured; "
+              f"paid {appointment.paid_amount:.2f} of {appointment.total_due:.2f}, "
+              f"outstanding {appointment.outstanding_amount:.2f}")
+        failures = []
+        if succeeded != args.payments:
+            failures.append("not every payment was captured")
+        if appointment.paid_paise != appointment.total_due_paise:
+            failures.append("paid balance does not equal the sum of captured payments")
+    finally:
+        db.close()
+
+    overpayment = asyncio.run(try_overpayment(appointment_id))
+    print(f"partial payment on a settled appointment: HTTP {overpayment}")
+    if overpayment != 400:
+        failures.append("a partial payment beyond the outstanding amount was accepted")
+
+    if failures:
+        sys.exit("; ".join(failures))
+
+
+if __name__ == "__main__":
+    main()
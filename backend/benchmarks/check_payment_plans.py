@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Query-plan regression check for the payment hot paths.
+
+EXPLAINs each lookup the checkout, webhook and admin paths make against
+the payments table and exits non-zero if any of them would scan the
+whole table instead of using an index. Uses a scratch SQLite database
+unless DATABASE_URL is set (Postgres is checked with seq scans disabled,
+so the result does not depend on table statistics).
+
+Usage: python benchmarks/check_payment_plans.py
+"""
+
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/check_payment_plans.db")
+os.environ.setdefault("SECRET_KEY", "bench")
+
+from sqlalchemy import desc, select, text
+
+import app.main  # noqa: F401 (registers every model)
+from app.db.migrations import upgrade
+from app.db.session import engine
+from app.models.payment import Payment
+
+MONTH_START = datetime(2026, 9, 1)
+MONTH_END = datetime(2026, 10, 1)
+
+HOT_QUERIES = {
+    "verify_payment (order id)": select(Payment).where(Payment.razorpay_order_id == "order_x"),
+    "get_payment_by_appointment": select(Payment).where(Payment.appointment_id == 1),
+    "webhook batch (order ids)": select(Payment).where(Payment.razorpay_order_id.in_(["order_x", "order_y"])),
+    "webhook batch (payment ids)": select(Payment).where(Payment.razorpay_payment_id.in_(["pay_x", "pay_y"])),
+    "admin recent payments": select(Payment).where(Payment.status == "SUCCESS").order_by(
+        desc(Payment.created_at)
+    ).limit(5),
+    "payment report (status, period)": select(Payment).where(
+        Payment.status == "SUCCESS",
+        Payment.created_at >= MONTH_START,
+        Payment.created_at <= MONTH_END
+    )
+}
+
+# A plan line that reads the whole payments table
+FULL_SCAN = {
+    "sqlite": re.compile(r"^SCAN (TABLE )?payments$"),
+    "postgresql": re.compile(r"Seq Scan on payments")
+}
+
+
+def explain(conn, statement) -> list:
+    compiled = statement.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    params = compiled.construct_params()
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql(
+            "EXPLAIN QUERY PLAN " + str(compiled),
+            tuple(params[name] for name in compiled.positiontup)
+        )
+        return [row[-1] for row in rows]
+    rows = conn.exec_driver_sql("EXPLAIN " + str(compiled), params)
+    return [row[0] for row in rows]
+
+
+def main():
+    upgrade(engine)
+    dialect = engine.dialect.name
+    if dialect not in FULL_SCAN:
+        sys.exit(f"No plan check for {dialect}")
+
+    failures = 0
+    with engine.connect() as conn:
+        if dialect == "postgresql":
+            conn.execute(text("SET enable_seqscan = off"))
+        for name, statement in HOT_QUERIES.items():
+            plan = explain(conn, statement)
+            scans = [line for line in plan if FULL_SCAN[dialect].search(line.strip())]
+            print(f"{'FULL SCAN' if scans else 'ok':9}  {name}: {' | '.join(line.strip() for line in plan)}")
+            failures += bool(scans)
+
+    if failures:
+        sys.exit(f"{failures} payment lookup(s) fall back to a full table scan")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Startup budget check: import time of app.main and time to first response.
+
+Imports app.main in --runs fresh interpreters under `python -X importtime`
+and takes the median, listing the slowest modules; it also fails if any
+of DEFERRED_MODULES was imported, since those must load on first use.
+Then starts uvicorn and times process start to the first 200 from
+/health, and the first hospital listing after that. Exits non-zero when
+the import or the first response is over budget. Uses a scratch SQLite
+database (migrated before timing) unless DATABASE_URL is set.
+
+Usage: python benchmarks/check_startup.py [--runs 5] [--import-budget-ms 2000] [--startup-budget-ms 4000]
+"""
+
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only needed once a request uses them (the gateway's HTTP client)
+DEFERRED_MODULES = ("httpx", "httpcore", "trio")
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def environment() -> dict:
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/check_startup.db")
+    env.setdefault("SECRET_KEY", "bench")
+    return env
+
+
+def measure_import(env: dict) -> tuple:
+    """(total ms, {module: self ms}) for one cold import of app.main"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND, env=env, capture_output=True, text=True, check=True
+    )
+    total = 0.0
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        modules[module] = int(self_us) / 1000
+        if module == "app.main" and len(indent) == 1:
+            total = int(cumulative_us) / 1000
+    return total, modules
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url: str, deadline: float) -> bool:
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.005)
+    return False
+
+
+def measure_first_response(env: dict, timeout: float) -> tuple:
+    """(ms to first /health response, ms for the first hospital listing after it)"""
+    port = free_port()
+    start = time.monotonic()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND, env=env
+    )
+    try:
+        if not wait_for(f"http://127.0.0.1:{port}/health", start + timeout):
+            sys.exit(f"Server did not answer /health within {timeout:.0f}s")
+        ready = time.monotonic()
+        if not wait_for(f"http://127.0.0.1:{port}/api/hospitals/", ready + timeout):
+            sys.exit("First hospital listing failed")
+        return (ready - start) * 1000, (time.monotonic() - ready) * 1000
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=2000)
+    parser.add_argument("--startup-budget-ms", type=float, default=4000)
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules to list")
+    args = parser.parse_args()
+
+    env = environment()
+    subprocess.run([sys.executable, "migrate.py", "upgrade"], cwd=BACKEND, env=env, check=True, capture_output=True)
+
+    totals = []
+    slowest = {}
+    for _ in range(args.runs):
+        total, modules = measure_import(env)
+        totals.append(total)
+        for module, ms in modules.items():
+            slowest[module] = max(slowest.get(module, 0.0), ms)
+    import_ms = statistics.median(totals)
+
+    print(f"import app.main: median {import_ms:,.0f} ms over {args.runs} runs (budget {args.import_budget_ms:,.0f} ms)")
+    for module, ms in sorted(slowest.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {ms:7.1f} ms  {module}")
+
+    probe = subprocess.run(
+        [sys.executable, "-c", f"import sys, app.main; print(' '.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"],
+        cwd=BACKEND, env=env, capture_output=True, text=True, check=True
+    )
+    eager = probe.stdout.split()
+
+    startup_ms, first_listing_ms = measure_first_response(env, timeout=max(args.startup_budget_ms / 1000 * 5, 30))
+    print(f"first /health response: {startup_ms:,.0f} ms after process start (budget {args.startup_budget_ms:,.0f} ms)")
+    print(f"first hospital listing: {first_listing_ms:,.0f} ms")
+
+    failures = []
+    if eager:
+        failures.append(f"imported at startup instead of on first use: {', '.join(eager)}")
+    if import_ms > args.import_budget_ms:
+        failures.append(f"import time {import_ms:,.0f} ms over budget")
+    if startup_ms > args.startup_budget_ms:
+        failures.append(f"time to first response {startup_ms:,.0f} ms over budget")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Check that one unappliable webhook event does not block the queue.
+
+Stores a batch of payment.captured events with a malformed one in the
+middle, then runs the processor as its polling loop would. Exits
+non-zero unless every other event is applied and the malformed one ends
+up FAILED after WEBHOOK_MAX_ATTEMPTS attempts. Uses a scratch SQLite
+database unless DATABASE_URL is set.
+
+Usage: python benchmarks/check_webhook_poison.py [--events 10]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/check_webhook_poison.db")
+os.environ.setdefault("SECRET_KEY", "bench")
+
+import app.main  # noqa: F401 (registers every model)
+from app.core.config import settings
+from app.core.webhooks import webhook_processor
+from app.db.migrations import upgrade
+from app.db.session import SessionLocal, engine
+from app.models.appointment import Appointment
+from app.models.payment import Payment
+from app.models.webhook_event import WebhookEvent
+
+POISON_EVENT_ID = "evt_poison"
+
+
+def captured(i: int) -> dict:
+    return {"payload": {"payment": {"entity": {"id": f"pay_poison{i}", "order_id": f"order_poison{i}"}}}}
+
+
+def seed(events: int) -> None:
+    db = SessionLocal()
+    try:
+        for i in range(events):
+            appointment = Appointment(
+                patient_id=1, hospital_id=1, service="Consultation",
+                appointment_date=datetime(2026, 11, 2, 9), status="BOOKED"
+            )
+            db.add(appointment)
+            db.flush()
+            db.add(Payment(
+                appointment_id=appointment.id, razorpay_order_id=f"order_poison{i}", total_amount=500.0,
+                admin_commission=50.0, hospital_payout=450.0, status="PENDING"
+            ))
+            db.add(WebhookEvent(event_id=f"evt_poison{i}", event_type="payment.captured", payload=captured(i)))
+            if i == events // 2:
+                # Parses as JSON but the payment entity is not an object
+                db.add(WebhookEvent(
+                    event_id=POISON_EVENT_ID, event_type="payment.captured",
+                    payload={"payload": {"payment": {"entity": "pay_poison"}}}
+                ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=10)
+    args = parser.parse_args()
+    upgrade(engine)
+    seed(args.events)
+
+    # The processor logs each failure with its traceback; one line per poll is enough here
+    logging.basicConfig(level=logging.CRITICAL)
+    for poll in range(settings.WEBHOOK_MAX_ATTEMPTS + 1):
+        try:
+            webhook_processor.process_batch()
+        except Exception as e:
+            print(f"poll {poll + 1}: batch raised {e.__class__.__name__}: {e}")
+
+    db = SessionLocal()
+    try:
+        captured_payments = db.query(Payment).filter(Payment.status == "SUCCESS").count()
+        poison = db.query(WebhookEvent).filter(WebhookEvent.event_id == POISON_EVENT_ID).one()
+        applied = db.query(WebhookEvent).filter(
+            WebhookEvent.event_id != POISON_EVENT_ID, WebhookEvent.status == "PROCESSED"
+        ).count()
+    finally:
+        db.close()
+
+    print(f"{applied}/{args.events} good events applied, {captured_payments} payments captured")
+    print(f"malformed event: {poison.status} after {poison.attempts} attempt(s): {poison.error}")
+    failures = []
+    if applied != args.events or captured_payments != args.events:
+        failures.append("events queued with the malformed one were not applied")
+    if poison.status != "FAILED" or poison.attempts != settings.WEBHOOK_MAX_ATTEMPTS:
+        failures.append(f"the malformed event was not set aside after {settings.WEBHOOK_MAX_ATTEMPTS} attempts")
+    if failures:
+        sys.exit("; ".join(failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Razorpay orders API, for offline load tests.
+
+Run it and point the API at it:
+
+    python fake_gateway.py --port 8010 --latency-ms 150 --failure-rate 0.02
+    RAZORPAY_BASE_URL=http://localhost:8010/v1 RAZORPAY_KEY_SECRET=fake_secret uvicorn app.main:app
+
+POST /v1/orders/{order_id}/pay simulates a completed checkout and returns
+signed fields that /api/payments/verify accepts. With --webhook-url it
+also delivers a signed payment.captured webhook, as the real gateway does.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import random
+import secrets
+import time
+
+import httpx
+from fastapi import BackgroundTasks, FastAPI, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="Fake payment gateway")
+
+config = {
+    "key_secret": os.environ.get("RAZORPAY_KEY_SECRET", "fake_secret"),
+    "webhook_secret": os.environ.get("RAZORPAY_WEBHOOK_SECRET", "fake_webhook_secret"),
+    "webhook_url": None,
+    "latency_ms": 0.0,
+    "failure_rate": 0.0
+}
+orders = {}
+
+
+async def simulate_network():
+    if config["latency_ms"]:
+        # Jittered around the configured mean
+        await asyncio.sleep(random.uniform(0.5, 1.5) * config["latency_ms"] / 1000)
+    if random.random() < config["failure_rate"]:
+        return JSONResponse(
+            status_code=503,
+            content={"error": {"code": "SERVER_ERROR", "description": "Simulated gateway outage"}}
+        )
+    return None
+
+
+@app.post("/v1/orders")
+async def create_order(request: Request):
+    failure = await simulate_network()
+    if failure:
+        return failure
+
+    body = await request.json()
+    if not isinstance(body.get("amount"), int) or body["amount"] < 100:
+        return JSONResponse(
+            status_code=400,
+            content={"error": {"code": "BAD_REQUEST_ERROR", "description": "Order amount less than minimum amount allowed"}}
+        )
+
+    order = {
+        "id": f"order_{secrets.token_hex(7)}",
+        "entity": "order",
+        "amount": body["amount"],
+        "amount_paid": 0,
+        "currency": body.get("currency", "INR"),
+        "receipt": body.get("receipt"),
+        "status": "created",
+        "notes": body.get("notes", {}),
+        "created_at": int(time.time())
+    }
+    orders[order["id"]] = order
+    return order
+
+
+async def send_webhook(event_type: str, payment: dict):
+    body = json.dumps({
+        "entity": "event",
+        "event": event_type,
+        "contains": ["payment"],
+        "payload": {"payment": {"entity": payment}},
+        "created_at": int(time.time())
+    }).encode()
+    signature = hmac.new(config["webhook_secret"].encode(), body, hashlib.sha256).hexdigest()
+    async with httpx.AsyncClient(timeout=5) as client:
+        await client.post(config["webhook_url"], content=body, headers={
+            "Content-Type": "application/json",
+            "X-Razorpay-Signature": signature,
+            "X-Razorpay-Event-Id": f"evt_{secrets.token_hex(7)}"
+        })
+
+
+@app.post("/v1/orders/{order_id}/pay")
+async def pay_order(order_id: str, background_tasks: BackgroundTasks):
+    order = orders.get(order_id)
+    if not order:
+        return JSONResponse(
+            status_code=404,
+            content={"error": {"code": "BAD_REQUEST_ERROR", "description": "The id provided does not exist"}}
+        )
+
+    payment_id = f"pay_{secrets.token_hex(7)}"
+    signature = hmac.new(
+        config["key_secret"].encode(),
+        f"{order_id}|{payment_id}".encode(),
+        hashlib.sha256
+    ).hexdigest()
+    order["status"] = "paid"
+    order["amount_paid"] = order["amount"]
+    if config["webhook_url"]:
+        background_tasks.add_task(send_webhook, "payment.captured", {
+            "id": payment_id,
+            "entity": "payment",
+            "amount": order["amount"],
+            "currency": order["currency"],
+            "status": "captured",
+            "order_id": order_id
+        })
+    return {
+        "razorpay_order_id": order_id,
+        "razorpay_payment_id": payment_id,
+        "razorpay_signature": signature
+    }
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--key-secret", default=config["key_secret"])
+    parser.add_argument("--webhook-secret", default=config["webhook_secret"])
+    parser.add_argument("--webhook-url", help="e.g. http://localhost:8000/api/payments/webhook")
+    args = parser.parse_args()
+
+    config.update(
+        key_secret=args.key_secret,
+        webhook_secret=args.webhook_secret,
+        webhook_url=args.webhook_url,
+        latency_ms=args.latency_ms,
+        failure_rate=args.failure_rate
+    )
+    uvicorn.run(app, host=args.host, port=args.port)
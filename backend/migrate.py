@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""Apply or list versioned database migrations (app/db/versions).
+
+Usage: python migrate.py upgrade [--to 0005]
+       python migrate.py status
+
+Run `upgrade` before starting a new release; the app refuses to start
+while migrations are pending unless DB_AUTO_MIGRATE is set.
+"""
+
+import argparse
+import logging
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.db.migrations import applied_versions, load_migrations, upgrade
+from app.db.session import engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    upgrade_parser = commands.add_parser("upgrade", help="Apply pending migrations")
+    upgrade_parser.add_argument("--to", help="Stop after this version (default: latest)")
+    commands.add_parser("status", help="List migrations and whether each is applied")
+    args = parser.parse_args()
+
+    if args.command == "upgrade":
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+        target = args.to.zfill(4) if args.to else None
+        applied = upgrade(engine, target=target)
+        print(f"Applied {len(applied)} migration(s)" if applied else "Database is up to date")
+    else:
+        applied = set(applied_versions(engine))
+        for migration in load_migrations():
+            state = "applied" if migration.version in applied else "pending"
+            print(f"{migration.version}  {state:8} {migration.description}")
+
+
+if __name__ == "__main__":
+    main()
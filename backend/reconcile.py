@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""Reconcile a gateway settlement CSV against the payments table.
+
+Usage: python reconcile.py settlement.csv [-o mismatches.csv] [--chunk-size 5000] [--amount-in-paise]
+
+Mismatches (missing, amount_differs, status_differs, invalid_row) are
+written as CSV to the output file or stdout; a summary goes to stderr.
+"""
+
+import argparse
+import json
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import app.models.appointment  # noqa: F401 (target of Payment.appointment)
+from app.core.reconciliation import DEFAULT_CHUNK_SIZE, ReconciliationSummary, reconcile_csv
+from app.db.session import SessionLocal, replica_router
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("settlement", help="Settlement report CSV")
+    parser.add_argument("-o", "--output", help="Mismatch report path (default: stdout)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--amount-in-paise", action="store_true", help="Settlement amounts are in paise, not rupees")
+    args = parser.parse_args()
+
+    summary = ReconciliationSummary()
+    db = SessionLocal(bind=replica_router.engine_for_read())
+    output = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        with open(args.settlement, newline="", encoding="utf-8-sig") as lines:
+            for piece in reconcile_csv(db, lines, args.chunk_size, args.amount_in_paise, summary):
+                output.write(piece)
+    finally:
+        db.close()
+        if output is not sys.stdout:
+            output.close()
+
+    print(json.dumps(summary.as_dict()), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
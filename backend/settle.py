@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""Create hospital payout batches; meant to be run periodically (e.g. daily from cron).
+
+Usage: python settle.py [--end 2026-10-01] [--start 2026-09-01]
+
+Settles successful payments created before --end (default: start of
+today, UTC) that are not in a batch yet, takes back the payouts of
+settled payments refunded since the last run, and prints the run totals.
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import app.models.hospital  # noqa: F401 (tables referenced by settlement batches)
+from app.core.settlements import settle_payments
+from app.db.session import SessionLocal
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--end", type=datetime.fromisoformat, help="Exclusive upper bound on payment creation time")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="Inclusive lower bound on payment creation time")
+    args = parser.parse_args()
+
+    end = args.end or datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    db = SessionLocal()
+    try:
+        print(json.dumps(settle_payments(db, period_end=end, period_start=args.start), indent=2))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
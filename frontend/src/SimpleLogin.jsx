@@ -53,6 +53,7 @@ const SimpleLogin = () => {
       if (response.ok) {
         const data = await response.json();
         localStorage.setItem('access_token', data.access_token);
+        localStorage.setItem('refresh_token', data.refresh_token);
         setSuccess(true);
         setTimeout(() => {
           navigate('/hospitals');
@@ -22,6 +22,7 @@ export const AuthProvider = ({ children }) => {
         } catch (err) {
           console.error('Failed to decode token:', err)
           localStorage.removeItem('access_token')
+          localStorage.removeItem('refresh_token')
         }
       }
       // Always set loading to false, regardless of whether we have a token
@@ -57,6 +58,7 @@ export const AuthProvider = ({ children }) => {
       const jwtToken = data.access_token;
       
       localStorage.setItem('access_token', jwtToken);
+      localStorage.setItem('refresh_token', data.refresh_token);
       const decoded = jwtDecode(jwtToken);
 
       setToken(jwtToken);
@@ -71,7 +73,20 @@ export const AuthProvider = ({ children }) => {
   }
 
   const logout = () => {
+    const refreshToken = localStorage.getItem('refresh_token')
+    if (refreshToken) {
+      // Revoke the session server-side; signing out locally doesn't wait for it
+      fetch('http://localhost:8000/api/auth/logout', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          'Authorization': `Bearer ${localStorage.getItem('access_token')}`,
+        },
+        body: JSON.stringify({ refresh_token: refreshToken }),
+      }).catch(() => {})
+    }
     localStorage.removeItem('access_token')
+    localStorage.removeItem('refresh_token')
     setToken(null)
     setUser(null)
   }
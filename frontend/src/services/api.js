@@ -22,11 +22,44 @@ api.interceptors.request.use(
   }
 )
 
+// One refresh at a time: reusing a rotated refresh token signs the user out
+let refreshing = null
+
+const refreshAccessToken = () => {
+  if (!refreshing) {
+    refreshing = axios
+      .post(`${API_BASE_URL}/api/auth/refresh`, {
+        refresh_token: localStorage.getItem('refresh_token'),
+      })
+      .then(({ data }) => {
+        localStorage.setItem('access_token', data.access_token)
+        localStorage.setItem('refresh_token', data.refresh_token)
+        return data.access_token
+      })
+      .finally(() => {
+        refreshing = null
+      })
+  }
+  return refreshing
+}
+
 api.interceptors.response.use(
   (response) => response,
-  (error) => {
+  async (error) => {
+    const request = error.config
+    if (error.response?.status === 401 && request && !request._retried && localStorage.getItem('refresh_token')) {
+      request._retried = true
+      try {
+        const token = await refreshAccessToken()
+        request.headers.Authorization = `Bearer ${token}`
+        return api(request)
+      } catch (refreshError) {
+        // Refresh token expired or revoked: fall through to signing in again
+      }
+    }
     if (error.response?.status === 401) {
       localStorage.removeItem('access_token')
+      localStorage.removeItem('refresh_token')
       window.location.href = '/login'
     }
     return Promise.reject(error)
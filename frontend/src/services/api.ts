@@ -27,14 +27,49 @@ api.interceptors.request.use(
 );
 
 // Response interceptor for error handling
+// One refresh at a time: reusing a rotated refresh token signs the user out
+let refreshing: Promise<string> | null = null;
+
+const refreshAccessToken = (): Promise<string> => {
+  if (!refreshing) {
+    refreshing = axios
+      .post(`${API_BASE_URL}/api/auth/refresh`, {
+        refresh_token: localStorage.getItem('refresh_token'),
+      })
+      .then(({ data }) => {
+        localStorage.setItem('access_token', data.access_token);
+        localStorage.setItem('refresh_token', data.refresh_token);
+        return data.access_token as string;
+      })
+      .finally(() => {
+        refreshing = null;
+      });
+  }
+  return refreshing;
+};
+
 api.interceptors.response.use(
   (response: AxiosResponse) => {
     return response;
   },
-  (error) => {
+  async (error) => {
+    const request = error.config;
+    if (error.response?.status === 401 && request && !request._retried && localStorage.getItem('refresh_token')) {
+      // Access token expired: renew it once and replay the request
+      request._retried = true;
+      try {
+        const token = await refreshAccessToken();
+        request.headers.Authorization = `Bearer ${token}`;
+        return api(request);
+      } catch (refreshError) {
+        // Refresh token expired or revoked: fall through to signing in again
+      }
+    }
+
     if (error.response?.status === 401) {
       // Token expired or invalid
       localStorage.removeItem('access_token');
+      localStorage.removeItem('refresh_token');
       window.location.href = '/login';
     }
     
@@ -87,6 +87,7 @@ export interface RegisterData {
 
 export interface AuthResponse {
   access_token: string;
+  refresh_token: string;
   user: User;
 }
 